@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Runs the traverse command line: ``python -m traverse --help``."""
+import sys
+
+from .traverse_cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
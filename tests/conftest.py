@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Makes the plugin importable as the ``traverse`` package, whatever the name
+of the checkout directory, and provides random traverses. Only the Qt-free
+modules are tested, so QGIS does not need to be installed.
+"""
+import importlib.util
+import os
+import random
+import sys
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'traverse' not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        'traverse', os.path.join(PLUGIN_DIR, '__init__.py'), submodule_search_locations=[PLUGIN_DIR])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules['traverse'] = package
+    spec.loader.exec_module(package)
+
+from traverse.traverse_engine import Leg  # noqa: E402 (needs the package set up above)
+
+DIRECTIONS = ('N 12-30-00 E', 'S 45-00-00 W', 'N 80 W', 'S 5-15-30 E', '123.456', '*', '*')
+
+
+def make_legs(count, seed=0):
+    """``count`` random legs: straight and curved, explicit and tangent, right and left turns."""
+    rng = random.Random(seed)
+    legs = []
+    for row in range(count):
+        direction = 'N 45 E' if row == 0 else rng.choice(DIRECTIONS)
+        if rng.random() < 0.4:
+            radius = rng.choice((-1.0, 1.0)) * rng.uniform(20.0, 200.0)
+            legs.append(Leg(direction, 0.0, radius, rng.uniform(5.0, 150.0), row))
+        else:
+            legs.append(Leg(direction, rng.uniform(1.0, 100.0), 0.0, 0.0, row))
+    return legs
+
+
+@pytest.fixture
+def random_legs():
+    return make_legs
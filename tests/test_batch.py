@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Batch computation of traverse files, as used by the command line and the batch import."""
+import pytest
+
+from traverse.traverse_batch import compute_file, file_leg_results, is_solved
+
+CLOSED = """SP 1000.0 1000.0
+DD 90.0 100.0
+DD * 50.0
+DD 180.0 100.0
+EP 1150.0 900.0
+"""
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_compute_file_solves_from_arrays(tmp_path):
+    file_result = compute_file(write(tmp_path, 'closed.txt', CLOSED))
+    assert is_solved(file_result)
+    assert file_result.result.end == pytest.approx((1150.0, 900.0))
+    assert file_result.bearings == ['E', 'E', 'S']
+    leg_results = file_leg_results(file_result)
+    assert [leg_result.row for leg_result in leg_results] == [0, 1, 2]
+    assert leg_results[-1].end == pytest.approx(file_result.closing_point)
+
+
+@pytest.mark.parametrize('text', ["DD 90.0 100.0\n", "SP 0 0\n", "SP 0 0\nDD * 10.0\n"])
+def test_failed_files_are_not_solved(tmp_path, text):
+    file_result = compute_file(write(tmp_path, 'failed.txt', text))
+    assert file_result.failure is not None
+    assert not is_solved(file_result)
+    assert file_leg_results(file_result) == []
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Chunk-parallel parsing against the line by line parser."""
+import itertools
+
+import pytest
+
+from traverse.traverse_bench import write_synthetic_file
+from traverse.traverse_chunked import iter_chunks
+from traverse.traverse_parser import LEG_RECORDS, iter_file_records, record_to_leg
+
+
+@pytest.fixture
+def traverse_path(tmp_path):
+    path = str(tmp_path / 'large.txt')
+    write_synthetic_file(path, 3000, seed=7)
+    with open(path, 'a', encoding='utf-8') as f:
+        # Malformed and unknown lines, blank lines and a closing point after the legs
+        f.write("DD N10E not-a-number\n\nXX 1 2 3\nCV * 50\nEP 1500.0 900.0 N45E\nDD S10W 12.5")
+    return path
+
+
+def streamed(path):
+    legs = []
+    records = []
+    for record in iter_file_records(path):
+        if isinstance(record, LEG_RECORDS):
+            leg = record_to_leg(record)
+            legs.append((leg.direction, leg.distance, leg.radius, leg.arc_length))
+        else:
+            records.append(record)
+    return legs, records
+
+
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_chunks_match_streaming_parse(traverse_path, use_processes):
+    chunks = list(iter_chunks(traverse_path, workers=3, chunk_bytes=4096, use_processes=use_processes))
+    assert len(chunks) > 3
+    legs = []
+    for chunk in chunks:
+        directions, _, distances, radii, arc_lengths = chunk.columns
+        legs.extend(zip(directions, distances, radii, arc_lengths))
+    records = list(itertools.chain.from_iterable(chunk.records for chunk in chunks))
+
+    expected_legs, expected_records = streamed(traverse_path)
+    assert legs == expected_legs
+    # Line numbers, and the messages quoting them, follow the whole file
+    assert records == expected_records
+
+
+def test_chunks_cover_file_without_gaps(traverse_path):
+    chunks = list(iter_chunks(traverse_path, chunk_bytes=1000, use_processes=False))
+    assert chunks[0].start == 0
+    assert all(previous.end == chunk.start for previous, chunk in zip(chunks, chunks[1:]))
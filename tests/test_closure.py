@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Closure adjustment: the Compass rule, its batch form and the network adjustment."""
+import numpy as np
+import pytest
+
+from traverse.traverse_closure import COMPASS, TRANSIT, adjust_batches, adjust_results, adjust_traverse, misclosure
+from traverse.traverse_engine import compute_traverse
+from traverse.traverse_kernels import compute_traverse_batch
+from traverse.traverse_network import TraverseNetwork
+
+START = (100.0, 200.0)
+
+
+def closing_point_near(result, dx, dy):
+    return (result.end[0] + dx, result.end[1] + dy)
+
+
+def test_compass_adjustment_closes(random_legs):
+    result = compute_traverse(START, random_legs(40, 3))
+    closing_point = closing_point_near(result, 0.8, -0.5)
+    adjusted = adjust_traverse(result, closing_point, COMPASS)
+    assert adjusted.end == pytest.approx(closing_point)
+    assert adjusted.start == pytest.approx(START)
+    assert misclosure(adjusted, closing_point).linear == pytest.approx(0.0, abs=1e-9)
+
+
+def test_network_of_one_traverse_matches_compass(random_legs):
+    result = compute_traverse(START, random_legs(40, 4))
+    closing_point = closing_point_near(result, -0.3, 0.6)
+    network = TraverseNetwork()
+    network.hold(START)
+    network.hold(closing_point)
+    network.add_traverse(result, closing_point)
+    adjusted, = network.adjusted_results(network.adjust())
+    expected = adjust_traverse(result, closing_point, COMPASS)
+    assert np.allclose(adjusted.stations(), expected.stations(), rtol=0.0, atol=1e-8)
+
+
+@pytest.mark.parametrize('method', [COMPASS, TRANSIT])
+def test_batch_adjustment_matches_single_traverses(random_legs, method):
+    results = [compute_traverse(START, random_legs(count, seed)) for seed, count in enumerate((1, 5, 30, 12))]
+    closing_points = [closing_point_near(result, 0.1 * index, -0.2) for index, result in enumerate(results)]
+    closing_points[2] = None # No closing point: left as computed
+    adjusted = adjust_results(results + [None], closing_points + [(0.0, 0.0)], method)
+
+    assert adjusted[2] is results[2]
+    assert adjusted[-1] is None
+    for result, closing_point, batch_result in zip(results, closing_points, adjusted):
+        if closing_point is None:
+            continue
+        expected = adjust_traverse(result, closing_point, method)
+        assert np.allclose(batch_result.stations(), expected.stations(), rtol=0.0, atol=1e-9)
+
+
+def test_batch_results_adjust_like_engine_results(random_legs):
+    legs = [random_legs(count, seed) for seed, count in enumerate((5, 30, 12))]
+    results = [compute_traverse(START, traverse_legs) for traverse_legs in legs]
+    batches = [compute_traverse_batch(START, traverse_legs) for traverse_legs in legs]
+    closing_points = [closing_point_near(result, 0.3, -0.1 * index) for index, result in enumerate(results)]
+    for batch, expected in zip(adjust_batches(batches, closing_points), adjust_results(results, closing_points)):
+        assert np.allclose(batch.stations(), expected.stations(), rtol=0.0, atol=1e-8)
+    assert misclosure(batches[1], closing_points[1]) == pytest.approx(misclosure(results[1], closing_points[1]))
+
+    network = TraverseNetwork()
+    network.hold(START)
+    network.hold(closing_points[1])
+    network.add_batch(batches[1], closing_points[1])
+    adjusted, = network.adjusted_results(network.adjust())
+    expected = adjust_traverse(results[1], closing_points[1], COMPASS)
+    assert np.allclose(adjusted.stations(), expected.stations(), rtol=0.0, atol=1e-8)
+
+
+def test_network_merges_stations_across_grid_cells():
+    network = TraverseNetwork(tolerance=0.01)
+    # 0.001 apart, on either side of a multiple of the tolerance
+    first = network.station((100.0095, 50.0))
+    assert network.station((100.0105, 50.0)) == first
+    assert network.station((100.0095, 49.9999)) == first
+    assert network.station((100.03, 50.0)) != first
+    assert network.station_count == 2
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""Collection of per-row diagnostics."""
+from traverse.traverse_diagnostics import Diagnostics
+from traverse.traverse_engine import INFO, WARNING, Issue
+
+
+def test_issues_are_recorded_once_per_row_and_level():
+    diagnostics = Diagnostics("Draw")
+    issues = [Issue(2, WARNING, "Skipping incomplete row 3."), Issue(4, INFO, "Row 5: Drawn as curve.")]
+    diagnostics.add_issues(issues, (WARNING,))
+    diagnostics.add_issues(issues)
+    assert [(entry.level, entry.row) for entry in diagnostics] == [(WARNING, 2), (INFO, 4)]
+    assert diagnostics.summary() == "1 warning, 1 note"
+
+
+def test_file_lines_are_kept_apart_from_rows():
+    diagnostics = Diagnostics("Import")
+    diagnostics.warning("Skipping line 7: Malformed numeric data for DD.", line=7)
+    entry, = diagnostics
+    assert entry.row is None and entry.line == 7
+    assert diagnostics.rows(WARNING) == set()
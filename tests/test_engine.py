@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Tests of the scalar traverse engine."""
+import math
+
+import pytest
+
+from traverse.traverse_engine import Leg, compute_traverse
+
+RADIUS = 100.0
+QUARTER_ARC = math.pi * RADIUS / 2.0
+
+
+@pytest.mark.parametrize('radius, exit_azimuth, end_x', [
+    (RADIUS, 90.0, RADIUS),     # Right turn: heading north, leaving east
+    (-RADIUS, 270.0, -RADIUS),  # Left turn: heading north, leaving west
+])
+def test_quarter_curve_exit_tangent(radius, exit_azimuth, end_x):
+    result = compute_traverse((0.0, 0.0), [Leg('0', 0.0, radius, QUARTER_ARC)])
+    leg_result, = result.legs
+    assert leg_result.exit_azimuth == pytest.approx(exit_azimuth)
+    assert leg_result.end == pytest.approx((end_x, RADIUS))
+
+
+@pytest.mark.parametrize('radius, heading', [(RADIUS, 90.0), (-RADIUS, 270.0)])
+def test_tangent_leg_continues_curve_exit(radius, heading):
+    legs = [Leg('0', 0.0, radius, QUARTER_ARC), Leg('*', 10.0)]
+    result = compute_traverse((0.0, 0.0), legs)
+    curve, straight = result.legs
+    assert straight.start_azimuth == pytest.approx(heading)
+    assert straight.end[0] - curve.end[0] == pytest.approx(10.0 * math.sin(math.radians(heading)))
+    assert straight.end[1] == pytest.approx(curve.end[1])
+
+
+def test_first_tangent_leg_is_skipped():
+    result = compute_traverse((0.0, 0.0), [Leg('*', 10.0), Leg('N 45 E', 10.0)])
+    assert [leg_result.row for leg_result in result.legs] == [1]
+    assert [issue.row for issue in result.issues if issue.level == 'warning'] == [0]
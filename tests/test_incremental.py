@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""The incremental traverse kept up to date through table edits, against full re-computes."""
+import random
+
+import numpy as np
+import pytest
+
+from traverse.traverse_engine import compute_traverse
+from traverse.traverse_incremental import IncrementalTraverse, PrefixSums
+from traverse.traverse_store import SegmentStore
+
+START = (500.0, 500.0)
+
+
+def leg_rows(legs):
+    return [(leg.direction, leg.distance, leg.radius, leg.arc_length) for leg in legs]
+
+
+def assert_matches_full_computation(live, store):
+    result = live.result()
+    expected = compute_traverse(START, store.legs())
+    assert [leg_result.row for leg_result in result.legs] == [leg_result.row for leg_result in expected.legs]
+    assert np.allclose(result.stations(), expected.stations(), rtol=0.0, atol=1e-8)
+    assert live.end == pytest.approx(expected.end, abs=1e-8)
+    fresh = IncrementalTraverse(store, START).result()
+    assert [(issue.row, issue.level) for issue in result.issues] == [(issue.row, issue.level) for issue in fresh.issues]
+
+
+def test_random_edits(random_legs):
+    rng = random.Random(1)
+    rows = leg_rows(random_legs(400, 2))
+    store = SegmentStore()
+    store.extend(rows[:200])
+    live = IncrementalTraverse(store, START)
+    assert_matches_full_computation(live, store)
+
+    for _ in range(200):
+        action = rng.random()
+        if action < 0.4:
+            row = rng.randrange(len(store))
+            column = rng.randrange(4)
+            # Now and then a cleared distance leaves the row incomplete
+            value = '' if column == 1 and rng.random() < 0.2 else rng.choice(rows)[column]
+            store.set_value(row, column, value)
+            live.rows_changed(row)
+        elif action < 0.6:
+            first = rng.randint(0, len(store))
+            count = rng.randint(1, 3)
+            store.insert_empty(first, count)
+            live.rows_inserted(first, count)
+            for row in range(first, first + count):
+                for column, value in enumerate(rng.choice(rows)):
+                    store.set_value(row, column, value)
+            live.rows_changed(first, first + count - 1)
+        elif action < 0.8:
+            first = len(store)
+            store.extend(rng.sample(rows, rng.randint(1, 5)))
+            live.rows_inserted(first, len(store) - first)
+        elif len(store) > 1:
+            first = rng.randrange(len(store))
+            count = min(rng.randint(1, 3), len(store) - first)
+            store.remove(first, count)
+            live.rows_removed(first, count)
+        assert_matches_full_computation(live, store)
+
+
+def test_suspended_traverse_catches_up_on_resume(random_legs):
+    store = SegmentStore()
+    live = IncrementalTraverse(store, START)
+    live.suspend()
+    for legs in (random_legs(50, 3), random_legs(50, 4)):
+        first = len(store)
+        store.extend(leg_rows(legs))
+        live.rows_inserted(first, len(legs))
+    assert len(live) == 0
+    live.resume()
+    assert_matches_full_computation(live, store)
+
+
+def test_prefix_sums_extend_matches_rebuild():
+    rng = random.Random(5)
+    values = [rng.uniform(-10.0, 10.0) for _ in range(37)]
+    extended = PrefixSums(values[:10])
+    extended.extend(values[10:])
+    extended.set(20, 3.5)
+    values[20] = 3.5
+    rebuilt = PrefixSums(values)
+    for count in range(len(values) + 1):
+        assert extended.prefix(count) == pytest.approx(rebuilt.prefix(count))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""The vectorized kernels against the scalar engine."""
+import random
+
+import numpy as np
+import pytest
+
+from traverse.traverse_engine import Leg, arc_vertices, compute_traverse, convert_azimuth_to_bearing_string
+from traverse.traverse_closure import shift_stations
+from traverse.traverse_kernels import (
+    batch_leg_results, batch_vertex_arrays, compute_traverse_batch, compute_traverse_vectorized, format_bearings,
+    leg_vertex_arrays,
+)
+
+START = (1000.0, 2000.0)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_vectorized_traverse_matches_engine(random_legs, seed):
+    legs = random_legs(300, seed)
+    legs[7] = legs[7]._replace(direction='not a direction')
+    expected = compute_traverse(START, legs)
+    result = compute_traverse_vectorized(START, legs)
+
+    assert [leg_result.row for leg_result in result.legs] == [leg_result.row for leg_result in expected.legs]
+    assert np.allclose(result.stations(), expected.stations(), rtol=0.0, atol=1e-8)
+    for leg_result, reference in zip(result.legs, expected.legs):
+        assert leg_result.exit_azimuth == pytest.approx(reference.exit_azimuth, abs=1e-9)
+        assert leg_result.is_curve == reference.is_curve
+        if leg_result.is_curve:
+            assert leg_result.center == pytest.approx(reference.center, abs=1e-8)
+            assert leg_result.sweep == pytest.approx(reference.sweep, abs=1e-12)
+    # Tangent messages quote azimuths rounded to 0.01 deg, which may round differently
+    assert ([(issue.row, issue.level) for issue in result.issues]
+            == [(issue.row, issue.level) for issue in expected.issues])
+
+
+def test_vertex_arrays_match_scalar_arc(random_legs):
+    for leg_result in compute_traverse(START, random_legs(50, 1)).legs:
+        xs, ys = leg_vertex_arrays(leg_result)
+        assert (xs[0], ys[0]) == leg_result.start
+        assert (xs[-1], ys[-1]) == leg_result.end
+        if leg_result.is_curve:
+            points = arc_vertices(leg_result.center, leg_result.leg.radius, leg_result.start_angle, leg_result.sweep)
+            assert np.allclose(xs[1:-1], [x for x, _ in points[:-1]])
+            assert np.allclose(ys[1:-1], [y for _, y in points[:-1]])
+
+
+@pytest.mark.parametrize('densify_options', [{}, {'max_deviation': 0.01}, {'max_segment_length': 3.0}])
+def test_batch_vertex_arrays_match_leg_by_leg(random_legs, densify_options):
+    legs = random_legs(200, 2)
+    batch = compute_traverse_batch(START, legs)
+    xs, ys, offsets = batch_vertex_arrays(batch, **densify_options)
+    leg_results = batch_leg_results(legs, batch)
+    assert len(offsets) == len(leg_results) + 1
+    for leg_result, first, end in zip(leg_results, offsets[:-1], offsets[1:]):
+        expected_xs, expected_ys = leg_vertex_arrays(leg_result, **densify_options)
+        assert np.allclose(xs[first:end], expected_xs, rtol=0.0, atol=1e-8)
+        assert np.allclose(ys[first:end], expected_ys, rtol=0.0, atol=1e-8)
+        assert (xs[end - 1], ys[end - 1]) == leg_result.end
+
+
+def test_shifted_batch_matches_shift_stations(random_legs):
+    legs = random_legs(60, 5)
+    batch = compute_traverse_batch(START, legs)
+    rng = np.random.default_rng(0)
+    shift_xs, shift_ys = rng.normal(size=len(batch) + 1), rng.normal(size=len(batch) + 1)
+    expected = shift_stations(compute_traverse_vectorized(START, legs), shift_xs, shift_ys)
+    shifted = batch_leg_results(legs, batch.shifted(shift_xs, shift_ys))
+    for leg_result, reference in zip(shifted, expected.legs):
+        assert leg_result.start == pytest.approx(reference.start, abs=1e-9)
+        assert leg_result.end == pytest.approx(reference.end, abs=1e-9)
+        if reference.is_curve:
+            assert leg_result.center == pytest.approx(reference.center, abs=1e-9)
+
+
+def test_format_bearings_matches_scalar_formatter():
+    rng = random.Random(0)
+    azimuths = [rng.uniform(0.0, 360.0) for _ in range(2000)]
+    # Cardinals, values rounding up to the next second, minute and degree, and out of range input
+    azimuths += [0.0, 90.0, 180.0, 270.0, 360.0, 45.0, 44.99999, 89.99999, 179.99999, 359.99999,
+                 10.0 + 59.9999 / 3600.0, 0.00005, -30.0, 725.5]
+    assert format_bearings(azimuths) == [convert_azimuth_to_bearing_string(azimuth) for azimuth in azimuths]
+
+
+def test_format_bearings_of_nan_is_empty():
+    assert format_bearings([float('nan'), 90.0]) == ["", "E"]
+
+
+def test_vectorized_traverse_without_legs():
+    result = compute_traverse_vectorized(START, [])
+    assert result.legs == [] and result.issues == []
+    assert compute_traverse_vectorized(START, [Leg('*', 10.0)]).legs == []
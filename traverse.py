@@ -21,16 +21,24 @@
  * *
  ***************************************************************************/
 """
+import time
+_IMPORT_STARTED = time.perf_counter() # Start of the classFactory/initGui startup path
+
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, Qt
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction
+from qgis.core import Qgis, QgsApplication, QgsMessageLog
 # Initialize Qt resources from file resources.py
 from .resources import *
 
-# Import the code for the DockWidget
-from .traverse_dockwidget import traverseDockWidget
+# The dock widget (and its form) is imported on first use, in run(), and the
+# Processing provider in initProcessing()
 import os.path
 
+# Time QGIS may spend loading the plugin (module import, constructor and
+# initGui) before a warning is logged, in milliseconds
+STARTUP_BUDGET_MS = 150
+
 
 class traverse:
     """QGIS Plugin Implementation."""
@@ -50,7 +58,7 @@ class traverse:
         self.plugin_dir = os.path.dirname(__file__)
 
         # initialize locale
-        locale = QSettings().value('locale/userLocale')[0:2]
+        locale = (QSettings().value('locale/userLocale') or '')[0:2]
         locale_path = os.path.join(
             self.plugin_dir,
             'i18n',
@@ -64,11 +72,17 @@ class traverse:
         # Declare instance attributes
         self.actions = []
         self.menu = self.tr(u'&Traverse')
-        self.toolbar = self.iface.pluginToolBar()
-        self.toolbar.setObjectName(u'traverse')
+        # qgis_process loads the plugin without a GUI (iface is None) and
+        # only calls initProcessing
+        self.toolbar = None
+        if self.iface is not None:
+            self.toolbar = self.iface.pluginToolBar()
+            self.toolbar.setObjectName(u'traverse')
 
         self.pluginIsActive = False
         self.dockwidget = None
+        self.provider = None
+        self.startup_ms = (time.perf_counter() - _IMPORT_STARTED) * 1000.0
 
 
     # noinspection PyMethodMayBeStatic
@@ -161,8 +175,16 @@ class traverse:
         return action
 
 
+    def initProcessing(self):
+        """Registers the Processing provider holding the traverse algorithms."""
+        from .traverse_provider import TraverseProvider
+        self.provider = TraverseProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
+        started = time.perf_counter()
+        self.initProcessing()
 
         # IMPORTANT: Use the correct path for your icon as defined in resources.qrc
         # Assuming your icons are in a folder named 'icons' and prefix is 'plugins/traverse'
@@ -174,6 +196,12 @@ class traverse:
             parent=self.iface.mainWindow(),
             status_tip=self.tr(u'Open Traverse Plugin Dock Widget'))
 
+        self.startup_ms += (time.perf_counter() - started) * 1000.0
+        if self.startup_ms > STARTUP_BUDGET_MS:
+            QgsMessageLog.logMessage(
+                f"Loading the plugin took {self.startup_ms:.0f} ms, over its {STARTUP_BUDGET_MS} ms startup budget.",
+                'Traverse', Qgis.Warning)
+
 
     def onClosePlugin(self):
         """Cleanup necessary items here when plugin dockwidget is closed"""
@@ -199,8 +227,14 @@ class traverse:
                 action)
             self.iface.removeToolBarIcon(action)
 
+        if self.provider is not None:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
+
         # Ensure dockwidget is also cleaned up if it's still present when the plugin unloads
         if self.dockwidget:
+            # unload does not go through closeEvent
+            self.dockwidget.shutdown()
             self.iface.removeDockWidget(self.dockwidget)
             self.dockwidget.deleteLater()
             self.dockwidget = None
@@ -213,6 +247,9 @@ class traverse:
             self.pluginIsActive = True
 
             if self.dockwidget is None: # Use 'is None' for clearer check
+                # Deferred import: compiling the dock's form only happens once it is opened
+                from .traverse_dockwidget import traverseDockWidget
+
                 # Create the dockwidget and pass the main window as parent
                 self.dockwidget = traverseDockWidget(self.iface.mainWindow())
 
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Processing algorithms of the Traverse plugin.
+
+They wrap the same engine, parser and geometry code as the dock widget, so
+traverses can be computed from graphical models, in batch mode and with
+``qgis_process`` on a headless server.  Processing runs them on a
+background thread; they only use ``qgis.core``.  The provider is loaded
+while QGIS starts, so the modules pulling in NumPy are only imported once
+an algorithm runs.
+"""
+import csv
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (
+    QgsFeature, QgsFeatureSink, QgsFields, QgsGeometry, QgsPointXY, QgsProcessing, QgsProcessingAlgorithm,
+    QgsProcessingException, QgsProcessingOutputNumber, QgsProcessingParameterBoolean,
+    QgsProcessingParameterCrs, QgsProcessingParameterFeatureSink, QgsProcessingParameterFile,
+    QgsProcessingParameterNumber, QgsProcessingParameterPoint, QgsWkbTypes,
+)
+
+from .traverse_engine import INFO, TraverseError, leg_from_strings
+
+# Accepted header names of the CSV table columns, lower case
+CSV_COLUMNS = {
+    'direction': ('direction', 'bearing', 'azimuth'),
+    'distance': ('distance', 'length'),
+    'radius': ('radius',),
+    'arc_length': ('arc_length', 'arc length', 'arc'),
+}
+
+
+class TraverseAlgorithm(QgsProcessingAlgorithm):
+    """Shared plumbing of the traverse algorithms."""
+
+    INPUT = 'INPUT'
+    CRS = 'CRS'
+    MAX_DEVIATION = 'MAX_DEVIATION'
+    TRUE_ARCS = 'TRUE_ARCS'
+    OUTPUT = 'OUTPUT'
+    END_X = 'END_X'
+    END_Y = 'END_Y'
+    EXIT_AZIMUTH = 'EXIT_AZIMUTH'
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return type(self)()
+
+    def group(self):
+        return self.tr('Traverse')
+
+    def groupId(self):
+        return 'traverse'
+
+    def add_output_numbers(self):
+        self.addOutput(QgsProcessingOutputNumber(self.END_X, self.tr('Closing point X')))
+        self.addOutput(QgsProcessingOutputNumber(self.END_Y, self.tr('Closing point Y')))
+        self.addOutput(QgsProcessingOutputNumber(self.EXIT_AZIMUTH, self.tr('Exit azimuth (degrees)')))
+
+    def add_line_parameters(self):
+        self.addParameter(QgsProcessingParameterCrs(self.CRS, self.tr('Coordinate reference system'), 'ProjectCrs'))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.MAX_DEVIATION, self.tr('Maximum chord-to-arc deviation (0 for a fixed number of segments per curve)'),
+            QgsProcessingParameterNumber.Double, 0.0, False, 0.0))
+        self.addParameter(QgsProcessingParameterBoolean(
+            self.TRUE_ARCS, self.tr('Write curves as circular arcs'), False))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Traverse lines'), QgsProcessing.TypeVectorLine))
+
+    def write_lines(self, parameters, context, feedback, start, legs):
+        """
+        Solves ``legs`` from ``start``, writes one line per solved leg to the
+        OUTPUT sink and returns the algorithm results.
+        """
+        from .traverse_geometry import leg_geometry
+        from .traverse_kernels import (
+            batch_issues, batch_leg_results, batch_leg_vertices, compute_traverse_batch, format_bearings,
+        )
+        from .traverse_writer import TraverseFeatureFactory, traverse_fields
+
+        fields = traverse_fields()
+        crs = self.parameterAsCrs(parameters, self.CRS, context)
+        use_true_arcs = self.parameterAsBool(parameters, self.TRUE_ARCS, context)
+        wkb_type = QgsWkbTypes.CompoundCurve if use_true_arcs else QgsWkbTypes.LineString
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, fields, wkb_type, crs)
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+
+        max_deviation = self.parameterAsDouble(parameters, self.MAX_DEVIATION, context)
+        densify_options = {'max_deviation': max_deviation} if max_deviation > 0 else {}
+
+        legs = list(legs)
+        batch = compute_traverse_batch(start, legs)
+        self.report_issues(batch_issues(legs, batch), feedback)
+
+        # The features need LegResults; the line vertices come from the batch arrays
+        leg_results = batch_leg_results(legs, batch)
+        bearings = format_bearings(batch.start_azimuths)
+        vertices = [None] * len(leg_results) if use_true_arcs else batch_leg_vertices(batch, **densify_options)
+        factory = TraverseFeatureFactory(fields)
+        total = max(len(leg_results), 1)
+        for count, (leg_result, bearing, leg_vertices) in enumerate(zip(leg_results, bearings, vertices), 1):
+            if feedback.isCanceled():
+                break
+            geometry = leg_geometry(leg_result, use_true_arcs, densify_options, leg_vertices)
+            sink.addFeature(factory.feature(leg_result, geometry, bearing), QgsFeatureSink.FastInsert)
+            feedback.setProgress(100.0 * count / total)
+        if feedback.isCanceled():
+            # A truncated layer must not look like a finished run
+            return {}
+
+        return dict(self.closing_results(batch), **{self.OUTPUT: dest_id})
+
+    def closing_results(self, batch):
+        end_x, end_y = batch.end
+        return {self.END_X: end_x, self.END_Y: end_y, self.EXIT_AZIMUTH: batch.exit_azimuth}
+
+    def report_issues(self, issues, feedback):
+        for issue in issues:
+            if issue.level != INFO:
+                feedback.reportError(issue.message)
+
+    def read_file(self, parameters, context, feedback):
+        """Reads the INPUT traverse file, reporting skipped lines. Returns a TraverseFile."""
+        from .traverse_parser import read_traverse_file
+
+        path = self.parameterAsFile(parameters, self.INPUT, context)
+        try:
+            traverse_file = read_traverse_file(path)
+        except OSError as e:
+            raise QgsProcessingException(self.tr('Could not read {}: {}').format(path, e))
+        for record in traverse_file.errors:
+            feedback.reportError(record.message)
+        if traverse_file.start_point is None:
+            raise QgsProcessingException(self.tr('The traverse file has no start point (SP) record.'))
+        return traverse_file
+
+
+class TraverseFileToLines(TraverseAlgorithm):
+    """Draws a DT/DU/SP/EP/DD/CV traverse file as lines."""
+
+    def name(self):
+        return 'traversefiletolines'
+
+    def displayName(self):
+        return self.tr('Traverse file to lines')
+
+    def shortHelpString(self):
+        return self.tr('Computes a traverse file (SP start point, DD straight legs, CV curves) '
+                       'and writes one line per leg with its bearing, distance, radius and arc length.')
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFile(
+            self.INPUT, self.tr('Traverse file'), QgsProcessingParameterFile.File, 'txt'))
+        self.add_line_parameters()
+        self.add_output_numbers()
+
+    def processAlgorithm(self, parameters, context, feedback):
+        traverse_file = self.read_file(parameters, context, feedback)
+        return self.write_lines(parameters, context, feedback, traverse_file.start_point, traverse_file.legs)
+
+
+class ComputeClosingPoint(TraverseAlgorithm):
+    """Reports where a traverse file ends and the azimuth it ends on."""
+
+    def name(self):
+        return 'computeclosingpoint'
+
+    def displayName(self):
+        return self.tr('Compute closing point')
+
+    def shortHelpString(self):
+        return self.tr('Computes the coordinates reached at the end of a traverse file and '
+                       'the azimuth of its last leg. Optionally writes the closing point as a point layer.')
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFile(
+            self.INPUT, self.tr('Traverse file'), QgsProcessingParameterFile.File, 'txt'))
+        self.addParameter(QgsProcessingParameterCrs(self.CRS, self.tr('Coordinate reference system'), 'ProjectCrs'))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Closing point'), QgsProcessing.TypeVectorPoint, optional=True,
+            createByDefault=False))
+        self.add_output_numbers()
+
+    def processAlgorithm(self, parameters, context, feedback):
+        from .traverse_kernels import batch_issues, compute_traverse_batch
+
+        traverse_file = self.read_file(parameters, context, feedback)
+        batch = compute_traverse_batch(traverse_file.start_point, traverse_file.legs)
+        self.report_issues(batch_issues(traverse_file.legs, batch), feedback)
+        results = self.closing_results(batch)
+
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, QgsFields(),
+                                             QgsWkbTypes.Point, self.parameterAsCrs(parameters, self.CRS, context))
+        if sink is not None:
+            feat = QgsFeature()
+            feat.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(results[self.END_X], results[self.END_Y])))
+            sink.addFeature(feat, QgsFeatureSink.FastInsert)
+            results[self.OUTPUT] = dest_id
+        return results
+
+
+class TraverseTableToLines(TraverseAlgorithm):
+    """Draws a traverse table saved as CSV (direction, distance, radius, arc length) as lines."""
+
+    START = 'START'
+
+    def name(self):
+        return 'traversetabletolines'
+
+    def displayName(self):
+        return self.tr('Traverse table (CSV) to lines')
+
+    def shortHelpString(self):
+        return self.tr('Computes a traverse from a CSV table with direction, distance, radius and '
+                       'arc_length columns, starting at the given point. A direction of "*" '
+                       'continues tangent to the previous leg.')
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFile(
+            self.INPUT, self.tr('Traverse table'), QgsProcessingParameterFile.File, 'csv'))
+        self.addParameter(QgsProcessingParameterPoint(self.START, self.tr('Start point')))
+        self.add_line_parameters()
+        self.add_output_numbers()
+
+    def processAlgorithm(self, parameters, context, feedback):
+        path = self.parameterAsFile(parameters, self.INPUT, context)
+        crs = self.parameterAsCrs(parameters, self.CRS, context)
+        start_point = self.parameterAsPoint(parameters, self.START, context, crs)
+        legs = read_csv_legs(path, feedback)
+        return self.write_lines(parameters, context, feedback, (start_point.x(), start_point.y()), legs)
+
+
+def read_csv_legs(path, feedback=None):
+    """Reads the legs of a CSV traverse table; bad rows are reported and skipped."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None:
+            raise QgsProcessingException(f"{path} is empty.")
+        headers = {name.strip().lower(): name for name in reader.fieldnames}
+        columns = {}
+        for column, aliases in CSV_COLUMNS.items():
+            columns[column] = next((headers[alias] for alias in aliases if alias in headers), None)
+        if columns['direction'] is None or columns['distance'] is None:
+            raise QgsProcessingException(f"{path} needs at least a direction and a distance column.")
+
+        legs = []
+        for row, record in enumerate(reader):
+            values = {column: (record.get(name) or "") if name else "" for column, name in columns.items()}
+            if not values['distance'].strip() and values['radius'].strip() and values['arc_length'].strip():
+                values['distance'] = "0" # Curves only need their radius and arc length
+            try:
+                legs.append(leg_from_strings(row, values['direction'], values['distance'],
+                                             values['radius'], values['arc_length']))
+            except TraverseError as te:
+                if feedback is not None:
+                    feedback.reportError(str(te))
+        return legs
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Batch computation of many traverse files.
+
+Every file is parsed and solved independently by :func:`compute_file`, so
+:func:`iter_batch` spreads the files over a pool of worker processes (one
+per core by default) and yields the results as they complete.
+
+Worker processes are only used from a standalone Python interpreter, such
+as the command line tool.  Embedded in an application (QGIS), spawning
+re-runs the application's own executable and forking copies a
+multithreaded process, so :func:`processes_available` says no and a thread
+pool is used instead.  A thread pool also takes over when a process pool
+breaks.
+
+Nothing in here imports Qt or QGIS, so the worker processes only load the
+engine, kernels and parser.
+"""
+import glob
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .traverse_engine import INFO, parse_direction
+from .traverse_kernels import batch_issues, batch_leg_results, compute_traverse_batch, format_bearings
+from .traverse_parser import read_traverse_file
+
+DEFAULT_PATTERN = '*.txt'
+
+# Outcome of one file: ``result`` is the kernels' BatchResult (None on
+# failure) and ``legs`` the parsed legs its ``rows`` index, ``bearings`` the
+# effective direction of each solved leg, ``errors`` the messages of skipped
+# lines and legs, ``closing_point`` the EP record and ``closing_azimuth`` the
+# direction given with it (None when absent).  Callers that need
+# LegResults build them with :func:`file_leg_results`.
+FileResult = namedtuple('FileResult', 'path result legs bearings errors failure closing_point closing_azimuth')
+
+
+def find_traverse_files(location, pattern=DEFAULT_PATTERN):
+    """
+    Files to import from ``location``: a directory (matched against
+    ``pattern``), a glob such as ``/data/*.trv``, or a single file.
+    """
+    if os.path.isdir(location):
+        location = os.path.join(location, pattern)
+    elif os.path.isfile(location):
+        return [location]
+    return sorted(path for path in glob.glob(location) if os.path.isfile(path))
+
+
+def processes_available():
+    """
+    Whether worker processes can be started: only from a plain Python
+    interpreter, never inside QGIS or another embedding application.
+    """
+    if 'qgis.core' in sys.modules:
+        return False
+    executable = os.path.basename(sys.executable or '').lower()
+    return executable.startswith('python')
+
+
+def compute_file(path):
+    """Parses and solves one traverse file. Never raises; failures are returned."""
+    try:
+        traverse_file = read_traverse_file(path)
+        errors = [record.message for record in traverse_file.errors]
+        closing_point = traverse_file.end_point
+        closing_azimuth = None
+        if traverse_file.closing_direction is not None:
+            try:
+                closing_azimuth = parse_direction(traverse_file.closing_direction)
+            except ValueError:
+                errors.append(f"Ignoring closing direction '{traverse_file.closing_direction}': not a valid direction")
+        legs = traverse_file.legs
+        if traverse_file.start_point is None:
+            return FileResult(path, None, legs, [], errors, "No start point (SP) record", closing_point, closing_azimuth)
+        if not legs:
+            return FileResult(path, None, legs, [], errors, "No DD or CV records", closing_point, closing_azimuth)
+
+        batch = compute_traverse_batch(traverse_file.start_point, legs)
+        errors.extend(issue.message for issue in batch_issues(legs, batch) if issue.level != INFO)
+        if not len(batch):
+            return FileResult(path, batch, legs, [], errors, "No leg could be solved", closing_point, closing_azimuth)
+        return FileResult(path, batch, legs, format_bearings(batch.start_azimuths), errors, None,
+                          closing_point, closing_azimuth)
+    except Exception as e:
+        return FileResult(path, None, [], [], [], str(e), None, None)
+
+
+def is_solved(file_result):
+    """Whether a :class:`FileResult` holds a solved traverse (at least one leg)."""
+    return file_result.failure is None and file_result.result is not None
+
+
+def file_leg_results(file_result):
+    """The LegResults of the solved legs of a :class:`FileResult` (empty when it failed)."""
+    if not is_solved(file_result):
+        return []
+    return batch_leg_results(file_result.legs, file_result.result)
+
+
+def _run_pool(executor_class, paths, workers, is_canceled):
+    with executor_class(max_workers=workers) as executor:
+        futures = [executor.submit(compute_file, path) for path in paths]
+        try:
+            for future in as_completed(futures):
+                if is_canceled is not None and is_canceled():
+                    return
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def iter_batch(paths, workers=None, use_processes=None, is_canceled=None):
+    """
+    Generator yielding a :class:`FileResult` for every path, in completion
+    order. ``workers`` defaults to the number of cores; ``use_processes``
+    defaults to :func:`processes_available`; ``is_canceled`` is polled
+    between files to stop early.
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(paths) or 1))
+    if use_processes is None:
+        use_processes = processes_available()
+
+    if use_processes and workers > 1:
+        done = set()
+        try:
+            for file_result in _run_pool(ProcessPoolExecutor, paths, workers, is_canceled):
+                done.add(file_result.path)
+                yield file_result
+            return
+        except (BrokenProcessPool, OSError, RuntimeError):
+            # Worker processes could not start: finish the rest on threads
+            paths = [path for path in paths if path not in done]
+
+    for file_result in _run_pool(ThreadPoolExecutor, paths, workers, is_canceled):
+        yield file_result
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the traverse pipeline on synthetic traverse files.
+
+    python -m traverse.traverse_bench [--sizes 100 1000 10000 100000 1000000]
+                                      [--repeat N] [--output results.json]
+                                      [--compare baseline.json] [--threshold 1.25]
+
+For every size a traverse file is generated (mixed DD and CV records,
+tangent ``*`` legs, quadrant DMS bearings and decimal azimuths) and each
+stage of the pipeline is timed on it: parsing (line by line and in
+memory-mapped chunks on worker processes), bearing conversion,
+coordinate propagation and arc densification (engine and vectorized kernel),
+QGIS feature construction and export formatting.  The best of ``repeat``
+runs is kept.  With QGIS available, the time a fresh interpreter takes to
+import the plugin's entry module (the classFactory path) is recorded too.
+
+Results are written as JSON, together with the plugin, Python and NumPy
+versions, so runs of different versions can be compared with
+``--compare``, which flags every stage that got slower than
+``--threshold`` times its baseline (by more than a few milliseconds) and
+exits with status 1.  Everything
+runs headless; the feature construction stage is skipped when ``qgis`` is
+not importable.
+"""
+import argparse
+import configparser
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from . import traverse_engine
+from .traverse_chunked import iter_chunks
+from .traverse_engine import compute_traverse
+from .traverse_kernels import (
+    batch_vertex_arrays, format_bearings, leg_vertex_arrays, legs_to_arrays, propagate_traverse,
+)
+from .traverse_parser import format_leg_lines, read_traverse_file
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 1.25
+# Slowdowns smaller than this are timer noise, whatever their ratio
+MIN_REGRESSION_SECONDS = 0.005
+RESULTS_SCHEMA = 1
+
+# Shares of the synthetic legs that are curves, tangent, and given in DMS
+CURVE_SHARE = 0.2
+TANGENT_SHARE = 0.25
+DMS_SHARE = 0.5
+# Chord tolerance used by the densification stage
+BENCH_MAX_DEVIATION = 0.01
+
+
+def generate_traverse_lines(leg_count, seed=0):
+    """
+    Yields the lines of a synthetic traverse file with ``leg_count`` legs.
+    The same ``seed`` always gives the same file.
+    """
+    rng = np.random.default_rng(seed)
+    azimuths = rng.uniform(0.0, 360.0, leg_count)
+    is_curve = rng.random(leg_count) < CURVE_SHARE
+    is_tangent = rng.random(leg_count) < TANGENT_SHARE
+    is_tangent[:1] = False # The first leg needs an explicit direction
+    use_dms = rng.random(leg_count) < DMS_SHARE
+    distances = rng.uniform(1.0, 200.0, leg_count)
+    radii = rng.uniform(20.0, 500.0, leg_count) * rng.choice((-1.0, 1.0), leg_count)
+    arc_lengths = rng.uniform(0.05, 0.5, leg_count) * np.abs(radii)
+    bearings = format_bearings(azimuths)
+
+    yield "DT QB"
+    yield "DU DMS"
+    yield "SP 1000.000000 1000.000000"
+    for index in range(leg_count):
+        if is_tangent[index]:
+            direction = "*"
+        elif use_dms[index]:
+            direction = bearings[index]
+        else:
+            direction = f"{azimuths[index]:.6f}"
+        if is_curve[index]:
+            yield f"CV {direction} {radii[index]:.3f} {arc_lengths[index]:.3f}"
+        else:
+            yield f"DD {direction} {distances[index]:.3f}"
+
+
+def write_synthetic_file(path, leg_count, seed=0):
+    """Writes a synthetic traverse file of ``leg_count`` legs to ``path``."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in generate_traverse_lines(leg_count, seed):
+            f.write(line + "\n")
+    return path
+
+
+def time_stage(function, repeat):
+    """Runs ``function`` ``repeat`` times. Returns (best, median) seconds and the last output."""
+    timings = []
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings), output
+
+
+def _clear_caches():
+    """Forgets parsed directions so every run converts them again."""
+    traverse_engine._parse_normalized_direction.cache_clear()
+
+
+def _feature_stage(result):
+    """The feature construction stage, or None when QGIS is not importable."""
+    try:
+        from .traverse_geometry import leg_geometry
+        from .traverse_writer import TraverseFeatureFactory, traverse_fields
+    except ImportError:
+        return None
+    factory = TraverseFeatureFactory(traverse_fields())
+    densify_options = {'max_deviation': BENCH_MAX_DEVIATION}
+
+    def build_features():
+        return [factory.feature(leg_result, leg_geometry(leg_result, False, densify_options))
+                for leg_result in result.legs]
+    return build_features
+
+
+def benchmark_file(path, leg_count, repeat=DEFAULT_REPEAT):
+    """Times every stage on one traverse file. Returns a list of result dicts."""
+    records = []
+
+    def record(stage, function, clear_caches=False):
+        def run():
+            if clear_caches:
+                _clear_caches()
+            return function()
+        best, median, output = time_stage(run, repeat)
+        records.append({
+            'stage': stage,
+            'legs': leg_count,
+            'seconds': best,
+            'median_seconds': median,
+            'repeat': repeat,
+            'legs_per_second': leg_count / best if best > 0 else None,
+        })
+        return output
+
+    traverse_file = record('parse', lambda: read_traverse_file(path))
+    record('parse_chunked', lambda: list(iter_chunks(path)), clear_caches=True)
+    legs = traverse_file.legs
+    start = traverse_file.start_point
+    arrays = record('bearing_conversion', lambda: legs_to_arrays(legs), clear_caches=True)
+    result = record('propagate', lambda: compute_traverse(start, legs))
+    batch = record('propagate_vectorized', lambda: propagate_traverse(start, *arrays))
+    record('densify', lambda: [leg_vertex_arrays(leg_result, max_deviation=BENCH_MAX_DEVIATION)
+                               for leg_result in result.legs])
+    record('densify_vectorized', lambda: batch_vertex_arrays(batch, max_deviation=BENCH_MAX_DEVIATION))
+    build_features = _feature_stage(result)
+    if build_features is not None:
+        record('features', build_features)
+
+    def export():
+        buffer = io.StringIO()
+        for _, line in format_leg_lines(legs):
+            if line is not None:
+                buffer.write(line + "\n")
+        return buffer.getvalue()
+    record('export', export, clear_caches=True)
+    return records
+
+
+def startup_seconds():
+    """
+    Seconds a fresh interpreter takes to import the plugin's entry module
+    once QGIS itself is loaded, or None when QGIS is not importable.
+    """
+    if importlib.util.find_spec('qgis') is None:
+        return None
+    code = ("import qgis.core, qgis.gui, time; started = time.perf_counter(); "
+            f"import {__package__}.traverse; print(time.perf_counter() - started)")
+    environment = dict(os.environ)
+    plugins_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, (plugins_dir, environment.get('PYTHONPATH'))))
+    try:
+        completed = subprocess.run([sys.executable, '-c', code], env=environment,
+                                   capture_output=True, text=True, check=True)
+        return float(completed.stdout.strip().splitlines()[-1])
+    except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+        return None
+
+
+def plugin_version():
+    """The plugin version from metadata.txt, or None."""
+    metadata = configparser.ConfigParser(interpolation=None)
+    metadata.read(os.path.join(os.path.dirname(__file__), 'metadata.txt'), encoding='utf-8')
+    return metadata.get('general', 'version', fallback=None)
+
+
+def environment():
+    """Versions and platform recorded with every run."""
+    try:
+        from qgis.core import Qgis
+        qgis_version = Qgis.QGIS_VERSION
+    except ImportError:
+        qgis_version = None
+    return {
+        'plugin_version': plugin_version(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'qgis': qgis_version,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, data_dir=None, out=None):
+    """
+    Generates a file per size and benchmarks it. Returns the results
+    document (see :data:`RESULTS_SCHEMA`); progress goes to ``out``.
+    """
+    results = []
+    timings = [seconds for seconds in (startup_seconds() for _ in range(repeat)) if seconds is not None]
+    if timings:
+        results.append({'stage': 'startup_import', 'legs': 0, 'seconds': min(timings),
+                        'median_seconds': statistics.median(timings), 'repeat': len(timings),
+                        'legs_per_second': None})
+        if out is not None:
+            print(f"{'startup_import':>22} {'':>9}       {min(timings):10.4f} s", file=out)
+    if data_dir:
+        os.makedirs(data_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for leg_count in sizes:
+            path = write_synthetic_file(os.path.join(data_dir or temp_dir, f"synthetic_{leg_count}.txt"), leg_count)
+            for entry in benchmark_file(path, leg_count, repeat):
+                results.append(entry)
+                if out is not None:
+                    print(f"{entry['stage']:>22} {leg_count:>9} legs  {entry['seconds']:10.4f} s", file=out)
+    return {
+        'schema': RESULTS_SCHEMA,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': environment(),
+        'results': results,
+    }
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Pairs the results of two runs by stage and size. Returns a list of
+    ``(stage, legs, baseline_seconds, seconds, ratio, regressed)`` tuples.
+    """
+    previous = {(entry['stage'], entry['legs']): entry['seconds'] for entry in baseline['results']}
+    comparison = []
+    for entry in current['results']:
+        before = previous.get((entry['stage'], entry['legs']))
+        if before is None or before <= 0:
+            continue
+        ratio = entry['seconds'] / before
+        regressed = ratio > threshold and entry['seconds'] - before > MIN_REGRESSION_SECONDS
+        comparison.append((entry['stage'], entry['legs'], before, entry['seconds'], ratio, regressed))
+    return comparison
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m traverse.traverse_bench',
+        description="Benchmark the traverse pipeline on synthetic traverse files.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help=f"Leg counts to generate (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"Runs per stage; the best is kept (default: {DEFAULT_REPEAT})")
+    parser.add_argument('--data-dir', help="Keep the generated traverse files in this folder")
+    parser.add_argument('-o', '--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Slowdown ratio reported as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Do not print the timings")
+    return parser
+
+
+def main(argv=None):
+    """Runs the benchmarks. Returns 1 when ``--compare`` found a regression."""
+    args = build_parser().parse_args(argv)
+    out = None if args.quiet else sys.stdout
+    document = run_benchmarks(args.sizes, max(1, args.repeat), args.data_dir, out)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = 0
+        for stage, legs, before, seconds, ratio, regressed in compare_results(document, baseline, args.threshold):
+            regressions += regressed
+            marker = "  REGRESSION" if regressed else ""
+            print(f"{stage:>22} {legs:>9} legs  {before:10.4f} s -> {seconds:10.4f} s  x{ratio:.2f}{marker}")
+        if regressions:
+            print(f"{regressions} stage(s) slower than {args.threshold:g}x the baseline.", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Compute-once results of the traverse table.
+
+Every mutation of a :class:`traverse_store.SegmentStore` bumps its
+``revision``.  :class:`TraverseCache` keeps one :class:`TraverseSnapshot`
+for the current revision and start point, built from the dock's
+:class:`traverse_incremental.IncrementalTraverse`, and everything derived
+from it (legs, stations, exit tangents, bearings, misclosure, adjusted
+stations, densified vertices) is computed the first time it is asked for
+and kept until the table or the start point changes.  The preview, export,
+draw and closure reporting therefore share a single computation.
+
+A snapshot never changes once built, so it can be handed to a task and
+read on a worker thread while the table is being edited; the memoized
+values are guarded by a lock.  Nothing in here imports Qt or QGIS.
+"""
+import threading
+
+from .traverse_closure import adjust_traverse, misclosure
+from .traverse_kernels import format_bearings, leg_vertex_arrays
+from .traverse_profiler import Profiler
+
+
+def _options_key(options):
+    """Hashable form of a keyword argument dict."""
+    return tuple(sorted((options or {}).items()))
+
+
+class TraverseSnapshot(object):
+    """
+    The traverse of one table revision from one start point.
+
+    ``result`` is the :class:`traverse_engine.TraverseResult` (stations and
+    exit tangents of every solved leg); the other values are derived on
+    demand and memoized.
+    """
+
+    def __init__(self, revision, start, result, store):
+        self.revision = revision
+        self.start = start
+        self.result = result
+        self._store = store
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _memo(self, key, compute):
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        value = compute()
+        with self._lock:
+            return self._values.setdefault(key, value)
+
+    def legs(self):
+        """
+        ``(legs, problems)``: the legs of all complete rows and the messages
+        of the incomplete ones. Read from the store when the snapshot is
+        first asked, so only call this on the thread that owns the table.
+        """
+        def read():
+            if self._store.revision != self.revision:
+                raise RuntimeError("The traverse table changed after the snapshot was taken")
+            problems = []
+            legs = self._store.legs(problems)
+            return legs, problems
+        return self._memo('legs', read)
+
+    def bearings(self):
+        """The effective direction of every solved leg, formatted as quadrant bearings."""
+        return self._memo('bearings', lambda: format_bearings(
+            [leg_result.start_azimuth for leg_result in self.result.legs]))
+
+    def closure(self, closing_point, closing_azimuth=None):
+        """The :class:`traverse_closure.Misclosure` against ``closing_point``, or None without legs."""
+        if not self.result.legs:
+            return None
+        return self._memo(('closure', tuple(closing_point), closing_azimuth),
+                          lambda: misclosure(self.result, closing_point, closing_azimuth))
+
+    def adjusted(self, closing_point=None, adjustment=None):
+        """The result adjusted onto ``closing_point`` with the ``adjustment`` rule, or as computed."""
+        if closing_point is None or not adjustment or not self.result.legs:
+            return self.result
+        return self._memo(('adjusted', tuple(closing_point), adjustment),
+                          lambda: adjust_traverse(self.result, closing_point, adjustment))
+
+    def vertex_arrays(self, densify_options=None, closing_point=None, adjustment=None):
+        """
+        ``(xs, ys)`` vertex arrays of every leg of :meth:`adjusted`, curves
+        densified with ``densify_options`` (see :func:`traverse_kernels.leg_vertex_arrays`).
+        """
+        result = self.adjusted(closing_point, adjustment)
+        if result is not self.result:
+            closing_point = tuple(closing_point)
+        else:
+            closing_point = adjustment = None
+        options = densify_options or {}
+        return self._memo(('vertices', _options_key(options), closing_point, adjustment),
+                          lambda: [leg_vertex_arrays(leg_result, **options) for leg_result in result.legs])
+
+
+class TraverseCache(object):
+    """
+    Hands out the :class:`TraverseSnapshot` of the current table revision,
+    building a new one only after the store or the start point changed.
+    """
+
+    def __init__(self, store, traverse, profiler=None):
+        self.store = store
+        self.traverse = traverse
+        self.profiler = profiler or Profiler()
+        self._snapshot = None
+
+    def snapshot(self, start):
+        """The snapshot of the table from ``start`` (an ``(x, y)`` pair)."""
+        start = (float(start[0]), float(start[1]))
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.revision != self.store.revision or snapshot.start != start:
+            with self.profiler.stage('compute', len(self.store)):
+                self.traverse.set_start(start)
+                snapshot = TraverseSnapshot(self.store.revision, start, self.traverse.result(), self.store)
+            self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        """Drops the current snapshot, e.g. after the store was changed behind the cache's back."""
+        self._snapshot = None
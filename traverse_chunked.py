@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Chunk-parallel parsing of very large traverse files.
+
+The file is memory-mapped and cut into chunks of about
+:data:`DEFAULT_CHUNK_BYTES` that end on a newline.  Each chunk is parsed by
+:func:`parse_chunk` in a worker: leg records become the compact
+columns of :meth:`traverse_store.SegmentStore.prepare_rows` (directions,
+azimuths, distances, radii and arc lengths, the numbers in ``array('d')``),
+and the few other records (start and closing points, headers and errors)
+are returned as they are.  :func:`iter_chunks` yields the chunks back in
+file order; since a worker cannot know how many lines precede its chunk,
+the records it returns are numbered from the start of the chunk and
+renumbered here, so error messages carry the same line numbers as with
+:func:`traverse_parser.iter_file_records`.
+
+As in :mod:`traverse_batch`, the workers are processes only when
+:func:`traverse_batch.processes_available` allows them, and threads
+otherwise (inside QGIS the chunks then mainly bound memory use rather than
+run in parallel).  Nothing in here imports Qt or QGIS.
+"""
+import itertools
+import mmap
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .traverse_batch import processes_available
+from .traverse_parser import LEG_RECORDS, ErrorRecord, parse_line, record_to_leg
+from .traverse_store import SegmentStore
+
+# Target size of one chunk; chunks are extended to the end of their last line
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Chunks submitted ahead per worker
+CHUNKS_IN_FLIGHT = 2
+
+# Files at least this large are worth parsing in parallel
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# One parsed chunk: bytes ``start``..``end`` of the file holding
+# ``line_count`` lines, the ``columns`` of its legs and its other
+# ``records`` (numbered from the start of the file once yielded by
+# :func:`iter_chunks`).
+ParsedChunk = namedtuple('ParsedChunk', 'start end line_count columns records')
+
+
+def chunk_ranges(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """``(start, end)`` byte ranges covering the file, each ending just after a newline (or at EOF)."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            newline = data.find(b'\n', min(start + chunk_bytes, size) - 1)
+            end = size if newline < 0 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_chunk(path, start, end, encoding='utf-8'):
+    """
+    Parses bytes ``start``..``end`` of a traverse file. Returns a
+    :class:`ParsedChunk` whose records are numbered from the chunk's first line.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        text = data[start:end].decode(encoding, errors='replace')
+    lines = text.split('\n')
+    segments = []
+    records = []
+    for line_num, line in enumerate(lines, 1):
+        record = parse_line(line, line_num)
+        if record is None:
+            continue
+        if isinstance(record, LEG_RECORDS):
+            leg = record_to_leg(record)
+            segments.append((leg.direction, leg.distance, leg.radius, leg.arc_length))
+        else:
+            records.append(record)
+    return ParsedChunk(start, end, text.count('\n'), SegmentStore.prepare_rows(segments), records)
+
+
+def _renumber(record, first_line_num):
+    """``record`` moved from chunk line numbering to file line numbering."""
+    line_num = record.line_num + first_line_num - 1
+    if isinstance(record, ErrorRecord):
+        # The message quotes the line number; parse the line again to rebuild it
+        return parse_line(record.text, line_num)
+    return record._replace(line_num=line_num)
+
+
+def _run_pool(executor_class, path, ranges, workers, encoding, is_canceled):
+    # Keep only a few chunks per worker in flight, so parsed chunks do not
+    # pile up in memory ahead of the consumer and cancelling is quick
+    window = workers * CHUNKS_IN_FLIGHT
+    with executor_class(max_workers=workers) as executor:
+        futures = deque()
+        pending = iter(ranges)
+        try:
+            for start, end in itertools.islice(pending, window):
+                futures.append(executor.submit(parse_chunk, path, start, end, encoding))
+            while futures:
+                if is_canceled is not None and is_canceled():
+                    return
+                chunk = futures.popleft().result()
+                for start, end in itertools.islice(pending, 1):
+                    futures.append(executor.submit(parse_chunk, path, start, end, encoding))
+                yield chunk
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _iter_parsed(path, ranges, workers, use_processes, encoding, is_canceled):
+    if use_processes and workers > 1:
+        done = 0
+        try:
+            for chunk in _run_pool(ProcessPoolExecutor, path, ranges, workers, encoding, is_canceled):
+                done += 1
+                yield chunk
+            return
+        except (BrokenProcessPool, OSError, RuntimeError):
+            # Worker processes could not start: finish the rest on threads
+            ranges = ranges[done:]
+    for chunk in _run_pool(ThreadPoolExecutor, path, ranges, workers, encoding, is_canceled):
+        yield chunk
+
+
+def iter_chunks(path, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES, use_processes=None,
+                encoding='utf-8', is_canceled=None):
+    """
+    Generator yielding the :class:`ParsedChunk` of every chunk of the file,
+    in file order, with records numbered from the start of the file.
+    ``workers`` defaults to the number of cores; ``use_processes`` defaults
+    to :func:`traverse_batch.processes_available`; ``is_canceled`` is
+    polled between chunks to stop early.
+    """
+    ranges = chunk_ranges(path, chunk_bytes)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(ranges) or 1))
+    if use_processes is None:
+        use_processes = processes_available()
+    first_line_num = 1
+    for chunk in _iter_parsed(path, ranges, workers, use_processes, encoding, is_canceled):
+        records = [_renumber(record, first_line_num) for record in chunk.records]
+        first_line_num += chunk.line_count
+        yield chunk._replace(records=records)
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Command line entry point: computes traverse files without a QGIS session.
+
+    python -m traverse FILE_OR_FOLDER_OR_GLOB... [-o OUTPUT] [--format geojson|csv|gpkg]
+                       [--workers N] [--max-deviation D] [--adjust compass|transit|network]
+                       [--hold X,Y]... [--stations STATIONS.csv]
+
+Each file is parsed and solved with the plugin's parser and COGO engine,
+the coordinates reached and the misclosure against the EP record are
+printed, and the legs of all files (optionally adjusted onto their
+closing point) can be written to a GeoJSON, CSV or
+GeoPackage file (the latter needs the GDAL Python bindings).  With
+``--adjust network`` all files are adjusted together as one network of
+traverses sharing stations (see :mod:`traverse_network`).  Only the
+Qt-free modules are imported: neither ``qgis`` nor the dock ``.ui`` file
+are loaded.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from .traverse_batch import DEFAULT_PATTERN, find_traverse_files, is_solved, iter_batch
+from .traverse_closure import ADJUSTMENT_METHODS, adjust_batches, format_misclosure, misclosure
+from .traverse_kernels import batch_vertex_arrays
+from .traverse_network import DEFAULT_JUNCTION_TOLERANCE, NETWORK, NetworkError, TraverseNetwork
+
+FORMATS = ('geojson', 'csv', 'gpkg')
+FORMAT_EXTENSIONS = {'.geojson': 'geojson', '.json': 'geojson', '.csv': 'csv', '.gpkg': 'gpkg'}
+
+# Attribute columns of every written leg, in order
+LEG_COLUMNS = ('source_file', 'segment_id', 'direction', 'distance', 'radius', 'arc_length')
+
+
+def iter_leg_rows(file_results, densify_options):
+    """
+    Yields ``(attributes, xs, ys)`` for every solved leg of ``file_results``,
+    read from the vertex arrays of each file's batch result.
+    """
+    for file_result in file_results:
+        if not is_solved(file_result):
+            continue
+        source_file = os.path.basename(file_result.path)
+        result = file_result.result
+        xs, ys, offsets = batch_vertex_arrays(result, **densify_options)
+        xs = xs.tolist()
+        ys = ys.tolist()
+        offsets = offsets.tolist()
+        for i, (row, bearing) in enumerate(zip(result.rows.tolist(), file_result.bearings)):
+            leg = file_result.legs[row]
+            attributes = (source_file, row if leg.row is None else leg.row, bearing,
+                          leg.distance, leg.radius, leg.arc_length)
+            yield attributes, xs[offsets[i]:offsets[i + 1]], ys[offsets[i]:offsets[i + 1]]
+
+
+def write_geojson(path, rows):
+    """Writes the legs as a GeoJSON FeatureCollection of LineStrings, one feature at a time."""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for attributes, xs, ys in rows:
+            feature = {
+                'type': 'Feature',
+                'properties': dict(zip(LEG_COLUMNS, attributes)),
+                'geometry': {'type': 'LineString', 'coordinates': [list(point) for point in zip(xs, ys)]},
+            }
+            f.write((',\n' if count else '') + json.dumps(feature))
+            count += 1
+        f.write('\n]}\n')
+    return count
+
+
+def write_csv(path, rows):
+    """Writes one CSV row per leg with its attributes and start/end coordinates."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(LEG_COLUMNS + ('start_x', 'start_y', 'end_x', 'end_y'))
+        for attributes, xs, ys in rows:
+            writer.writerow(attributes + (xs[0], ys[0], xs[-1], ys[-1]))
+            count += 1
+    return count
+
+
+def write_gpkg(path, rows):
+    """Writes the legs to a GeoPackage line layer with GDAL/OGR."""
+    try:
+        from osgeo import ogr
+    except ImportError:
+        raise SystemExit("GeoPackage output needs the GDAL Python bindings (osgeo). Use --format geojson or csv instead.")
+
+    driver = ogr.GetDriverByName('GPKG')
+    if os.path.exists(path):
+        driver.DeleteDataSource(path)
+    data_source = driver.CreateDataSource(path)
+    layer = data_source.CreateLayer('traverse', geom_type=ogr.wkbLineString)
+    for name, field_type in zip(LEG_COLUMNS, (ogr.OFTString, ogr.OFTInteger, ogr.OFTString,
+                                              ogr.OFTReal, ogr.OFTReal, ogr.OFTReal)):
+        layer.CreateField(ogr.FieldDefn(name, field_type))
+
+    count = 0
+    layer.StartTransaction()
+    for attributes, xs, ys in rows:
+        feature = ogr.Feature(layer.GetLayerDefn())
+        for name, value in zip(LEG_COLUMNS, attributes):
+            feature.SetField(name, value)
+        line = ogr.Geometry(ogr.wkbLineString)
+        for x, y in zip(xs, ys):
+            line.AddPoint_2D(x, y)
+        feature.SetGeometry(line)
+        layer.CreateFeature(feature)
+        count += 1
+    layer.CommitTransaction()
+    data_source = None
+    return count
+
+
+WRITERS = {'geojson': write_geojson, 'csv': write_csv, 'gpkg': write_gpkg}
+
+
+def report_file(file_result, out):
+    """Prints the outcome of one file: end point and misclosure, or why it failed."""
+    name = os.path.basename(file_result.path)
+    if file_result.failure:
+        print(f"{name}: FAILED: {file_result.failure}", file=out)
+    else:
+        result = file_result.result
+        end_x, end_y = result.end
+        line = f"{name}: {len(result)} legs, end {end_x:.6f} {end_y:.6f}"
+        if file_result.closing_point is not None:
+            closure = misclosure(result, file_result.closing_point, file_result.closing_azimuth)
+            line += f", {format_misclosure(closure)}"
+        print(line, file=out)
+    for message in file_result.errors:
+        print(f"  {message}", file=out)
+
+
+def adjust_network(file_results, held_points, tolerance, out):
+    """
+    Adjusts the solved files as one network, holding ``held_points`` (or
+    the start of the first file when there are none). Prints a summary to
+    ``out`` unless it is None and returns the file results carrying the
+    adjusted traverses together with the :class:`NetworkAdjustment`.
+    """
+    solved = [file_result for file_result in file_results if is_solved(file_result)]
+    if not solved:
+        raise NetworkError("No traverse could be solved.")
+    network = TraverseNetwork(tolerance)
+    for file_result in solved:
+        network.add_batch(file_result.result, file_result.closing_point)
+    for point in held_points or [solved[0].result.start]:
+        network.hold(point)
+    adjustment = network.adjust()
+
+    adjusted = dict(zip((file_result.path for file_result in solved), network.adjusted_results(adjustment)))
+    if out is not None:
+        sigma0 = f"{adjustment.sigma0:.6f}" if adjustment.sigma0 is not None else "n/a (no redundancy)"
+        print(f"Network: {network.station_count} stations, {network.observation_count} observations, "
+              f"redundancy {adjustment.redundancy}, sigma0 {sigma0}", file=out)
+        print(f"  largest residual {max(abs(adjustment.residual_xs).max(), abs(adjustment.residual_ys).max()):.4f}, "
+              f"largest station standard error {max(adjustment.sigma_xs.max(), adjustment.sigma_ys.max()):.4f}", file=out)
+    results = [file_result._replace(result=adjusted.get(file_result.path, file_result.result))
+               for file_result in file_results]
+    return results, adjustment
+
+
+def write_stations(path, adjustment):
+    """Writes the adjusted network stations and their standard errors to a CSV file."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('station', 'x', 'y', 'sigma_x', 'sigma_y'))
+        for station, row in enumerate(zip(adjustment.xs.tolist(), adjustment.ys.tolist(),
+                                           adjustment.sigma_xs.tolist(), adjustment.sigma_ys.tolist())):
+            writer.writerow((station,) + row)
+
+
+def parse_point(text):
+    """Parses an "X,Y" command line point."""
+    try:
+        x, y = (float(value) for value in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not an X,Y point")
+    return x, y
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m traverse',
+        description="Compute traverse files (SP/EP/DD/CV) without QGIS.")
+    parser.add_argument('inputs', nargs='+', help="Traverse files, folders or glob patterns")
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help=f"File name pattern used inside folders (default: {DEFAULT_PATTERN})")
+    parser.add_argument('-o', '--output', help="Write all legs to this file")
+    parser.add_argument('--format', choices=FORMATS,
+                        help="Output format (default: from the output file extension)")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="Worker processes for many files (0 for one per core, default: 1)")
+    parser.add_argument('--max-deviation', type=float, default=0.0,
+                        help="Densify curves to this chord-to-arc deviation (default: fixed segments)")
+    parser.add_argument('--adjust', choices=ADJUSTMENT_METHODS + (NETWORK,),
+                        help="Adjust the written legs onto each file's closing point (EP), "
+                             "or all files together as one network")
+    parser.add_argument('--hold', type=parse_point, action='append', metavar='X,Y',
+                        help="Control station held fixed by the network adjustment (repeatable; "
+                             "default: the start of the first file)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_JUNCTION_TOLERANCE,
+                        help=f"Distance within which network stations are the same station "
+                             f"(default: {DEFAULT_JUNCTION_TOLERANCE})")
+    parser.add_argument('--stations', help="Write the adjusted network stations to this CSV file")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Only report failures")
+    return parser
+
+
+def main(argv=None):
+    """Runs the command line. Returns the exit status: 1 when any file failed."""
+    args = build_parser().parse_args(argv)
+
+    paths = []
+    for location in args.inputs:
+        paths.extend(find_traverse_files(location, args.pattern))
+    if not paths:
+        print("No traverse files found.", file=sys.stderr)
+        return 1
+
+    output_format = args.format
+    if args.output and output_format is None:
+        output_format = FORMAT_EXTENSIONS.get(os.path.splitext(args.output)[1].lower())
+        if output_format is None:
+            print(f"Cannot tell the output format of {args.output}; use --format.", file=sys.stderr)
+            return 1
+
+    # Keep the input order in the report and the output whatever the completion order
+    order = {path: index for index, path in enumerate(paths)}
+    file_results = sorted(iter_batch(paths, args.workers or None, use_processes=args.workers != 1),
+                          key=lambda file_result: order[file_result.path])
+
+    failed = 0
+    for file_result in file_results:
+        if file_result.failure:
+            failed += 1
+        if file_result.failure or not args.quiet:
+            report_file(file_result, sys.stderr if file_result.failure else sys.stdout)
+
+    adjustment = args.adjust
+    if adjustment == NETWORK:
+        try:
+            file_results, network_adjustment = adjust_network(
+                file_results, args.hold, args.tolerance, None if args.quiet else sys.stdout)
+        except NetworkError as e:
+            print(f"Network adjustment failed: {e}", file=sys.stderr)
+            return 1
+        if args.stations:
+            write_stations(args.stations, network_adjustment)
+    elif adjustment:
+        # Every file onto its own closing point, all in one pass
+        adjusted = adjust_batches([file_result.result if is_solved(file_result) else None for file_result in file_results],
+                                  [file_result.closing_point for file_result in file_results], adjustment)
+        file_results = [file_result._replace(result=result) for file_result, result in zip(file_results, adjusted)]
+
+    if args.output:
+        densify_options = {'max_deviation': args.max_deviation} if args.max_deviation > 0 else {}
+        count = WRITERS[output_format](args.output, iter_leg_rows(file_results, densify_options))
+        if not args.quiet:
+            print(f"Wrote {count} legs to {args.output}")
+
+    if failed:
+        print(f"{failed} of {len(paths)} file(s) failed.", file=sys.stderr)
+    return 1 if failed else 0
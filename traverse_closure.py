@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Closure checks and adjustment of a computed traverse against its known
+closing point (and, optionally, a known closing direction).
+
+The misclosure is the computed end minus the known closing point.  The
+Compass (Bowditch) rule distributes it over the stations in proportion to
+the distance travelled, the Transit rule in proportion to the absolute
+easting and northing of each leg.  The adjustment works on station
+arrays with NumPy, and :func:`adjust_batch` corrects thousands of
+traverses stored back to back in a single pass (:func:`adjust_batches`
+does so for the kernel results of a batch of files, :func:`adjust_results`
+for engine results).  Nothing in here imports
+Qt or QGIS.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from .traverse_engine import TraverseResult
+
+COMPASS = 'compass'
+TRANSIT = 'transit'
+ADJUSTMENT_METHODS = (COMPASS, TRANSIT)
+
+# ``dx``/``dy`` are computed minus known closing coordinates, ``linear`` the
+# length of that vector, ``length`` the traversed length, ``precision`` the
+# ratio length / linear (e.g. 10000 for a 1:10000 traverse) and ``angular``
+# the exit azimuth minus the known closing azimuth in degrees (None when no
+# closing direction is known).
+Misclosure = namedtuple('Misclosure', 'dx dy linear length precision angular')
+
+
+def angle_difference(azimuth, reference):
+    """Signed difference ``azimuth - reference`` in degrees, in (-180, 180]."""
+    difference = (azimuth - reference) % 360.0
+    return difference - 360.0 if difference > 180.0 else difference
+
+
+def misclosure(result, closing_point, closing_azimuth=None):
+    """
+    The :class:`Misclosure` of a :class:`traverse_engine.TraverseResult`
+    (or :class:`traverse_kernels.BatchResult`) against the known
+    ``closing_point`` (an (x, y) pair) and, when given, the known azimuth
+    of the closing line.
+    """
+    end_x, end_y = result.end
+    dx = end_x - closing_point[0]
+    dy = end_y - closing_point[1]
+    linear = math.hypot(dx, dy)
+    length = result.length
+    precision = length / linear if linear > 0.0 else math.inf
+    angular = None
+    if closing_azimuth is not None and result.exit_azimuth is not None:
+        angular = angle_difference(result.exit_azimuth, closing_azimuth)
+    return Misclosure(dx, dy, linear, length, precision, angular)
+
+
+def format_precision(precision):
+    """Precision ratio as surveyors write it, e.g. "1:12500"."""
+    if math.isinf(precision):
+        return "perfect closure"
+    return f"1:{precision:.0f}"
+
+
+def format_misclosure(closure):
+    """One line summary of a :class:`Misclosure`."""
+    text = (f"Misclosure {closure.linear:.4f} (dx {closure.dx:.4f}, dy {closure.dy:.4f}) "
+            f"over {closure.length:.3f}, precision {format_precision(closure.precision)}")
+    if closure.angular is not None:
+        text += f", angular misclosure {closure.angular * 3600.0:.1f}\""
+    return text
+
+
+def correction_weights(xs, ys, method=COMPASS, lengths=None):
+    """
+    Cumulative adjustment weights of every station, from 0 at the start to 1
+    at the end, as ``(x_weights, y_weights)``. ``lengths`` are the travelled
+    lengths of the legs (arc lengths for curves); they default to the chords.
+    """
+    dxs = np.abs(np.diff(xs))
+    dys = np.abs(np.diff(ys))
+    if method == TRANSIT:
+        return _cumulative_share(dxs), _cumulative_share(dys)
+    if method != COMPASS:
+        raise ValueError(f"Unknown adjustment method '{method}'. Expected one of {ADJUSTMENT_METHODS}.")
+    if lengths is None:
+        lengths = np.hypot(dxs, dys)
+    weights = _cumulative_share(np.asarray(lengths, dtype=float))
+    return weights, weights
+
+
+def _cumulative_share(values):
+    """Cumulative sum of ``values`` as a share of their total, with a leading 0."""
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    total = cumulative[-1]
+    if total <= 0.0:
+        # Nothing to distribute by (e.g. a traverse running due north): share evenly
+        return np.linspace(0.0, 1.0, len(cumulative))
+    return cumulative / total
+
+
+def adjust_stations(xs, ys, closing_point, method=COMPASS, lengths=None):
+    """
+    Adjusted copies of the station coordinate arrays ``xs``/``ys`` (the start
+    point followed by the end of every leg) so the last station falls on
+    ``closing_point``.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    x_weights, y_weights = correction_weights(xs, ys, method, lengths)
+    return (xs - (xs[-1] - closing_point[0]) * x_weights,
+            ys - (ys[-1] - closing_point[1]) * y_weights)
+
+
+def adjust_batch(xs, ys, offsets, closing_xs, closing_ys, method=COMPASS, lengths=None):
+    """
+    Adjusts many traverses whose stations are stored back to back in
+    ``xs``/``ys``, in one vectorized pass. ``offsets`` holds the index of
+    the first station of every traverse (ascending, starting with 0);
+    ``lengths`` (optional) the travelled length of every leg, aligned with
+    the stations it ends on (the value at each traverse's first station is
+    ignored). Returns the adjusted ``(xs, ys)``.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    counts = np.diff(np.append(offsets, len(xs)))
+    owner = np.repeat(np.arange(len(offsets)), counts)
+    first = np.zeros(len(xs), dtype=bool)
+    first[offsets] = True
+
+    # Leg increments ending on every station; zero at the start of each traverse
+    dxs = np.abs(np.diff(xs, prepend=xs[:1]))
+    dys = np.abs(np.diff(ys, prepend=ys[:1]))
+    dxs[first] = 0.0
+    dys[first] = 0.0
+    if method == TRANSIT:
+        x_parts, y_parts = dxs, dys
+    elif method == COMPASS:
+        x_parts = np.hypot(dxs, dys) if lengths is None else np.where(first, 0.0, np.asarray(lengths, dtype=float))
+        y_parts = x_parts
+    else:
+        raise ValueError(f"Unknown adjustment method '{method}'. Expected one of {ADJUSTMENT_METHODS}.")
+
+    last = offsets + counts - 1
+    x_weights = _segmented_share(x_parts, offsets, counts, owner)
+    y_weights = x_weights if y_parts is x_parts else _segmented_share(y_parts, offsets, counts, owner)
+    misclosure_x = xs[last] - np.asarray(closing_xs, dtype=float)
+    misclosure_y = ys[last] - np.asarray(closing_ys, dtype=float)
+    return xs - misclosure_x[owner] * x_weights, ys - misclosure_y[owner] * y_weights
+
+
+def _segmented_share(parts, offsets, counts, owner):
+    """Per-traverse cumulative share of ``parts`` (0 at each start, 1 at each end)."""
+    cumulative = np.cumsum(parts)
+    base = (cumulative[offsets] - parts[offsets])[owner]
+    within = cumulative - base
+    totals = within[offsets + counts - 1][owner]
+    # Traverses with nothing to distribute by are shared evenly over their stations
+    position = np.arange(len(parts)) - offsets[owner]
+    even = position / np.maximum(counts[owner] - 1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totals > 0.0, within / totals, even)
+
+
+def adjust_traverse(result, closing_point, method=COMPASS):
+    """
+    Returns a new :class:`traverse_engine.TraverseResult` whose stations are
+    adjusted onto ``closing_point`` (see :func:`shift_stations`).
+    """
+    if not result.legs:
+        return result
+    stations = result.stations()
+    xs = np.array([point[0] for point in stations])
+    ys = np.array([point[1] for point in stations])
+    lengths = np.array([leg_result.length for leg_result in result.legs])
+    adjusted_xs, adjusted_ys = adjust_stations(xs, ys, closing_point, method, lengths)
+    return shift_stations(result, adjusted_xs - xs, adjusted_ys - ys)
+
+
+def adjust_results(results, closing_points, method=COMPASS):
+    """
+    Adjusts every :class:`traverse_engine.TraverseResult` of ``results``
+    onto its closing point, all in one :func:`adjust_batch` pass. Results
+    that are None, have no legs or have no closing point (None) are
+    returned as they are.
+    """
+    def arrays(result):
+        stations = result.stations()
+        return ([point[0] for point in stations], [point[1] for point in stations],
+                [0.0] + [leg_result.length for leg_result in result.legs])
+
+    return _adjust_all(results, closing_points, method, arrays, shift_stations)
+
+
+def adjust_batches(batches, closing_points, method=COMPASS):
+    """
+    :func:`adjust_results` for :class:`traverse_kernels.BatchResult`
+    objects, working on their station arrays directly.
+    """
+    def arrays(batch):
+        return batch.x, batch.y, np.concatenate(([0.0], batch.lengths))
+
+    return _adjust_all(batches, closing_points, method, arrays,
+                       lambda batch, shift_xs, shift_ys: batch.shifted(shift_xs, shift_ys))
+
+
+def _adjust_all(results, closing_points, method, arrays, shift):
+    """
+    Shared body of :func:`adjust_results` and :func:`adjust_batches`:
+    ``arrays(result)`` gives the station xs, ys and the length of the leg
+    ending on each station, ``shift(result, shift_xs, shift_ys)`` the
+    moved result.
+    """
+    adjusted = list(results)
+    todo, parts = [], []
+    for index, (result, closing_point) in enumerate(zip(adjusted, closing_points)):
+        if result is None or closing_point is None:
+            continue
+        station_arrays = arrays(result)
+        if len(station_arrays[0]) > 1: # At least one leg
+            todo.append((index, result, closing_point))
+            parts.append(station_arrays)
+    if not todo:
+        return adjusted
+
+    counts = [len(xs) for xs, _, _ in parts]
+    offsets = np.cumsum([0] + counts[:-1])
+    xs = np.concatenate([np.asarray(xs, dtype=float) for xs, _, _ in parts])
+    ys = np.concatenate([np.asarray(ys, dtype=float) for _, ys, _ in parts])
+    lengths = np.concatenate([np.asarray(lengths, dtype=float) for _, _, lengths in parts])
+    adjusted_xs, adjusted_ys = adjust_batch(
+        xs, ys, offsets, [closing_point[0] for _, _, closing_point in todo],
+        [closing_point[1] for _, _, closing_point in todo], method, lengths)
+    shift_xs = adjusted_xs - xs
+    shift_ys = adjusted_ys - ys
+    for (index, result, _), first, count in zip(todo, offsets.tolist(), counts):
+        adjusted[index] = shift(result, shift_xs[first:first + count], shift_ys[first:first + count])
+    return adjusted
+
+
+def shift_stations(result, shift_xs, shift_ys):
+    """
+    Returns a copy of ``result`` with every station moved by ``shift_xs``/
+    ``shift_ys`` (one value per station, start first). Curves keep their
+    radius and sweep: the centre moves by the mean of the shifts of its ends.
+    """
+    shift_xs = np.asarray(shift_xs, dtype=float).tolist()
+    shift_ys = np.asarray(shift_ys, dtype=float).tolist()
+    legs = []
+    for index, leg_result in enumerate(result.legs):
+        start = (leg_result.start[0] + shift_xs[index], leg_result.start[1] + shift_ys[index])
+        end = (leg_result.end[0] + shift_xs[index + 1], leg_result.end[1] + shift_ys[index + 1])
+        center = leg_result.center
+        if center is not None:
+            center = (center[0] + (shift_xs[index] + shift_xs[index + 1]) / 2.0,
+                      center[1] + (shift_ys[index] + shift_ys[index + 1]) / 2.0)
+        legs.append(leg_result._replace(start=start, end=end, center=center))
+    start = (result.start[0] + shift_xs[0], result.start[1] + shift_ys[0])
+    return TraverseResult(start, legs, result.issues)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Collector for the per-row notes and warnings produced while importing,
+drawing or exporting a traverse.
+
+Instead of pushing one message bar item per row, operations record entries
+here and publish them once: a single summary line for the user and one
+batched write of the full list to the log.  Nothing in here imports Qt or
+QGIS; the dock widget maps the levels to ``Qgis`` message levels.
+"""
+from collections import namedtuple
+
+from .traverse_engine import INFO, WARNING
+
+CRITICAL = 'critical'
+
+LEVELS = (INFO, WARNING, CRITICAL)
+
+# ``row`` is the 0-based table row (or leg) an entry refers to and ``line``
+# the 1-based line of the file being read; either is None when it does not
+# apply, e.g. for messages about the operation as a whole.
+Entry = namedtuple('Entry', 'level row message line', defaults=(None,))
+
+
+class Diagnostics(object):
+    """
+    Ordered list of diagnostic entries for one operation (e.g. "Import").
+    At most one entry per level is recorded from engine issues for each
+    row, so a row reported while preparing an operation is not reported
+    again with its result.
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def add(self, level, message, row=None, line=None):
+        self.entries.append(Entry(level, row, message, line))
+
+    def info(self, message, row=None, line=None):
+        self.add(INFO, message, row, line)
+
+    def warning(self, message, row=None, line=None):
+        self.add(WARNING, message, row, line)
+
+    def critical(self, message, row=None, line=None):
+        self.add(CRITICAL, message, row, line)
+
+    def rows(self, level):
+        """The rows with an entry at ``level``."""
+        return set(entry.row for entry in self.entries if entry.level == level and entry.row is not None)
+
+    def add_issues(self, issues, levels=LEVELS):
+        """
+        Records the :class:`traverse_engine.Issue` list returned by the
+        engine, restricted to ``levels`` and skipping rows that already
+        have an entry at the issue's level.
+        """
+        reported = {level: self.rows(level) for level in levels}
+        for issue in issues:
+            if issue.level in reported and issue.row not in reported[issue.level]:
+                reported[issue.level].add(issue.row)
+                self.add(issue.level, issue.message, issue.row)
+
+    def count(self, level):
+        return sum(1 for entry in self.entries if entry.level == level)
+
+    def filtered(self, levels):
+        """Entries whose level is in ``levels``."""
+        return [entry for entry in self.entries if entry.level in levels]
+
+    @property
+    def highest_level(self):
+        """The most severe level recorded, or ``None`` when empty."""
+        present = set(entry.level for entry in self.entries)
+        for level in reversed(LEVELS):
+            if level in present:
+                return level
+        return None
+
+    def summary(self):
+        """Short count of the recorded entries, e.g. "2 errors, 3 warnings, 10 notes"."""
+        parts = []
+        for level, label in ((CRITICAL, "error"), (WARNING, "warning"), (INFO, "note")):
+            count = self.count(level)
+            if count:
+                parts.append(f"{count} {label}{'s' if count != 1 else ''}")
+        return ", ".join(parts)
+
+    def report(self, levels=LEVELS):
+        """The full list as one block of text, one entry per line."""
+        lines = [f"{self.operation}: {self.summary() or 'no messages'}"]
+        for entry in self.filtered(levels):
+            lines.append(f"[{entry.level.upper()}] {entry.message}")
+        return "\n".join(lines)
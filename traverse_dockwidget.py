@@ -1,20 +1,48 @@
 import os
 import math
 
-from qgis.PyQt import QtGui, QtWidgets, uic
-from qgis.PyQt.QtCore import pyqtSignal, Qt, QVariant # Import QVariant directly
+from qgis.PyQt import QtGui, QtWidgets
+from qgis.PyQt.QtCore import pyqtSignal, Qt, QSettings
 from qgis.PyQt.QtGui import QIcon
 from qgis.gui import QgsMapLayerComboBox, QgsMapToolEmitPoint
-from qgis.core import QgsProject, QgsVectorLayer, QgsPointXY, QgsFeature, QgsGeometry, QgsFields, QgsField, QgsWkbTypes, QgsFeatureRequest
-from qgis.core import QgsMapLayerProxyModel
+from qgis.core import QgsProject, QgsVectorLayer, QgsPointXY, QgsFields, QgsWkbTypes, QgsFeatureRequest
+from qgis.core import QgsMapLayerProxyModel, QgsApplication, QgsMessageLog
 from qgis.core import Qgis # Import Qgis for message levels
 
-
-FORM_CLASS, _ = uic.loadUiType(os.path.join(
-    os.path.dirname(__file__), 'traverse_dockwidget_base.ui'))
-
-# Define a constant for curve approximation resolution
-NUM_CURVE_SEGMENTS = 20 # Number of straight line segments to approximate a curve
+from .traverse_batch import DEFAULT_PATTERN, find_traverse_files
+from .traverse_cache import TraverseCache
+from .traverse_diagnostics import CRITICAL, Diagnostics
+from .traverse_closure import COMPASS, TRANSIT, format_misclosure
+from .traverse_engine import INFO, NUM_CURVE_SEGMENTS, WARNING, parse_direction
+from .traverse_form import load_form_class
+from .traverse_incremental import IncrementalTraverse
+from .traverse_model import TraverseTableModel
+from .traverse_preview import TraversePreview
+from .traverse_profiler import Profiler
+from .traverse_snapping import SnapIndexes, SnappingPointTool
+from .traverse_store import COLUMN_DIRECTION, COLUMN_NAMES
+from .traverse_tasks import BatchImportTask, DrawTraverseTask, ExportTraverseTask, ImportTraverseTask
+from .traverse_timings_dialog import StageTimingsDialog
+from .traverse_writer import BATCH_FIELDS, DEFAULT_CHUNK_SIZE, TRAVERSE_FIELDS, FeatureWriter, missing_traverse_fields
+
+
+FORM_CLASS = load_form_class()
+
+# Settings keys and values for curve densification
+SETTINGS_CURVE_MODE = 'traverse/curveMode'
+SETTINGS_CURVE_DEVIATION = 'traverse/curveMaxDeviation'
+SETTINGS_CURVE_SEGMENT_LENGTH = 'traverse/curveMaxSegmentLength'
+CURVE_MODE_SEGMENTS = 'segments'
+CURVE_MODE_TOLERANCE = 'tolerance'
+CURVE_MODE_ARCS = 'arcs'
+SETTINGS_WRITE_CHUNK_SIZE = 'traverse/writeChunkSize'
+# Settings key of the closure adjustment ('' for none, or a traverse_closure method)
+SETTINGS_ADJUSTMENT = 'traverse/adjustment'
+SETTINGS_RECORD_TIMINGS = 'traverse/recordStageTimings'
+
+# Tab of the Log Messages panel receiving the collected diagnostics
+LOG_TAG = 'Traverse'
+DIAGNOSTIC_LEVELS = {INFO: Qgis.Info, WARNING: Qgis.Warning, CRITICAL: Qgis.Critical}
 
 
 class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
@@ -28,11 +56,20 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
 
         self.iface = None
         self.canvas = None
+        self.preview = None # Rubber band preview, created once the canvas is known
+        self.snapIndexes = None # Vertex indexes the trace tool snaps to, per layer
 
         self.start_point = None
         self.closing_point = None
+        self.closing_direction = None # Known direction of the closing line, from an EP record
         self.current_map_tool = None # To keep track of active map tools for point selection
         self._first_trace_point = None # Used for the two-click digitizing of a segment
+        self._draw_task = None # Background task building the features on "Finish"
+        self._file_task = None # Background task importing or exporting a traverse file
+        self._closing = False # Set once the dock shuts down; late task completions are then ignored
+        # Opt-in stage timings of import, drawing and export
+        self.profiler = Profiler(QSettings().value(SETTINGS_RECORD_TIMINGS, False, type=bool))
+        self._timings_dialog = None
 
         # --- Connect UI elements to methods ---
 
@@ -58,19 +95,35 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         # Connect the "New" button (newButton) to clear the table and start fresh
         self.newButton.clicked.connect(self.clear_table_and_start_new)
 
-        # Table Widget initialization
-        self.tableWidget.setRowCount(0)
-        self.tableWidget.setColumnWidth(0, 100) # Direction
-        self.tableWidget.setColumnWidth(1, 100) # Distance
-        self.tableWidget.setColumnWidth(2, 80)  # Radius
-        self.tableWidget.setColumnWidth(3, 80)  # Arc Length
+        # Table view initialization: the view only renders the rows it shows,
+        # the data lives column by column in the model's segment store
+        self.tableModel = TraverseTableModel(parent=self)
+        self.tableModel.invalidEdit.connect(self._on_invalid_table_edit)
+        self.tableView.setModel(self.tableModel)
+
+        # Cached traverse over the table, re-solved from the edited row onward
+        self.liveTraverse = IncrementalTraverse(self.tableModel.store)
+        self.tableModel.dataChanged.connect(lambda top_left, bottom_right, roles=None: self.liveTraverse.rows_changed(top_left.row(), bottom_right.row()))
+        self.tableModel.rowsInserted.connect(lambda parent, first, last: self.liveTraverse.rows_inserted(first, last - first + 1))
+        self.tableModel.rowsRemoved.connect(lambda parent, first, last: self.liveTraverse.rows_removed(first, last - first + 1))
+        self.tableModel.modelReset.connect(self.liveTraverse.reset)
+        # Computed once per table revision and shared by preview, export and draw
+        self.resultCache = TraverseCache(self.tableModel.store, self.liveTraverse, self.profiler)
+        for signal in (self.tableModel.dataChanged, self.tableModel.rowsInserted,
+                       self.tableModel.rowsRemoved, self.tableModel.modelReset):
+            signal.connect(self._schedule_preview)
+        self.tableView.setColumnWidth(0, 100) # Direction
+        self.tableView.setColumnWidth(1, 100) # Distance
+        self.tableView.setColumnWidth(2, 80)  # Radius
+        self.tableView.setColumnWidth(3, 80)  # Arc Length
+        self.tableView.verticalHeader().setDefaultSectionSize(self.tableView.fontMetrics().height() + 6)
 
         # Connect cell click signal to add new row (if on last populated row)
-        self.tableWidget.cellClicked.connect(self.on_table_cell_clicked)
+        self.tableView.clicked.connect(self.on_table_cell_clicked)
 
-        # --- Context Menu for Table Widget ---
-        self.tableWidget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.tableWidget.customContextMenuRequested.connect(self._show_table_context_menu)
+        # --- Context Menu for Table View ---
+        self.tableView.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tableView.customContextMenuRequested.connect(self._show_table_context_menu)
 
 
     def _create_hamburger_menu(self):
@@ -78,14 +131,176 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         menu = QtWidgets.QMenu(self)
         menu.addAction(self.actionImport) # Changed actionimport to actionImport
         menu.addAction(self.actionExport)
+        self.actionBatchImport = menu.addAction("Batch Import Folder...")
+        self.actionBatchImport.triggered.connect(self.batch_import_folder)
+        menu.addSeparator()
+        menu.addMenu(self._create_curve_menu(menu))
+        menu.addMenu(self._create_adjustment_menu(menu))
+        self.actionWriteChunkSize = menu.addAction("Write Chunk Size...")
+        self.actionWriteChunkSize.triggered.connect(self._configure_write_chunk_size)
+        menu.addSeparator()
+        self.actionRecordTimings = menu.addAction("Record Stage Timings")
+        self.actionRecordTimings.setCheckable(True)
+        self.actionRecordTimings.setChecked(self.profiler.enabled)
+        self.actionRecordTimings.toggled.connect(self._set_record_timings)
+        self.actionShowTimings = menu.addAction("Stage Timings...")
+        self.actionShowTimings.triggered.connect(self.show_stage_timings)
         return menu
 
+    def _create_curve_menu(self, parent):
+        """Creates the submenu choosing how curves are densified when drawn."""
+        curve_menu = QtWidgets.QMenu("Curve Densification", parent)
+        group = QtWidgets.QActionGroup(curve_menu)
+
+        self.actionCurveFixed = curve_menu.addAction(f"Fixed Segments ({NUM_CURVE_SEGMENTS} per curve)")
+        self.actionCurveTolerance = curve_menu.addAction("Chord Tolerance...")
+        self.actionCurveArcs = curve_menu.addAction("True Arcs (curved layers only)")
+        for action in (self.actionCurveFixed, self.actionCurveTolerance, self.actionCurveArcs):
+            action.setCheckable(True)
+            group.addAction(action)
+        self._sync_curve_actions()
+
+        self.actionCurveFixed.triggered.connect(lambda: QSettings().setValue(SETTINGS_CURVE_MODE, CURVE_MODE_SEGMENTS))
+        self.actionCurveTolerance.triggered.connect(self._configure_curve_tolerance)
+        self.actionCurveArcs.triggered.connect(lambda: QSettings().setValue(SETTINGS_CURVE_MODE, CURVE_MODE_ARCS))
+        return curve_menu
+
+    def _sync_curve_actions(self):
+        """Checks the curve menu action matching the saved curve mode."""
+        mode = QSettings().value(SETTINGS_CURVE_MODE, CURVE_MODE_SEGMENTS)
+        self.actionCurveTolerance.setChecked(mode == CURVE_MODE_TOLERANCE)
+        self.actionCurveArcs.setChecked(mode == CURVE_MODE_ARCS)
+        self.actionCurveFixed.setChecked(mode not in (CURVE_MODE_TOLERANCE, CURVE_MODE_ARCS))
+
+    def _create_adjustment_menu(self, parent):
+        """Creates the submenu choosing how a misclosure is adjusted when drawing."""
+        adjustment_menu = QtWidgets.QMenu("Closure Adjustment", parent)
+        group = QtWidgets.QActionGroup(adjustment_menu)
+        current = QSettings().value(SETTINGS_ADJUSTMENT, '')
+
+        for label, method in (("None (report misclosure only)", ''),
+                              ("Compass (Bowditch) Rule", COMPASS),
+                              ("Transit Rule", TRANSIT)):
+            action = adjustment_menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(method == current)
+            action.triggered.connect(lambda checked, method=method: QSettings().setValue(SETTINGS_ADJUSTMENT, method))
+            group.addAction(action)
+        return adjustment_menu
+
+    def _closing_azimuth(self, diagnostics):
+        """Azimuth of the known closing direction, or None when unknown or invalid."""
+        if not self.closing_direction:
+            return None
+        try:
+            return parse_direction(self.closing_direction)
+        except ValueError:
+            diagnostics.warning(f"Ignoring closing direction '{self.closing_direction}': not a valid direction.")
+            return None
+
+    def _configure_curve_tolerance(self):
+        """
+        Asks for the maximum chord-to-arc deviation and the maximum segment
+        length (0 disables it) used to densify curves, in layer units.
+        """
+        settings = QSettings()
+        deviation, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Chord Tolerance", "Maximum chord-to-arc deviation (map units):",
+            float(settings.value(SETTINGS_CURVE_DEVIATION, 0.01)), 0.000001, 1000000.0, 6)
+        if not ok:
+            self._sync_curve_actions()
+            return
+        segment_length, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Chord Tolerance", "Maximum segment length (map units, 0 for no limit):",
+            float(settings.value(SETTINGS_CURVE_SEGMENT_LENGTH, 0.0)), 0.0, 1000000.0, 3)
+        if not ok:
+            segment_length = float(settings.value(SETTINGS_CURVE_SEGMENT_LENGTH, 0.0))
+
+        settings.setValue(SETTINGS_CURVE_MODE, CURVE_MODE_TOLERANCE)
+        settings.setValue(SETTINGS_CURVE_DEVIATION, deviation)
+        settings.setValue(SETTINGS_CURVE_SEGMENT_LENGTH, segment_length)
+        self.iface.messageBar().pushMessage("Traverse Plugin", f"Curves will be densified to a chord tolerance of {deviation:g}.", level=Qgis.Info)
+
+    def _configure_write_chunk_size(self):
+        """Asks for the number of features written to the layer per call when drawing."""
+        chunk_size, ok = QtWidgets.QInputDialog.getInt(
+            self, "Write Chunk Size", "Features written per batch:",
+            self._write_chunk_size(), 1, 1000000, 1000)
+        if ok:
+            QSettings().setValue(SETTINGS_WRITE_CHUNK_SIZE, chunk_size)
+
+    def _set_record_timings(self, enabled):
+        self.profiler.enabled = enabled
+        QSettings().setValue(SETTINGS_RECORD_TIMINGS, enabled)
+
+    def show_stage_timings(self):
+        """Shows the panel with the recorded stage timings."""
+        if self._timings_dialog is None:
+            self._timings_dialog = StageTimingsDialog(self.profiler, self)
+        self._timings_dialog.refresh()
+        self._timings_dialog.show()
+        self._timings_dialog.raise_()
+
+    def _write_chunk_size(self):
+        return int(QSettings().value(SETTINGS_WRITE_CHUNK_SIZE, DEFAULT_CHUNK_SIZE))
+
+    def _densify_options(self):
+        """
+        Returns the keyword arguments for leg_vertex_arrays from the saved settings.
+        True arcs that have to be densified use the saved chord tolerance.
+        """
+        settings = QSettings()
+        if settings.value(SETTINGS_CURVE_MODE, CURVE_MODE_SEGMENTS) == CURVE_MODE_SEGMENTS:
+            return {}
+        return {
+            'max_deviation': float(settings.value(SETTINGS_CURVE_DEVIATION, 0.01)) or None,
+            'max_segment_length': float(settings.value(SETTINGS_CURVE_SEGMENT_LENGTH, 0.0)) or None,
+        }
+
+    def _use_true_arcs(self, layer, diagnostics):
+        """
+        True when curves should be written as circular strings: the arc mode
+        is selected and the layer's geometry type can store curves.
+        Notes the fallback to densification in ``diagnostics`` otherwise.
+        """
+        if QSettings().value(SETTINGS_CURVE_MODE, CURVE_MODE_SEGMENTS) != CURVE_MODE_ARCS:
+            return False
+        if QgsWkbTypes.isCurvedType(layer.wkbType()):
+            return True
+        diagnostics.info(f"Layer '{layer.name()}' cannot store curves. Curves will be densified instead.")
+        return False
+
     def set_qgis_interface(self, iface):
         """Sets the QGIS interface and map canvas objects.
            This method is called by the main plugin class (traverse.py).
         """
         self.iface = iface
         self.canvas = iface.mapCanvas()
+        self.preview = TraversePreview(self.canvas, self.resultCache, self)
+        self.preview.set_start(self.start_point)
+        self.snapIndexes = SnapIndexes(self.canvas)
+
+    @property
+    def start_point(self):
+        return self._start_point
+
+    @start_point.setter
+    def start_point(self, point):
+        # Every assignment moves the live preview along with the traverse
+        self._start_point = point
+        if self.preview is not None:
+            self.preview.set_start(point)
+
+    def _schedule_preview(self, *args):
+        """Slot for table model changes: redraws the preview once edits settle."""
+        if self.preview is not None:
+            self.preview.schedule()
+
+    def remove_preview(self):
+        """Takes the preview rubber band off the canvas."""
+        if self.preview is not None:
+            self.preview.remove()
+            self.preview = None
 
     def set_start_point(self):
         """Activates a map tool to allow the user to click on the map
@@ -138,6 +353,7 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
     def _handle_closing_point_click(self, point):
         """Callback method for when the user clicks on the map to set the closing point."""
         self.closing_point = point
+        self.closing_direction = None
         self.iface.messageBar().pushMessage("Traverse Plugin", f"Closing point set at: {self.closing_point.toString()}", level=Qgis.Info)
         self.canvas.unsetMapTool(self.current_map_tool)
         self.current_map_tool = None
@@ -146,7 +362,8 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         """
         Activates a map tool to allow the user to click on the map to digitize a new line segment.
         The first click sets the start, the second click sets the end, and the segment
-        is added to the table. Allows for continuous digitizing.
+        is added to the table. Allows for continuous digitizing. Clicks snap to
+        the nearest vertex of the layer selected in the combo box.
         """
         if self.iface is None or self.canvas is None:
             self.iface.messageBar().pushCritical("Traverse Plugin", "QGIS interface or map canvas not initialized. Please restart QGIS or the plugin.")
@@ -160,11 +377,16 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         self._first_trace_point = None
         self.iface.messageBar().pushMessage("Traverse Plugin", "Click on the map to define the START of your new traverse segment.", level=Qgis.Info)
 
-        tool = QgsMapToolEmitPoint(self.canvas)
+        tool = SnappingPointTool(self.canvas, self.snapIndexes, self._snap_layer)
         tool.canvasClicked.connect(self._handle_trace_point_click)
         self.canvas.setMapTool(tool)
         self.current_map_tool = tool
 
+    def _snap_layer(self):
+        """The vector layer selected in the combo box, which the trace tool snaps to, or None."""
+        layer = self.mapLayerComboBox.currentLayer()
+        return layer if isinstance(layer, QgsVectorLayer) and layer.isSpatial() else None
+
     def _handle_trace_point_click(self, clicked_point):
         """
         Callback method for when the user clicks on the map with the trace tool active.
@@ -196,8 +418,9 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
             if azimuth_deg < 0:
                 azimuth_deg += 360
 
-            # Add the new segment to the table
-            self.add_traverse_segment(f"{azimuth_deg:.2f}°", distance, 0.0, 0.0) # Radius and Arc Length are 0 for straight lines
+            # Add the new segment to the table, keeping the full precision of
+            # snapped vertices (1e-8° is well below a millimetre per kilometre)
+            self.add_traverse_segment(f"{azimuth_deg:.8f}°", distance, 0.0, 0.0) # Radius and Arc Length are 0 for straight lines
             
             # Update the global start_point for the traverse (used by "Finish" button)
             self.start_point = end_segment_point 
@@ -210,416 +433,265 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
                                                level=Qgis.Info)
             # Keep the tool active for continuous digitizing
 
-    def _parse_bearing_to_azimuth(self, bearing_str):
+    def _table_snapshot(self, diagnostics):
         """
-        Converts a bearing string (e.g., "N45-30-15E", "S60E", "NW") to an azimuth in decimal degrees.
-        Returns the azimuth in degrees (0-360, clockwise from North).
-        Raises ValueError for invalid formats.
+        The cached traverse of the table from the start point (see
+        :mod:`traverse_cache`). Rows it skips (incomplete or unsolvable) are
+        recorded in ``diagnostics``, once per row.
         """
-        bearing_str = bearing_str.strip().upper()
+        snapshot = self.resultCache.snapshot((self.start_point.x(), self.start_point.y()))
+        diagnostics.add_issues(snapshot.result.issues, (WARNING,))
+        return snapshot
 
-        if len(bearing_str) < 2:
-            raise ValueError("Bearing string too short.")
-
-        quadrant1 = bearing_str[0]
-        quadrant2 = bearing_str[-1]
-        
-        # Handle cases like "N", "S", "E", "W"
-        if len(bearing_str) == 1:
-            if quadrant1 == 'N': return 0.0
-            if quadrant1 == 'E': return 90.0
-            if quadrant1 == 'S': return 180.0
-            if quadrant1 == 'W': return 270.0
-
-        # Handle cardinal/intercardinal without degrees like NE, NW, SE, SW
-        if len(bearing_str) == 2 and quadrant2 in ['E', 'W']:
-            if bearing_str == 'NE': return 45.0
-            if bearing_str == 'SE': return 135.0
-            if bearing_str == 'SW': return 225.0
-            if bearing_str == 'NW': return 315.0
-
-        degrees_part = bearing_str[1:-1]
-        
-        # Split degrees, minutes, seconds
-        parts = []
-        if '-' in degrees_part:
-            parts = degrees_part.split('-')
-        else: # Try to parse as decimal degrees if no hyphens
-            try:
-                deg = float(degrees_part)
-                parts = [str(deg)]
-            except ValueError:
-                pass # Will be handled by the next check
-
-        if not parts:
-            raise ValueError(f"Could not parse degree/minute/second part: {degrees_part}")
-
-        deg = float(parts[0])
-        minutes = float(parts[1]) if len(parts) > 1 else 0.0
-        seconds = float(parts[2]) if len(parts) > 2 else 0.0
-
-        decimal_degrees = deg + (minutes / 60.0) + (seconds / 3600.0)
-
-        azimuth = 0.0
-        if quadrant1 == 'N' and quadrant2 == 'E':
-            azimuth = decimal_degrees
-        elif quadrant1 == 'S' and quadrant2 == 'E':
-            azimuth = 180.0 - decimal_degrees
-        elif quadrant1 == 'S' and quadrant2 == 'W':
-            azimuth = 180.0 + decimal_degrees
-        elif quadrant1 == 'N' and quadrant2 == 'W':
-            azimuth = 360.0 - decimal_degrees
-        elif quadrant1 == 'N' and quadrant2 == 'S': # Cases like N0-0-0S, this is usually 0 or 180
-            if decimal_degrees == 0:
-                azimuth = 0.0 # North
-            else:
-                raise ValueError("N/S followed by S/N not standard bearing.")
-        elif quadrant1 == 'E' or quadrant1 == 'W':
-            raise ValueError("Bearing should start with N or S.")
-        else:
-            raise ValueError(f"Invalid quadrant specification: {quadrant1}{quadrant2}")
-
-
-        return azimuth % 360.0 # Ensure it's between 0 and 360
-
-    def _convert_azimuth_to_bearing_string(self, azimuth_deg):
-        """
-        Converts an azimuth in decimal degrees (0-360) to a bearing string (e.g., N45-30-15E).
-        """
-        azimuth_deg = azimuth_deg % 360  # Ensure 0-360
-
-        # Handle cardinal directions first with a small tolerance for floating point
-        if abs(azimuth_deg - 0) < 0.0001 or abs(azimuth_deg - 360) < 0.0001: return "N"
-        if abs(azimuth_deg - 90) < 0.0001: return "E"
-        if abs(azimuth_deg - 180) < 0.0001: return "S"
-        if abs(azimuth_deg - 270) < 0.0001: return "W"
-
-        quadrant_prefix = ''
-        quadrant_suffix = ''
-        bearing_value = 0.0
-
-        if 0 < azimuth_deg < 90:
-            quadrant_prefix = 'N'
-            quadrant_suffix = 'E'
-            bearing_value = azimuth_deg
-        elif 90 < azimuth_deg < 180:
-            quadrant_prefix = 'S'
-            quadrant_suffix = 'E'
-            bearing_value = 180 - azimuth_deg
-        elif 180 < azimuth_deg < 270:
-            quadrant_prefix = 'S'
-            quadrant_suffix = 'W'
-            bearing_value = azimuth_deg - 180
-        elif 270 < azimuth_deg < 360:
-            quadrant_prefix = 'N'
-            quadrant_suffix = 'W'
-            bearing_value = 360 - azimuth_deg
-        else:
-            # Should not happen if cardinal directions are handled, but as a fallback
-            return f"{azimuth_deg:.2f}" # Fallback to plain decimal degrees if not within standard quadrants
-
-        degrees = int(bearing_value)
-        minutes_float = (bearing_value - degrees) * 60
-        minutes = int(minutes_float)
-        seconds = round((minutes_float - minutes) * 60, 0) # Round to nearest second
-
-        # Adjust for rounding up, e.g., 59.99 seconds becomes 60
-        if seconds >= 60:
-            minutes += 1
-            seconds = 0
-        if minutes >= 60:
-            degrees += 1
-            minutes = 0
-            # If degrees goes to 90 due to rounding, re-check for cardinal directions
-            if degrees == 90:
-                 if quadrant_prefix == 'N' and quadrant_suffix == 'E': return "E"
-                 if quadrant_prefix == 'S' and quadrant_suffix == 'E': return "S"
-                 if quadrant_prefix == 'S' and quadrant_suffix == 'W': return "W"
-                 if quadrant_prefix == 'N' and quadrant_suffix == 'W': return "N"
-
-        return f"{quadrant_prefix}{degrees}-{minutes}-{int(seconds)}{quadrant_suffix}"
+    def _on_invalid_table_edit(self, row, column, text):
+        """Slot connected to the table model's invalidEdit signal."""
+        self.iface.messageBar().pushWarning("Traverse Plugin", f"Row {row + 1}: '{text}' is not a valid number for {COLUMN_NAMES[column]}.")
 
+    def _publish_diagnostics(self, diagnostics, message, level=Qgis.Info):
+        """
+        Shows one message bar item for a finished operation and writes the
+        full list of collected notes and warnings to the log in one batch.
+        The message bar level is raised to the most severe entry collected.
+        """
+        if len(diagnostics):
+            log_level = DIAGNOSTIC_LEVELS[diagnostics.highest_level]
+            QgsMessageLog.logMessage(diagnostics.report(), LOG_TAG, log_level)
+            if level == Qgis.Info and log_level != Qgis.Info:
+                level = log_level
+            message = f"{message} {diagnostics.summary()} (see the '{LOG_TAG}' tab of the Log Messages panel)."
+        self.iface.messageBar().pushMessage("Traverse Plugin", message, level=level)
 
     def draw_traverse_from_table(self):
         """
-        Draws traverse lines on the selected layer based on the data in the table widget.
+        Draws traverse lines on the selected layer based on the data in the table.
         """
         if self.iface is None or self.canvas is None:
             self.iface.messageBar().pushCritical("Traverse Plugin", "QGIS interface or map canvas not initialized. Please restart QGIS or the plugin.")
             return
 
-        selected_layer = self.mapLayerComboBox.currentLayer()
-        if selected_layer is None:
-            self.iface.messageBar().pushWarning("Traverse Plugin", "Please select a layer from the combo box to draw on.")
+        if self._draw_task is not None:
+            self.iface.messageBar().pushWarning("Traverse Plugin", "The traverse is already being drawn. Wait for it to finish or cancel it from the task manager.")
             return
 
-        if not isinstance(selected_layer, QgsVectorLayer):
-            self.iface.messageBar().pushWarning("Traverse Plugin", "Selected layer is not a vector layer. Please select a vector layer.")
-            return
-        
-        # Check if the layer is a line layer
-        if not (selected_layer.wkbType() == QgsWkbTypes.LineString or selected_layer.wkbType() == QgsWkbTypes.MultiLineString):
-            self.iface.messageBar().pushWarning("Traverse Plugin", f"Selected layer '{selected_layer.name()}' is not a line layer. Cannot draw traverse lines on it.")
+        selected_layer = self._target_line_layer()
+        if selected_layer is None:
             return
 
-        # Check if layer is editable and offer to toggle
-        is_editable_originally = selected_layer.isEditable()
-        if not is_editable_originally:
-            reply = QtWidgets.QMessageBox.question(self, 'Toggle Editing', 
-                                                   f"Layer '{selected_layer.name()}' is not in editing mode. Do you want to enable editing?",
-                                                   QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
-            if reply == QtWidgets.QMessageBox.Yes:
-                selected_layer.startEditing()
-                # Update QGIS UI to show editing mode if it wasn't already
-                if not self.iface.actionToggleEditing().isChecked():
-                    self.iface.actionToggleEditing().trigger() 
-            else:
-                self.iface.messageBar().pushWarning("Traverse Plugin", "Layer is not in editing mode. Cannot draw traverse lines.")
-                return
-        
         if self.start_point is None:
             self.iface.messageBar().pushWarning("Traverse Plugin", "Please set a START point before drawing traverse lines.")
-            # If we started editing for this operation, roll back
-            if not is_editable_originally:
-                selected_layer.rollBack()
-                if self.iface.actionToggleEditing().isChecked():
-                    self.iface.actionToggleEditing().trigger()
             return
 
-        if self.tableWidget.rowCount() == 0:
+        if self.tableModel.rowCount() == 0:
             self.iface.messageBar().pushWarning("Traverse Plugin", "The traverse table is empty. Add segments to draw.")
-            # If we started editing for this operation, roll back
-            if not is_editable_originally:
-                selected_layer.rollBack()
-                if self.iface.actionToggleEditing().isChecked():
-                    self.iface.actionToggleEditing().trigger()
             return
 
-        current_point = self.start_point
-        features_to_add = []
-        
-        # Ensure fields exist for attributes if we want to populate them
-        required_fields_info = [
-            ("segment_id", QVariant.Int),
-            ("direction", QVariant.String),
-            ("distance", QVariant.Double),
-            ("radius", QVariant.Double),
-            ("arc_length", QVariant.Double)
-        ]
-        
-        prov = selected_layer.dataProvider()
-        fields_to_add_to_layer = QgsFields()
-        for field_name, field_type in required_fields_info:
-            if selected_layer.fields().indexOf(field_name) == -1:
-                fields_to_add_to_layer.append(QgsField(field_name, field_type))
-        
+        if not self._confirm_direct_write(selected_layer):
+            return
+
+        diagnostics = Diagnostics(f"Drawing on {selected_layer.name()}")
+        if not self._ensure_fields(selected_layer, TRAVERSE_FIELDS, diagnostics):
+            return
+
+        snapshot = self._table_snapshot(diagnostics)
+        closing_point = None
+        if self.closing_point is not None:
+            closing_point = (self.closing_point.x(), self.closing_point.y())
+        self._draw_task = DrawTraverseTask(
+            f"Drawing traverse on '{selected_layer.name()}'",
+            snapshot,
+            QgsFields(selected_layer.fields()),
+            lambda task, success: self._on_draw_task_finished(task, success, selected_layer, diagnostics),
+            use_true_arcs=self._use_true_arcs(selected_layer, diagnostics),
+            densify_options=self._densify_options(),
+            closing_point=closing_point,
+            closing_azimuth=self._closing_azimuth(diagnostics),
+            adjustment=QSettings().value(SETTINGS_ADJUSTMENT, '') or None,
+            profiler=self.profiler,
+        )
+        self.finishButton.setEnabled(False)
+        QgsApplication.taskManager().addTask(self._draw_task)
+
+    def _target_line_layer(self):
+        """
+        The line layer selected in the combo box, or None (after telling
+        the user why) when there is none or it cannot take traverse lines.
+        """
+        selected_layer = self.mapLayerComboBox.currentLayer()
+        if selected_layer is None:
+            self.iface.messageBar().pushWarning("Traverse Plugin", "Please select a layer from the combo box to draw on.")
+            return None
+
+        if not isinstance(selected_layer, QgsVectorLayer):
+            self.iface.messageBar().pushWarning("Traverse Plugin", "Selected layer is not a vector layer. Please select a vector layer.")
+            return None
+
+        # Check if the layer is a line layer (LineString, MultiLineString, CompoundCurve, MultiCurve...)
+        if selected_layer.geometryType() != QgsWkbTypes.LineGeometry:
+            self.iface.messageBar().pushWarning("Traverse Plugin", f"Selected layer '{selected_layer.name()}' is not a line layer. Cannot draw traverse lines on it.")
+            return None
+        return selected_layer
+
+    def _confirm_direct_write(self, layer):
+        """
+        Layers outside an edit session are written straight through the data
+        provider; asks the user first. Returns False when they decline.
+        """
+        if layer.isEditable():
+            return True
+        reply = QtWidgets.QMessageBox.question(self, 'Write Directly',
+                                               f"Layer '{layer.name()}' is not in editing mode. Write the traverse directly to its data source?",
+                                               QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
+        if reply != QtWidgets.QMessageBox.Yes:
+            self.iface.messageBar().pushWarning("Traverse Plugin", "Layer is not in editing mode. Cannot draw traverse lines.")
+            return False
+        return True
+
+    def _ensure_fields(self, layer, field_specs, diagnostics):
+        """Adds the missing ``field_specs`` to ``layer``. Returns False when that fails."""
+        fields_to_add_to_layer = missing_traverse_fields(layer.fields(), field_specs)
         if fields_to_add_to_layer.count() > 0:
-            if not prov.addAttributes(fields_to_add_to_layer):
+            if not layer.dataProvider().addAttributes(fields_to_add_to_layer):
                 self.iface.messageBar().pushCritical("Traverse Plugin", "Failed to add required fields to the layer.")
-                if not is_editable_originally: # Only rollback if we started editing
-                    selected_layer.rollBack()
-                    if self.iface.actionToggleEditing().isChecked():
-                        self.iface.actionToggleEditing().trigger()
-                return
-            selected_layer.updateFields()
-            self.iface.messageBar().pushMessage("Traverse Plugin", f"Added missing fields to layer '{selected_layer.name()}'.", level=Qgis.Info)
-
-        # Initialize last_segment_exit_azimuth. This will store the exit tangent direction of the *previously drawn* segment.
-        last_segment_exit_azimuth = None 
+                return False
+            layer.updateFields()
+            diagnostics.info(f"Added missing fields to layer '{layer.name()}'.")
+        return True
 
+    def _on_draw_task_finished(self, task, success, selected_layer, diagnostics):
+        """
+        Main-thread completion handler of the draw task: writes the built
+        features to the layer in chunks, or reports cancellation/failure.
+        """
+        if self._closing:
+            return
+        if task.result is not None:
+            diagnostics.add_issues(task.result.issues)
+        if task.closure is not None:
+            diagnostics.info(format_misclosure(task.closure))
+            if task.adjustment:
+                diagnostics.info(f"Stations adjusted onto the closing point with the {task.adjustment} rule.")
+        self._write_task_features(task, success, selected_layer, diagnostics, "line segments")
+
+    def _write_task_features(self, task, success, selected_layer, diagnostics, what):
+        """
+        Writes the features built by a finished draw or batch task to the
+        layer in chunks and publishes ``diagnostics``.
+        """
+        self._draw_task = None
+        self.finishButton.setEnabled(True)
+        writer = FeatureWriter(selected_layer, self._write_chunk_size())
         try:
-            for row_idx in range(self.tableWidget.rowCount()):
-                direction_item = self.tableWidget.item(row_idx, 0)
-                distance_item = self.tableWidget.item(row_idx, 1)
-                radius_item = self.tableWidget.item(row_idx, 2)
-                arc_length_item = self.tableWidget.item(row_idx, 3)
-
-                # If any key item is missing or empty, skip this row
-                if not (direction_item and distance_item and distance_item.text().strip()): # Direction can be empty for tangent
-                    self.iface.messageBar().pushWarning("Traverse Plugin", f"Skipping incomplete row {row_idx + 1} in table for drawing. (Missing Distance or invalid Direction)")
-                    continue
-
-                segment_tangent_azimuth_deg = 0.0
-                direction_str_from_table = direction_item.text().strip() if direction_item else "" # Handle case where item might be None
-
-                # Determine the azimuth for the START of the current segment
-                if row_idx == 0: # First segment always uses its own explicit direction
-                    if not direction_str_from_table: # First segment needs an explicit direction
-                         self.iface.messageBar().pushWarning("Traverse Plugin", f"Row {row_idx + 1}: First segment must have an explicit direction. Skipping segment.")
-                         continue
-                    try:
-                        cleaned_direction_str = direction_str_from_table.replace('°', '').strip()
-                        segment_tangent_azimuth_deg = float(cleaned_direction_str) 
-                    except ValueError:
-                        try:
-                            segment_tangent_azimuth_deg = self._parse_bearing_to_azimuth(direction_str_from_table) 
-                        except ValueError as ve:
-                            self.iface.messageBar().pushWarning("Traverse Plugin", f"Row {row_idx + 1}: Invalid direction format '{direction_str_from_table}'. Expected decimal degrees (e.g., '45.00') or bearing (e.g., 'N45-30-15E'). Skipping segment. Error: {ve}")
-                            continue
-                elif direction_str_from_table == "*" or not direction_str_from_table: # Tangent to previous segment's exit
-                    if last_segment_exit_azimuth is None:
-                        self.iface.messageBar().pushWarning("Traverse Plugin", f"Row {row_idx + 1}: Cannot determine tangent direction. Previous segment had no valid exit direction. Please specify direction explicitly for this row or ensure previous row is valid.")
-                        continue
-                    segment_tangent_azimuth_deg = last_segment_exit_azimuth
-                    self.iface.messageBar().pushMessage("Traverse Plugin", f"Row {row_idx + 1}: Using tangent direction from previous segment ({segment_tangent_azimuth_deg:.2f}°).", level=Qgis.Info)
-                else: # Nontangent, explicit direction given
-                    try:
-                        cleaned_direction_str = direction_str_from_table.replace('°', '').strip()
-                        segment_tangent_azimuth_deg = float(cleaned_direction_str) 
-                    except ValueError:
-                        try:
-                            segment_tangent_azimuth_deg = self._parse_bearing_to_azimuth(direction_str_from_table) 
-                        except ValueError as ve:
-                            self.iface.messageBar().pushWarning("Traverse Plugin", f"Row {row_idx + 1}: Invalid direction format '{direction_str_from_table}'. Expected decimal degrees (e.g., '45.00') or bearing (e.g., 'N45-30-15E'). Skipping segment. Error: {ve}")
-                            continue
-                
-                # Ensure azimuth is within 0-360 range
-                segment_tangent_azimuth_deg = segment_tangent_azimuth_deg % 360
-                if segment_tangent_azimuth_deg < 0:
-                    segment_tangent_azimuth_deg += 360
-
-                try:
-                    distance = float(distance_item.text())
-                    radius = float(radius_item.text()) if (radius_item and radius_item.text().strip()) else 0.0
-                    arc_length = float(arc_length_item.text()) if (arc_length_item and arc_length_item.text().strip()) else 0.0
-                    
-                    polyline_points = []
-                    polyline_points.append(current_point) # Start of current segment
-
-                    next_point = current_point # Default to no movement, will be updated
-
-                    if radius != 0.0 and arc_length != 0.0:
-                        # --- Curve Calculation ---
-                        # Azimuth is clockwise from North (Y-axis)
-                        # Standard math angle is counter-clockwise from East (X-axis)
-                        
-                        # Convert segment's STARTING tangent azimuth to standard math radians 
-                        # for the tangent direction at current_point
-                        tangent_math_rad = math.radians(90 - segment_tangent_azimuth_deg) 
-
-                        # Calculate center of the circle
-                        # Center is perpendicular to tangent, 'radius' distance away.
-                        # If radius > 0 (right turn), center is 90 deg CLOCKWISE from tangent (tangent_math_rad - PI/2)
-                        # If radius < 0 (left turn), center is 90 deg COUNTER-CLOCKWISE from tangent (tangent_math_rad + PI/2)
-                        # This can be achieved with: center_angle_rad = tangent_math_rad - math.copysign(math.pi / 2, radius)
-                        # Example: if radius is +50 (right turn), copysign is +PI/2, so tangent_math_rad - PI/2 (clockwise)
-                        # Example: if radius is -50 (left turn), copysign is -PI/2, so tangent_math_rad - (-PI/2) = tangent_math_rad + PI/2 (counter-clockwise)
-                        
-                        center_angle_rad = tangent_math_rad - math.copysign(math.pi / 2, radius)
-                        
-                        center_x = current_point.x() + abs(radius) * math.cos(center_angle_rad)
-                        center_y = current_point.y() + abs(radius) * math.sin(center_angle_rad)
-                        center_point = QgsPointXY(center_x, center_y)
-
-                        # Calculate start angle of the arc relative to the center
-                        start_arc_angle = math.atan2(current_point.y() - center_y, current_point.x() - center_x)
-
-                        # Calculate delta angle (central angle)
-                        delta_angle_rad = arc_length / abs(radius)
-                        
-                        # Determine end angle based on direction of curve (sign of radius)
-                        # If radius > 0 (Right turn), sweep is clockwise (subtract delta_angle_rad)
-                        # If radius < 0 (Left turn), sweep is counter-clockwise (add delta_angle_rad)
-                        # This can be achieved with: end_arc_angle = start_arc_angle + math.copysign(delta_angle_rad, -radius) 
-                        # Example: if radius is +50 (right turn), copysign(-val, -50) is -val, so start_arc_angle - delta_angle_rad (clockwise)
-                        # Example: if radius is -50 (left turn), copysign(-val, 50) is +val, so start_arc_angle + delta_angle_rad (counter-clockwise)
-                        end_arc_angle = start_arc_angle + math.copysign(delta_angle_rad, -radius) 
-
-                        # Ensure sweep is in correct direction and handle wrapping around 2*pi
-                        if radius > 0: # Right turn, clockwise sweep (angles should decrease)
-                            # If end_arc_angle is numerically greater than start_arc_angle, it means we wrapped around 0/2pi
-                            while end_arc_angle > start_arc_angle:
-                                end_arc_angle -= 2 * math.pi
-                            step_angle = (end_arc_angle - start_arc_angle) / NUM_CURVE_SEGMENTS
-                        else: # Left turn, counter-clockwise sweep (angles should increase)
-                            # If end_arc_angle is numerically less than start_arc_angle, it means we wrapped around 0/2pi
-                            while end_arc_angle < start_arc_angle:
-                                end_arc_angle += 2 * math.pi
-                            step_angle = (end_arc_angle - start_arc_angle) / NUM_CURVE_SEGMENTS
-
-                        # Generate intermediate points
-                        for i in range(1, NUM_CURVE_SEGMENTS + 1):
-                            interp_angle = start_arc_angle + i * step_angle
-                            px = center_x + abs(radius) * math.cos(interp_angle)
-                            py = center_y + abs(radius) * math.sin(interp_angle)
-                            polyline_points.append(QgsPointXY(px, py))
-                        
-                        next_point = polyline_points[-1] # Last point of the arc is the end of the segment
-                        self.iface.messageBar().pushMessage("Traverse Plugin", f"Row {row_idx + 1}: Drawn as curve (Radius: {radius:.3f}, Arc Length: {arc_length:.3f}).", level=Qgis.Info)
-
-                        # Calculate exit tangent for the current curve for the next segment's 'tangent to previous'
-                        radial_angle_at_end = math.atan2(next_point.y() - center_point.y(), next_point.x() - center_point.x())
-                        exit_tangent_math_rad = 0.0
-                        if radius > 0: # Right turn, tangent is 90 deg CLOCKWISE from radial at end point
-                            exit_tangent_math_rad = radial_angle_at_end + math.pi / 2
-                        else: # Left turn, tangent is 90 deg COUNTER-CLOCKWISE from radial at end point
-                            exit_tangent_math_rad = radial_angle_at_end - math.pi / 2
-                            
-                        # Convert this math angle back to survey azimuth (0-360)
-                        exit_tangent_azimuth_deg = (90 - math.degrees(exit_tangent_math_rad)) % 360
-                        if exit_tangent_azimuth_deg < 0: # Ensure positive 0-360
-                            exit_tangent_azimuth_deg += 360
-                        last_segment_exit_azimuth = exit_tangent_azimuth_deg
-
-                    else: # Straight line
-                        # Use the determined segment_tangent_azimuth_deg for straight line
-                        azimuth_rad = math.radians(segment_tangent_azimuth_deg)
-                        dx = distance * math.sin(azimuth_rad)
-                        dy = distance * math.cos(azimuth_rad)
-                        next_point = QgsPointXY(current_point.x() + dx, current_point.y() + dy)
-                        polyline_points.append(next_point) # Add end point for straight line
-                        last_segment_exit_azimuth = segment_tangent_azimuth_deg # Exit tangent is the same as its direction
-
-
-                    feat = QgsFeature(selected_layer.fields()) # Create feature with layer's current fields
-                    feat.setGeometry(QgsGeometry.fromPolylineXY(polyline_points))
-                    
-                    # Set attributes using field names (reliable if fields were added/exist)
-                    feat.setAttribute(selected_layer.fields().indexOf("segment_id"), row_idx)
-                    # Store the *effective* direction used for drawing this segment
-                    feat.setAttribute(selected_layer.fields().indexOf("direction"), self._convert_azimuth_to_bearing_string(segment_tangent_azimuth_deg)) 
-                    feat.setAttribute(selected_layer.fields().indexOf("distance"), distance)
-                    feat.setAttribute(selected_layer.fields().indexOf("radius"), radius)
-                    feat.setAttribute(selected_layer.fields().indexOf("arc_length"), arc_length)
-                    
-                    features_to_add.append(feat)
-                    current_point = next_point # Update current point for next segment
-
-                except ValueError: # Catches errors from float() conversions for distance/radius/arc_length
-                    self.iface.messageBar().pushWarning("Traverse Plugin", f"Invalid numeric input (Distance, Radius, or Arc Length) in row {row_idx + 1}. Please ensure they are numbers.")
-                    continue
-                except Exception as e: # Catch other unexpected errors during loop
-                    self.iface.messageBar().pushCritical("Traverse Plugin", f"Error processing row {row_idx + 1}: {e}")
-                    raise # Re-raise to trigger the outer exception handler
-
-            if features_to_add:
-                selected_layer.addFeatures(features_to_add)
-                selected_layer.commitChanges() # Commit changes to the layer
-                selected_layer.updateExtents() # Update layer extent to encompass new features
-                self.iface.mapCanvas().setExtent(selected_layer.extent()) # Zoom to new extent
+            if task.exception is not None:
+                raise task.exception
+            if not success:
+                self._publish_diagnostics(diagnostics, "Drawing the traverse was cancelled. No features were added.", Qgis.Warning)
+                return
+
+            features_to_add = task.features
+            if not features_to_add:
+                self._publish_diagnostics(diagnostics, "No valid traverse segments were drawn.", Qgis.Warning)
+                return
+            if not writer.can_write():
+                raise RuntimeError(f"The data source of layer '{selected_layer.name()}' does not support adding features")
+
+            with self.profiler.stage('add_features', len(features_to_add), direct=writer.direct):
+                writer.write(features_to_add, task.extent)
+            if not writer.direct:
+                with self.profiler.stage('commit_changes', len(features_to_add)):
+                    selected_layer.commitChanges() # Commit changes to the layer
+            if writer.direct and self.snapIndexes is not None:
+                # Provider writes bypass the layer signals the snapping index follows
+                self.snapIndexes.invalidate(selected_layer)
+            with self.profiler.stage('canvas_refresh'):
+                writer.finish()
+                self.iface.mapCanvas().setExtent(writer.extent) # Zoom to the drawn features
                 self.iface.mapCanvas().refresh()
-                self.iface.messageBar().pushMessage("Traverse Plugin", f"Successfully drawn {len(features_to_add)} line segments on layer '{selected_layer.name()}'.", level=Qgis.Info)
-            else:
-                self.iface.messageBar().pushWarning("Traverse Plugin", "No valid traverse segments were drawn.")
+            self._publish_diagnostics(diagnostics, f"Successfully drawn {len(features_to_add)} {what} on layer '{selected_layer.name()}'.")
 
         except Exception as e:
-            self.iface.messageBar().pushCritical("Traverse Plugin", f"An unexpected error occurred during drawing: {e}. Changes rolled back.")
+            if writer.direct:
+                # Chunks already written through the provider cannot be rolled back
+                if not writer.written:
+                    self._publish_diagnostics(diagnostics, f"An unexpected error occurred during drawing: {e}. No features were added.", Qgis.Critical)
+                    return
+                writer.finish() # No-op when the error came after it
+                self._publish_diagnostics(diagnostics, f"An unexpected error occurred during drawing: {e}. {writer.written} segment(s) were already written.", Qgis.Critical)
+                return
+            self._publish_diagnostics(diagnostics, f"An unexpected error occurred during drawing: {e}. Changes rolled back.", Qgis.Critical)
             # Rollback any pending changes if an error occurred
             if selected_layer.isEditable() and selected_layer.isModified():
                 selected_layer.rollBack()
-        finally:
-            # If we started editing this layer for this operation, stop editing
-            if not is_editable_originally and selected_layer.isEditable():
-                selected_layer.commitChanges() # Try to commit, if it fails, QGIS will prompt
-                if self.iface.actionToggleEditing().isChecked(): # Ensure UI button reflects state
-                    self.iface.actionToggleEditing().trigger() 
 
-    def on_table_cell_clicked(self, row, column):
+    def batch_import_folder(self):
+        """
+        Asks for a folder of traverse files and a file name pattern, solves
+        every file in the background on a thread pool and writes all their legs
+        to the selected line layer, each tagged with its ``source_file``.
+        """
+        if self.iface is None:
+            return
+        if self._draw_task is not None:
+            self.iface.messageBar().pushWarning("Traverse Plugin", "A traverse is already being drawn. Wait for it to finish or cancel it from the task manager.")
+            return
+
+        selected_layer = self._target_line_layer()
+        if selected_layer is None:
+            return
+
+        folder = QtWidgets.QFileDialog.getExistingDirectory(self, "Batch Import Traverse Files", "")
+        if not folder:
+            return
+        pattern, ok = QtWidgets.QInputDialog.getText(self, "Batch Import", "File name pattern (e.g. *.txt):",
+                                                     QtWidgets.QLineEdit.Normal, DEFAULT_PATTERN)
+        if not ok:
+            return
+        paths = find_traverse_files(folder, pattern.strip() or DEFAULT_PATTERN)
+        if not paths:
+            self.iface.messageBar().pushWarning("Traverse Plugin", f"No files matching '{pattern}' in {folder}.")
+            return
+
+        if not self._confirm_direct_write(selected_layer):
+            return
+        diagnostics = Diagnostics(f"Batch import of {len(paths)} file(s) into {selected_layer.name()}")
+        if not self._ensure_fields(selected_layer, BATCH_FIELDS, diagnostics):
+            return
+
+        self._draw_task = BatchImportTask(
+            f"Importing {len(paths)} traverse files into '{selected_layer.name()}'",
+            paths,
+            QgsFields(selected_layer.fields()),
+            lambda task, success: self._on_batch_task_finished(task, success, selected_layer, diagnostics),
+            use_true_arcs=self._use_true_arcs(selected_layer, diagnostics),
+            densify_options=self._densify_options(),
+            adjustment=QSettings().value(SETTINGS_ADJUSTMENT, '') or None,
+            profiler=self.profiler,
+        )
+        self.finishButton.setEnabled(False)
+        QgsApplication.taskManager().addTask(self._draw_task)
+
+    def _on_batch_task_finished(self, task, success, selected_layer, diagnostics):
+        """Records one summary line per failed file, then writes all features."""
+        if self._closing:
+            return
+        for path, leg_count, errors, failure in task.file_results:
+            name = os.path.basename(path)
+            if failure:
+                diagnostics.warning(f"{name}: {failure}")
+            for message in errors:
+                diagnostics.warning(f"{name}: {message}")
+        failed = sum(1 for file_result in task.file_results if file_result[3])
+        if failed:
+            diagnostics.warning(f"{failed} of {len(task.paths)} file(s) could not be imported.")
+        self._write_task_features(task, success, selected_layer, diagnostics,
+                                  f"segments from {len(task.file_results) - failed} file(s)")
+
+    def on_table_cell_clicked(self, index):
         """
-        Slot connected to self.tableWidget.cellClicked.
+        Slot connected to self.tableView.clicked.
         Adds a new empty row if the click occurs on the last populated row.
         """
-        total_rows = self.tableWidget.rowCount()
+        row = index.row()
+        total_rows = self.tableModel.rowCount()
         
         # If table is empty, add the first row on any click
         if total_rows == 0:
@@ -629,27 +701,26 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         # If the clicked row is the last row
         if row == total_rows - 1:
             # Check if the 'Direction' cell in the last row is not empty
-            direction_item = self.tableWidget.item(row, 0)
-            if direction_item and direction_item.text().strip() != "":
+            if self.tableModel.store.value(row, COLUMN_DIRECTION) != "":
                 self._add_single_empty_row()
-                self.tableWidget.setCurrentCell(total_rows, 0) # Set focus to the new row
+                self.tableView.setCurrentIndex(self.tableModel.index(total_rows, 0)) # Set focus to the new row
 
     def _show_table_context_menu(self, pos):
         """
-        Displays a context menu when the table widget is right-clicked.
+        Displays a context menu when the table view is right-clicked.
         """
         menu = QtWidgets.QMenu()
         delete_action = menu.addAction("Delete Row(s)")
         
-        action = menu.exec_(self.tableWidget.mapToGlobal(pos))
+        action = menu.exec_(self.tableView.viewport().mapToGlobal(pos))
         if action == delete_action:
             self._delete_selected_rows()
 
     def _delete_selected_rows(self):
         """
-        Deletes the currently selected row(s) from the table widget.
+        Deletes the currently selected row(s) from the table view.
         """
-        selected_rows = sorted(list(set(index.row() for index in self.tableWidget.selectedIndexes())), reverse=True)
+        selected_rows = sorted(set(index.row() for index in self.tableView.selectionModel().selectedIndexes()), reverse=True)
         if not selected_rows:
             self.iface.messageBar().pushMessage("Traverse Plugin", "No rows selected to delete.", level=Qgis.Info)
             return
@@ -658,8 +729,7 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
                                                f"Are you sure you want to delete {len(selected_rows)} selected row(s)?",
                                                QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
         if reply == QtWidgets.QMessageBox.Yes:
-            for row_idx in selected_rows:
-                self.tableWidget.removeRow(row_idx)
+            self.tableModel.remove_row_set(selected_rows)
             self.iface.messageBar().pushMessage("Traverse Plugin", f"Deleted {len(selected_rows)} row(s).", level=Qgis.Info)
         else:
             self.iface.messageBar().pushMessage("Traverse Plugin", "Row deletion cancelled.", level=Qgis.Info)
@@ -670,10 +740,20 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         Clears all rows from the table and adds a single new empty row
         to begin a new traverse entry.
         """
-        self.tableWidget.setRowCount(0)
+        import_canceled = isinstance(self._file_task, ImportTraverseTask)
+        if import_canceled:
+            # Its batches would land in the new table
+            self._file_task.cancel()
+            self._file_task = None
+            self._set_file_task_running(False)
+        self.tableModel.clear()
+        if import_canceled:
+            # Re-solves the now empty table only
+            self._resume_live_traverse()
         self._add_single_empty_row()
         self.start_point = None # Also clear start/closing points for a fresh traverse
         self.closing_point = None
+        self.closing_direction = None
         self._first_trace_point = None # Clear any pending first trace point
         self.iface.messageBar().pushMessage("Traverse Plugin", "Table cleared. Ready for new traverse entry.", level=Qgis.Info)
 
@@ -681,9 +761,18 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
     def import_data(self):
         """
         Opens a file dialog to select a data file (e.g., CSV, TXT)
-        and populates the table widget with the imported data.
-        This version is updated to handle 'DD' lines from 'import.txt'.
+        and populates the table with the imported data.
+        DD (straight) and CV (curve) records become table rows; SP/EP set
+        the start and closing points. The file is read in the background and
+        the table filled in batches as it goes.
         """
+        if self._file_task is not None:
+            self.iface.messageBar().pushWarning("Traverse Plugin", "A traverse file is already being read or written. Wait for it to finish or cancel it from the task manager.")
+            return
+        if self._draw_task is not None:
+            self.iface.messageBar().pushWarning("Traverse Plugin", "The traverse is being drawn. Wait for it to finish before importing.")
+            return
+
         file_dialog = QtWidgets.QFileDialog()
         file_path, _ = file_dialog.getOpenFileName(
             self,
@@ -693,77 +782,84 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         )
 
         if file_path:
-            self.iface.messageBar().pushMessage("Traverse Plugin", f"Attempting to import data from: {file_path}", level=Qgis.Info)
-            self.tableWidget.setRowCount(0)
+            diagnostics = Diagnostics(f"Import of {os.path.basename(file_path)}")
+            self.tableModel.clear()
+            # The batches are solved once, when the import is over
+            self.liveTraverse.suspend()
+            self._file_task = ImportTraverseTask(
+                f"Importing traverse file '{os.path.basename(file_path)}'",
+                file_path,
+                diagnostics,
+                lambda task, success: self._on_import_task_finished(task, success, diagnostics),
+                profiler=self.profiler,
+            )
+            self._file_task.batchReady.connect(self._load_import_batch)
+            self._set_file_task_running(True)
+            QgsApplication.taskManager().addTask(self._file_task)
+
+    def _load_import_batch(self, prepared):
+        """Slot for ImportTraverseTask.batchReady: appends a batch of legs to the table."""
+        task = self.sender()
+        if self._closing or task is not self._file_task or task.isCanceled():
+            return # Left over from a cancelled import
+        with self.profiler.stage('table_load', len(prepared[0])):
+            self.tableModel.append_prepared(prepared)
+
+    def _resume_live_traverse(self):
+        """Solves the table loaded while the live traverse was suspended."""
+        with self.profiler.stage('compute', len(self.tableModel.store)):
+            self.liveTraverse.resume()
+        # Snapshots taken meanwhile came from the suspended traverse
+        self.resultCache.invalidate()
+        self._schedule_preview()
+
+    def _on_import_task_finished(self, task, success, diagnostics):
+        """Main-thread completion handler of the import task."""
+        if self._closing or task is not self._file_task:
+            return # Abandoned when a new traverse was started
+        self._file_task = None
+        self._set_file_task_running(False)
+        file_name = os.path.basename(task.file_path)
+        if task.exception is not None:
+            self.tableModel.clear()
+            self._resume_live_traverse()
+            if isinstance(task.exception, FileNotFoundError):
+                message = f"File not found: {task.file_path}"
+            else:
+                message = f"An error occurred during import: {task.exception}"
+            diagnostics.critical(message)
+            self._publish_diagnostics(diagnostics, message, Qgis.Critical)
+            return
+        if not success:
+            # A partial traverse would silently misplace everything after it
+            self.tableModel.clear()
+            self._resume_live_traverse()
+            self._publish_diagnostics(diagnostics, f"Import of {file_name} was cancelled. The table was cleared.", Qgis.Warning)
+            return
 
-            try:
-                with open(file_path, 'r') as f:
-                    for line_num, line in enumerate(f, 1):
-                        parts = line.strip().split(' ')
-                        
-                        if not parts:
-                            continue
-
-                        line_type = parts[0].upper()
-
-                        if line_type == 'DD' and len(parts) >= 3:
-                            try:
-                                direction = parts[1].strip()
-                                distance = float(parts[2].strip())
-                                radius = 0.0
-                                arc_length = 0.0
-                                self.add_traverse_segment(direction, distance, radius, arc_length)
-                            except ValueError:
-                                self.iface.messageBar().pushWarning("Traverse Plugin",
-                                                                    f"Skipping line {line_num}: Malformed numeric data for DD. Line: '{line.strip()}'")
-                            except Exception as e:
-                                self.iface.messageBar().pushCritical("Traverse Plugin",
-                                                                    f"Error processing DD line {line_num}: {e}. Line: '{line.strip()}'")
-                        elif line_type == 'SP' and len(parts) >= 3:
-                            try:
-                                x = float(parts[1].strip())
-                                y = float(parts[2].strip())
-                                self.start_point = QgsPointXY(x, y)
-                                self.iface.messageBar().pushMessage("Traverse Plugin", f"Start point set from file: {self.start_point.toString()}", level=Qgis.Info)
-                            except ValueError:
-                                self.iface.messageBar().pushWarning("Traverse Plugin",
-                                                                    f"Skipping line {line_num}: Malformed numeric data for SP. Line: '{line.strip()}'")
-                            except Exception as e:
-                                self.iface.messageBar().pushCritical("Traverse Plugin",
-                                                                    f"Error processing SP line {line_num}: {e}. Line: '{line.strip()}'")
-                        elif line_type == 'EP' and len(parts) >= 3:
-                            try:
-                                x = float(parts[1].strip())
-                                y = float(parts[2].strip())
-                                self.closing_point = QgsPointXY(x, y)
-                                self.iface.messageBar().pushMessage("Traverse Plugin", f"Closing point set from file: {self.closing_point.toString()}", level=Qgis.Info)
-                            except ValueError:
-                                self.iface.messageBar().pushWarning("Traverse Plugin",
-                                                                    f"Skipping line {line_num}: Malformed numeric data for EP. Line: '{line.strip()}'")
-                            except Exception as e:
-                                self.iface.messageBar().pushCritical("Traverse Plugin",
-                                                                    f"Error processing EP line {line_num}: {e}. Line: '{line.strip()}'")
-                        elif line_type in ['DT', 'DU']:
-                            self.iface.messageBar().pushMessage("Traverse Plugin", f"Skipping line {line_num}: Unit/Type definition not handled in this version. Line: '{line.strip()}'", level=Qgis.Info)
-                        else:
-                            self.iface.messageBar().pushWarning("Traverse Plugin",
-                                                                f"Skipping line {line_num}: Unrecognized format or incomplete data. Line: '{line.strip()}'")
-
-                self.iface.messageBar().pushMessage("Traverse Plugin", f"Successfully imported data from {os.path.basename(file_path)}.", level=Qgis.Info)
-            except FileNotFoundError:
-                self.iface.messageBar().pushCritical("Traverse Plugin", f"File not found: {file_path}")
-            except Exception as e:
-                self.iface.messageBar().pushCritical("Traverse Plugin", f"An error occurred during import: {e}")
+        with self.profiler.stage('table_load', len(task.remaining[0])):
+            self.tableModel.append_prepared(task.remaining)
+        self._resume_live_traverse()
+        if task.start_point is not None:
+            self.start_point = QgsPointXY(*task.start_point)
+        if task.closing_point is not None:
+            self.closing_point = QgsPointXY(*task.closing_point)
+            self.closing_direction = task.closing_direction
+        self._publish_diagnostics(diagnostics, f"Imported {task.leg_count} segment(s) from {file_name}.")
 
     def export_data(self):
         """
-        Exports the traverse data from the table widget and optionally
+        Exports the traverse data from the table and optionally
         the start/closing points to a text file in a format similar to import.txt.
-        Calculates the closing point if not explicitly set.
+        Calculates the closing point if not explicitly set. The lines are
+        formatted and written in the background.
         """
         if self.iface is None:
             self.iface.messageBar().pushCritical("Traverse Plugin", "QGIS interface not initialized. Cannot export data.")
             return
+        if self._file_task is not None:
+            self.iface.messageBar().pushWarning("Traverse Plugin", "A traverse file is already being read or written. Wait for it to finish or cancel it from the task manager.")
+            return
 
         file_dialog = QtWidgets.QFileDialog()
         file_path, _ = file_dialog.getSaveFileName(
@@ -774,173 +870,73 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         )
 
         if file_path:
-            try:
-                with open(file_path, 'w') as f:
-                    f.write("DT QB\n")
-                    f.write("DU DMS\n")
+            if not self.start_point:
+                self.iface.messageBar().pushWarning("Traverse Plugin", "No start point set. Cannot export full traverse definition without it.")
+                # If no start point, cannot calculate closing point based on segments
+                return
 
-                    if self.start_point:
-                        f.write(f"SP {self.start_point.x():.6f} {self.start_point.y():.6f}\n")
-                    else:
-                        self.iface.messageBar().pushWarning("Traverse Plugin", "No start point set. Cannot export full traverse definition without it.")
-                        # If no start point, cannot calculate closing point based on segments
-                        return 
-
-                    # Calculate closing point if it's not explicitly set
-                    # This calculation also needs to respect the tangency logic
-                    if self.closing_point is None:
-                        calculated_closing_point = self.start_point
-                        current_calc_azimuth = None # Will store exit azimuth of previous segment
-
-                        for row_idx in range(self.tableWidget.rowCount()):
-                            direction_item = self.tableWidget.item(row_idx, 0)
-                            distance_item = self.tableWidget.item(row_idx, 1)
-                            radius_item = self.tableWidget.item(row_idx, 2)
-                            arc_length_item = self.tableWidget.item(row_idx, 3)
-
-                            if not (direction_item and distance_item and distance_item.text().strip()): # Direction can be empty for tangent
-                                self.iface.messageBar().pushWarning("Traverse Plugin", f"Skipping incomplete row {row_idx + 1} during closing point calculation.")
-                                continue
-                            
-                            segment_tangent_azimuth_deg_calc = 0.0
-                            direction_str_from_table_calc = direction_item.text().strip() if direction_item else ""
-
-                            if row_idx == 0:
-                                if not direction_str_from_table_calc:
-                                    self.iface.messageBar().pushWarning("Traverse Plugin", f"Row {row_idx + 1}: First segment must have an explicit direction for closing point calculation. Skipping segment.")
-                                    continue
-                                try:
-                                    cleaned_dir_str_calc = direction_str_from_table_calc.replace('°', '').strip()
-                                    segment_tangent_azimuth_deg_calc = float(cleaned_dir_str_calc)
-                                except ValueError:
-                                    segment_tangent_azimuth_deg_calc = self._parse_bearing_to_azimuth(direction_str_from_table_calc)
-                            elif direction_str_from_table_calc == "*" or not direction_str_from_table_calc:
-                                if current_calc_azimuth is None:
-                                    self.iface.messageBar().pushWarning("Traverse Plugin", f"Row {row_idx + 1}: Cannot determine tangent direction for closing point calculation. Skipping segment.")
-                                    continue
-                                segment_tangent_azimuth_deg_calc = current_calc_azimuth
-                            else:
-                                try:
-                                    cleaned_dir_str_calc = direction_str_from_table_calc.replace('°', '').strip()
-                                    segment_tangent_azimuth_deg_calc = float(cleaned_dir_str_calc)
-                                except ValueError:
-                                    segment_tangent_azimuth_deg_calc = self._parse_bearing_to_azimuth(direction_str_from_table_calc)
-                            
-                            segment_tangent_azimuth_deg_calc = segment_tangent_azimuth_deg_calc % 360
-                            if segment_tangent_azimuth_deg_calc < 0:
-                                segment_tangent_azimuth_deg_calc += 360
-
-                            try:
-                                distance = float(distance_item.text())
-                                radius = float(radius_item.text()) if (radius_item and radius_item.text().strip()) else 0.0
-                                arc_length = float(arc_length_item.text()) if (arc_length_item and arc_length_item.text().strip()) else 0.0
-
-                                if radius != 0.0 and arc_length != 0.0:
-                                    # Curve calculation for closing point
-                                    tangent_math_rad_calc = math.radians(90 - segment_tangent_azimuth_deg_calc)
-                                    center_angle_rad_calc = tangent_math_rad_calc - math.copysign(math.pi / 2, radius)
-                                    
-                                    center_x_calc = calculated_closing_point.x() + abs(radius) * math.cos(center_angle_rad_calc)
-                                    center_y_calc = calculated_closing_point.y() + abs(radius) * math.sin(center_angle_rad_calc)
-                                    center_point_calc = QgsPointXY(center_x_calc, center_y_calc)
-                                    
-                                    start_arc_angle_calc = math.atan2(calculated_closing_point.y() - center_y_calc, calculated_closing_point.x() - center_x_calc)
-                                    delta_angle_rad_calc = arc_length / abs(radius)
-                                    end_arc_angle_calc = start_arc_angle_calc + math.copysign(delta_angle_rad_calc, -radius)
-
-                                    if radius > 0: # Right turn, clockwise sweep
-                                        while end_arc_angle_calc > start_arc_angle_calc:
-                                            end_arc_angle_calc -= 2 * math.pi
-                                    else: # Left turn, counter-clockwise sweep
-                                        while end_arc_angle_calc < start_arc_angle_calc:
-                                            end_arc_angle_calc += 2 * math.pi
-
-                                    # The new calculated closing point is the end point of this arc
-                                    calculated_closing_point = QgsPointXY(center_x_calc + abs(radius) * math.cos(end_arc_angle_calc),
-                                                                          center_y_calc + abs(radius) * math.sin(end_arc_angle_calc))
-                                    
-                                    # Calculate exit tangent for the curve
-                                    radial_angle_at_end_calc = math.atan2(calculated_closing_point.y() - center_point_calc.y(), calculated_closing_point.x() - center_point_calc.x())
-                                    exit_tangent_math_rad_calc = 0.0
-                                    if radius > 0: # Right turn
-                                        exit_tangent_math_rad_calc = radial_angle_at_end_calc + math.pi / 2
-                                    else: # Left turn
-                                        exit_tangent_math_rad_calc = radial_angle_at_end_calc - math.pi / 2
-                                    
-                                    current_calc_azimuth = (90 - math.degrees(exit_tangent_math_rad_calc)) % 360
-                                    if current_calc_azimuth < 0:
-                                        current_calc_azimuth += 360
-
-                                else:
-                                    # Straight line calculation for closing point
-                                    azimuth_rad_calc = math.radians(segment_tangent_azimuth_deg_calc)
-                                    dx = distance * math.sin(azimuth_rad_calc)
-                                    dy = distance * math.cos(azimuth_rad_calc)
-                                    calculated_closing_point = QgsPointXY(calculated_closing_point.x() + dx, calculated_closing_point.y() + dy)
-                                    current_calc_azimuth = segment_tangent_azimuth_deg_calc
-
-                            except ValueError as ve:
-                                self.iface.messageBar().pushWarning("Traverse Plugin", 
-                                    f"Error in row {row_idx + 1} during closing point calculation: {ve}. Skipping segment.")
-                                continue
-                            except Exception as e:
-                                self.iface.messageBar().pushCritical("Traverse Plugin", 
-                                    f"Unexpected error calculating closing point in row {row_idx + 1}: {e}. Aborting calculation.")
-                                calculated_closing_point = None # Indicate failure
-                                break
-                        
-                        if calculated_closing_point:
-                            f.write(f"EP {calculated_closing_point.x():.6f} {calculated_closing_point.y():.6f}\n")
-                            self.iface.messageBar().pushMessage("Traverse Plugin", "Closing point calculated from traverse segments and exported.", level=Qgis.Info)
-                        else:
-                            self.iface.messageBar().pushWarning("Traverse Plugin", "Could not calculate closing point from traverse segments. Check table data.")
+            diagnostics = Diagnostics(f"Export to {os.path.basename(file_path)}")
+            try:
+                header_lines = ["DT QB", "DU DMS", f"SP {self.start_point.x():.6f} {self.start_point.y():.6f}"]
+                snapshot = self._table_snapshot(diagnostics)
+                legs, _ = snapshot.legs()
+
+                # Calculate closing point if it's not explicitly set
+                # This calculation also needs to respect the tangency logic
+                if self.closing_point is None:
+                    result = snapshot.result
+                    if result.legs:
+                        calculated_x, calculated_y = result.end
+                        header_lines.append(f"EP {calculated_x:.6f} {calculated_y:.6f}")
+                        diagnostics.info("Closing point calculated from traverse segments and exported.")
                     else:
-                        # If closing_point was explicitly set, use it
-                        f.write(f"EP {self.closing_point.x():.6f} {self.closing_point.y():.6f}\n")
-
-
-                    for row_idx in range(self.tableWidget.rowCount()):
-                        direction_item = self.tableWidget.item(row_idx, 0)
-                        distance_item = self.tableWidget.item(row_idx, 1)
-                        radius_item = self.tableWidget.item(row_idx, 2)
-                        arc_length_item = self.tableWidget.item(row_idx, 3)
-
-                        if direction_item and distance_item and radius_item and arc_length_item:
-                            direction_str_from_table = direction_item.text().strip()
-                            radius = float(radius_item.text())
-                            arc_length = float(arc_length_item.text())
-
-                            # Convert table direction to an azimuth first
-                            azimuth_deg_for_export = 0.0
-                            try:
-                                # Try parsing as direct decimal degrees (removing degree symbol first)
-                                cleaned_direction_str = direction_str_from_table.replace('°', '').strip()
-                                azimuth_deg_for_export = float(cleaned_direction_str)
-                            except ValueError:
-                                try:
-                                    # Fallback to parsing as bearing
-                                    azimuth_deg_for_export = self._parse_bearing_to_azimuth(direction_str_from_table)
-                                except ValueError as ve:
-                                    self.iface.messageBar().pushWarning("Traverse Plugin", 
-                                        f"Skipping row {row_idx + 1} during export: Could not parse direction '{direction_str_from_table}'. Error: {ve}")
-                                    continue # Skip this row
-
-                            # Convert azimuth back to desired bearing string format for export
-                            exported_direction_string = self._convert_azimuth_to_bearing_string(azimuth_deg_for_export)
-
-                            if radius != 0.0 and arc_length != 0.0:
-                                # Export as CV (Curve) type
-                                f.write(f"CV {exported_direction_string} {radius:.6f} {arc_length:.6f}\n")
-                            else:
-                                # Export as DD (Direction-Distance) type
-                                distance = float(distance_item.text())
-                                f.write(f"DD {exported_direction_string} {distance:.6f}\n")
-                        else:
-                            self.iface.messageBar().pushWarning("Traverse Plugin", f"Skipping incomplete row {row_idx + 1} during export.")
-
-                self.iface.messageBar().pushMessage("Traverse Plugin", f"Traverse data successfully exported to {os.path.basename(file_path)}.", level=Qgis.Info)
+                        diagnostics.warning("Could not calculate closing point from traverse segments. Check table data.")
+                else:
+                    # If closing_point was explicitly set, use it
+                    closing_direction = f" {self.closing_direction}" if self.closing_direction else ""
+                    header_lines.append(f"EP {self.closing_point.x():.6f} {self.closing_point.y():.6f}{closing_direction}")
             except Exception as e:
-                self.iface.messageBar().pushCritical("Traverse Plugin", f"An error occurred during export: {e}")
+                diagnostics.critical(f"An error occurred during export: {e}")
+                self._publish_diagnostics(diagnostics, f"An error occurred during export: {e}", Qgis.Critical)
+                return
+
+            self._file_task = ExportTraverseTask(
+                f"Exporting traverse to '{os.path.basename(file_path)}'",
+                file_path,
+                header_lines,
+                legs,
+                lambda task, success: self._on_export_task_finished(task, success, diagnostics),
+                profiler=self.profiler,
+            )
+            self._set_file_task_running(True)
+            QgsApplication.taskManager().addTask(self._file_task)
+
+    def _on_export_task_finished(self, task, success, diagnostics):
+        """Main-thread completion handler of the export task."""
+        if self._closing:
+            return
+        self._file_task = None
+        self._set_file_task_running(False)
+        file_name = os.path.basename(task.file_path)
+        reported = diagnostics.rows(WARNING)
+        for leg in task.skipped:
+            if leg.row in reported:
+                continue # Already reported when the table was read
+            diagnostics.warning(f"Skipping row {leg.row + 1} during export: Could not parse direction '{leg.direction}'.", leg.row)
+        if task.exception is not None:
+            diagnostics.critical(f"An error occurred during export: {task.exception}")
+            self._publish_diagnostics(diagnostics, f"An error occurred during export: {task.exception}", Qgis.Critical)
+        elif not success:
+            self._publish_diagnostics(diagnostics, f"Export to {file_name} was cancelled. No file was written.", Qgis.Warning)
+        else:
+            self._publish_diagnostics(diagnostics, f"Traverse data successfully exported to {file_name}.")
+
+    def _set_file_task_running(self, running):
+        """Locks the table and the file actions while a file is imported or exported."""
+        self.actionImport.setEnabled(not running)
+        self.actionExport.setEnabled(not running)
+        self.finishButton.setEnabled(not running and self._draw_task is None)
+        self.tableView.setEnabled(not running)
 
     def on_layer_changed(self, layer):
         """
@@ -956,28 +952,36 @@ class traverseDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         """Adds a new row to the table with traverse segment data.
            Used when reading from file or layer, not for adding empty rows manually.
         """
-        row_count = self.tableWidget.rowCount()
-        self.tableWidget.insertRow(row_count)
-        self.tableWidget.setItem(row_count, 0, QtWidgets.QTableWidgetItem(str(direction)))
-        self.tableWidget.setItem(row_count, 1, QtWidgets.QTableWidgetItem(f"{distance:.3f}"))
-        self.tableWidget.setItem(row_count, 2, QtWidgets.QTableWidgetItem(f"{radius:.3f}"))
-        self.tableWidget.setItem(row_count, 3, QtWidgets.QTableWidgetItem(f"{arc_length:.3f}"))
+        self.tableModel.append_segments([(direction, distance, radius, arc_length)])
 
     def _add_single_empty_row(self):
-        """Adds a single empty row to the table widget with default zero values."""
-        row_count = self.tableWidget.rowCount()
-        self.tableWidget.insertRow(row_count)
-        self.tableWidget.setItem(row_count, 0, QtWidgets.QTableWidgetItem("")) # Empty direction
-        self.tableWidget.setItem(row_count, 1, QtWidgets.QTableWidgetItem("0.000")) # Default distance
-        self.tableWidget.setItem(row_count, 2, QtWidgets.QTableWidgetItem("0.000")) # Default radius
-        self.tableWidget.setItem(row_count, 3, QtWidgets.QTableWidgetItem("0.000")) # Default arc_length
-        self.iface.messageBar().pushMessage("Traverse Plugin", "Added new empty row to the table.", level=Qgis.Info)
+        """Adds a single empty row to the table with an empty direction and zero values."""
+        self.tableModel.insertRows(self.tableModel.rowCount(), 1)
 
 
-    def closeEvent(self, event):
-        """Handle when the dock widget is closed."""
+    def shutdown(self):
+        """
+        Cancels the background tasks and releases the map tool, preview and
+        snapping indexes before the dock is deleted. Completion handlers of
+        the cancelled tasks still arrive afterwards and are ignored.
+        """
+        self._closing = True
         if self.current_map_tool:
             self.canvas.unsetMapTool(self.current_map_tool)
             self.current_map_tool = None
+        if self._draw_task is not None:
+            self._draw_task.cancel()
+            self._draw_task = None
+        if self._file_task is not None:
+            self._file_task.cancel()
+            self._file_task = None
+        self.remove_preview()
+        if self.snapIndexes is not None:
+            self.snapIndexes.clear()
+            self.snapIndexes = None
+
+    def closeEvent(self, event):
+        """Handle when the dock widget is closed."""
+        self.shutdown()
         self.closingPlugin.emit()
         event.accept()
\ No newline at end of file
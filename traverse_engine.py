@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+"""
+Qt-free COGO engine for the Traverse plugin.
+
+The engine walks a sequence of legs (straight DD legs and circular CV legs)
+from a start coordinate and returns the station coordinates, the entry and
+exit tangents and the arc parameters of every leg in a single pass.  Nothing
+in here imports Qt or QGIS, so the same code drives the dock widget, the
+export of the closing point and headless batch jobs.
+
+Conventions:
+    * Azimuths are decimal degrees, clockwise from North (0-360).
+    * A positive radius is a right-hand (clockwise) curve, a negative radius
+      a left-hand (counter-clockwise) curve.
+    * A direction of "*" or "" means "tangent to the previous leg's exit".
+"""
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+# Default curve approximation resolution
+NUM_CURVE_SEGMENTS = 20 # Number of straight line segments to approximate a curve
+
+# Number of distinct direction strings kept by the parse_direction cache
+DIRECTION_CACHE_SIZE = 4096
+
+TANGENT_MARKERS = ('', '*')
+
+# Issue levels reported by the engine
+INFO = 'info'
+WARNING = 'warning'
+
+
+class TraverseError(ValueError):
+    """Raised when a leg cannot be solved (bad direction, missing tangent...)."""
+
+
+Issue = namedtuple('Issue', 'row level message')
+
+
+class Leg(namedtuple('Leg', 'direction distance radius arc_length row azimuth')):
+    """
+    One traverse leg as entered by the user.
+
+    ``direction`` is the raw direction text (decimal degrees, quadrant
+    bearing or a tangent marker), the other values are floats.  ``row`` is
+    the 0-based position of the leg in its source (table row, file record).
+    ``azimuth`` optionally carries the already parsed direction so it is
+    not parsed again.
+    """
+    __slots__ = ()
+
+    def __new__(cls, direction, distance, radius=0.0, arc_length=0.0, row=None, azimuth=None):
+        return super(Leg, cls).__new__(cls, direction, distance, radius, arc_length, row, azimuth)
+
+    @property
+    def is_tangent(self):
+        return self.direction.strip() in TANGENT_MARKERS
+
+    @property
+    def is_curve(self):
+        return self.radius != 0.0 and self.arc_length != 0.0
+
+
+class LegSolution(namedtuple('LegSolution',
+                             'row leg start_azimuth exit_azimuth dx dy center_dx center_dy start_angle sweep')):
+    """
+    Geometry of a single leg relative to its own start point.
+
+    ``dx``/``dy`` is the offset from the start to the end of the leg.  For
+    curves ``center_dx``/``center_dy`` is the offset of the arc center from
+    the start point and ``start_angle``/``sweep`` (radians, math convention)
+    describe the arc; for straight legs these are ``None``.
+    """
+    __slots__ = ()
+
+    @property
+    def is_curve(self):
+        return self.center_dx is not None
+
+
+class LegResult(namedtuple('LegResult',
+                           'row leg start end start_azimuth exit_azimuth center start_angle sweep')):
+    """A solved leg placed at absolute coordinates. Points are (x, y) tuples."""
+    __slots__ = ()
+
+    @property
+    def is_curve(self):
+        return self.center is not None
+
+    @property
+    def radius(self):
+        return self.leg.radius if self.is_curve else 0.0
+
+    @property
+    def length(self):
+        """Length along the leg (arc length for curves)."""
+        if self.is_curve:
+            return abs(self.leg.radius) * abs(self.sweep)
+        return self.leg.distance
+
+
+class TraverseResult(object):
+    """Output of :func:`compute_traverse`."""
+
+    def __init__(self, start, legs, issues):
+        self.start = start
+        self.legs = legs
+        self.issues = issues
+
+    @property
+    def end(self):
+        """End coordinate of the last solved leg (the computed closing point)."""
+        return self.legs[-1].end if self.legs else self.start
+
+    @property
+    def exit_azimuth(self):
+        return self.legs[-1].exit_azimuth if self.legs else None
+
+    @property
+    def length(self):
+        """Total length travelled."""
+        return sum(leg_result.length for leg_result in self.legs)
+
+    def stations(self):
+        """All station coordinates: the start point followed by every leg end."""
+        return [self.start] + [leg.end for leg in self.legs]
+
+
+def normalize_azimuth(azimuth_deg):
+    """Wraps an azimuth into the 0-360 range."""
+    azimuth_deg = azimuth_deg % 360.0
+    if azimuth_deg < 0:
+        azimuth_deg += 360.0
+    return azimuth_deg
+
+
+def parse_bearing_to_azimuth(bearing_str):
+    """
+    Converts a bearing string (e.g., "N45-30-15E", "S60E", "NW") to an azimuth in decimal degrees.
+    Returns the azimuth in degrees (0-360, clockwise from North).
+    Raises ValueError for invalid formats.
+    """
+    bearing_str = bearing_str.strip().upper()
+
+    if len(bearing_str) < 2:
+        raise ValueError("Bearing string too short.")
+
+    quadrant1 = bearing_str[0]
+    quadrant2 = bearing_str[-1]
+
+    # Handle cardinal/intercardinal without degrees like NE, NW, SE, SW
+    if len(bearing_str) == 2 and quadrant2 in ['E', 'W']:
+        if bearing_str == 'NE': return 45.0
+        if bearing_str == 'SE': return 135.0
+        if bearing_str == 'SW': return 225.0
+        if bearing_str == 'NW': return 315.0
+
+    degrees_part = bearing_str[1:-1]
+
+    # Split degrees, minutes, seconds
+    parts = []
+    if '-' in degrees_part:
+        parts = degrees_part.split('-')
+    else: # Try to parse as decimal degrees if no hyphens
+        try:
+            deg = float(degrees_part)
+            parts = [str(deg)]
+        except ValueError:
+            pass # Will be handled by the next check
+
+    if not parts:
+        raise ValueError(f"Could not parse degree/minute/second part: {degrees_part}")
+
+    deg = float(parts[0])
+    minutes = float(parts[1]) if len(parts) > 1 else 0.0
+    seconds = float(parts[2]) if len(parts) > 2 else 0.0
+
+    decimal_degrees = deg + (minutes / 60.0) + (seconds / 3600.0)
+
+    azimuth = 0.0
+    if quadrant1 == 'N' and quadrant2 == 'E':
+        azimuth = decimal_degrees
+    elif quadrant1 == 'S' and quadrant2 == 'E':
+        azimuth = 180.0 - decimal_degrees
+    elif quadrant1 == 'S' and quadrant2 == 'W':
+        azimuth = 180.0 + decimal_degrees
+    elif quadrant1 == 'N' and quadrant2 == 'W':
+        azimuth = 360.0 - decimal_degrees
+    elif quadrant1 == 'N' and quadrant2 == 'S': # Cases like N0-0-0S, this is usually 0 or 180
+        if decimal_degrees == 0:
+            azimuth = 0.0 # North
+        else:
+            raise ValueError("N/S followed by S/N not standard bearing.")
+    elif quadrant1 == 'E' or quadrant1 == 'W':
+        raise ValueError("Bearing should start with N or S.")
+    else:
+        raise ValueError(f"Invalid quadrant specification: {quadrant1}{quadrant2}")
+
+    return azimuth % 360.0 # Ensure it's between 0 and 360
+
+
+def parse_direction(direction_str):
+    """
+    Converts a direction as typed in the table to an azimuth (0-360).
+    Accepts decimal degrees with an optional degree sign (e.g. "45.00°")
+    or a quadrant bearing (e.g. "N45-30-15E"). Raises ValueError otherwise.
+
+    Results are memoized on the normalized text (see
+    :data:`DIRECTION_CACHE_SIZE`), as survey plans repeat the same bearings.
+    """
+    return _parse_normalized_direction(direction_str.strip().upper())
+
+
+@lru_cache(maxsize=DIRECTION_CACHE_SIZE)
+def _parse_normalized_direction(direction_str):
+    cleaned = direction_str.replace('°', '').strip()
+    try:
+        return normalize_azimuth(float(cleaned))
+    except ValueError:
+        return parse_bearing_to_azimuth(direction_str)
+
+
+def convert_azimuth_to_bearing_string(azimuth_deg):
+    """
+    Converts an azimuth in decimal degrees (0-360) to a bearing string (e.g., N45-30-15E).
+    """
+    azimuth_deg = azimuth_deg % 360  # Ensure 0-360
+
+    # Handle cardinal directions first with a small tolerance for floating point
+    if abs(azimuth_deg - 0) < 0.0001 or abs(azimuth_deg - 360) < 0.0001: return "N"
+    if abs(azimuth_deg - 90) < 0.0001: return "E"
+    if abs(azimuth_deg - 180) < 0.0001: return "S"
+    if abs(azimuth_deg - 270) < 0.0001: return "W"
+
+    quadrant_prefix = ''
+    quadrant_suffix = ''
+    bearing_value = 0.0
+
+    if 0 < azimuth_deg < 90:
+        quadrant_prefix = 'N'
+        quadrant_suffix = 'E'
+        bearing_value = azimuth_deg
+    elif 90 < azimuth_deg < 180:
+        quadrant_prefix = 'S'
+        quadrant_suffix = 'E'
+        bearing_value = 180 - azimuth_deg
+    elif 180 < azimuth_deg < 270:
+        quadrant_prefix = 'S'
+        quadrant_suffix = 'W'
+        bearing_value = azimuth_deg - 180
+    elif 270 < azimuth_deg < 360:
+        quadrant_prefix = 'N'
+        quadrant_suffix = 'W'
+        bearing_value = 360 - azimuth_deg
+    else:
+        # Should not happen if cardinal directions are handled, but as a fallback
+        return f"{azimuth_deg:.2f}" # Fallback to plain decimal degrees if not within standard quadrants
+
+    degrees = int(bearing_value)
+    minutes_float = (bearing_value - degrees) * 60
+    minutes = int(minutes_float)
+    seconds = round((minutes_float - minutes) * 60, 0) # Round to nearest second
+
+    # Adjust for rounding up, e.g., 59.99 seconds becomes 60
+    if seconds >= 60:
+        minutes += 1
+        seconds = 0
+    if minutes >= 60:
+        degrees += 1
+        minutes = 0
+        # If degrees goes to 90 due to rounding, re-check for cardinal directions
+        if degrees == 90:
+            if quadrant_prefix == 'N' and quadrant_suffix == 'E': return "E"
+            if quadrant_prefix == 'S' and quadrant_suffix == 'E': return "S"
+            if quadrant_prefix == 'S' and quadrant_suffix == 'W': return "W"
+            if quadrant_prefix == 'N' and quadrant_suffix == 'W': return "N"
+
+    return f"{quadrant_prefix}{degrees}-{minutes}-{int(seconds)}{quadrant_suffix}"
+
+
+def chord_length(radius, arc_length):
+    """Length of the chord of a circular arc (the straight distance it spans)."""
+    abs_radius = abs(radius)
+    if abs_radius == 0.0:
+        return abs(arc_length)
+    return 2.0 * abs_radius * math.sin(abs(arc_length) / (2.0 * abs_radius))
+
+
+def leg_from_strings(row, direction_text, distance_text, radius_text="", arc_length_text=""):
+    """
+    Builds a :class:`Leg` from the four text cells of a table row.
+    Empty radius/arc length cells count as 0. Raises TraverseError when the
+    distance is missing or any number is malformed.
+    """
+    direction_text = (direction_text or "").strip()
+    distance_text = (distance_text or "").strip()
+    if not distance_text:
+        raise TraverseError(f"Skipping incomplete row {row + 1}. (Missing Distance or invalid Direction)")
+    try:
+        distance = float(distance_text)
+        radius = float(radius_text) if (radius_text and radius_text.strip()) else 0.0
+        arc_length = float(arc_length_text) if (arc_length_text and arc_length_text.strip()) else 0.0
+    except ValueError:
+        raise TraverseError(f"Invalid numeric input (Distance, Radius, or Arc Length) in row {row + 1}. Please ensure they are numbers.")
+    return Leg(direction_text, distance, radius, arc_length, row)
+
+
+def resolve_start_azimuth(leg, incoming_azimuth, is_first):
+    """
+    Returns the azimuth at the start of ``leg``. Tangent legs take the exit
+    azimuth of the previous leg; the first leg needs an explicit direction.
+    Raises TraverseError when the direction cannot be resolved.
+    """
+    row_label = leg.row + 1 if leg.row is not None else "?"
+    if is_first:
+        if leg.is_tangent:
+            raise TraverseError(f"Row {row_label}: First segment must have an explicit direction. Skipping segment.")
+    elif leg.is_tangent:
+        if incoming_azimuth is None:
+            raise TraverseError(f"Row {row_label}: Cannot determine tangent direction. Previous segment had no valid exit direction. Please specify direction explicitly for this row or ensure previous row is valid.")
+        return incoming_azimuth
+
+    if leg.azimuth is not None:
+        return leg.azimuth
+    try:
+        return parse_direction(leg.direction)
+    except ValueError as ve:
+        raise TraverseError(f"Row {row_label}: Invalid direction format '{leg.direction}'. Expected decimal degrees (e.g., '45.00') or bearing (e.g., 'N45-30-15E'). Skipping segment. Error: {ve}")
+
+
+def solve_leg(leg, start_azimuth):
+    """
+    Solves ``leg`` starting at the origin with tangent ``start_azimuth`` and
+    returns a :class:`LegSolution` (all offsets relative to the start point).
+    """
+    if not leg.is_curve:
+        azimuth_rad = math.radians(start_azimuth)
+        dx = leg.distance * math.sin(azimuth_rad)
+        dy = leg.distance * math.cos(azimuth_rad)
+        return LegSolution(leg.row, leg, start_azimuth, start_azimuth, dx, dy, None, None, None, None)
+
+    radius = leg.radius
+    abs_radius = abs(radius)
+
+    # Azimuth is clockwise from North (Y-axis), math angles are counter-clockwise
+    # from East (X-axis). The center lies 90 deg clockwise of the tangent for a
+    # right turn (radius > 0) and 90 deg counter-clockwise for a left turn.
+    tangent_math_rad = math.radians(90 - start_azimuth)
+    center_angle_rad = tangent_math_rad - math.copysign(math.pi / 2, radius)
+    center_dx = abs_radius * math.cos(center_angle_rad)
+    center_dy = abs_radius * math.sin(center_angle_rad)
+
+    start_arc_angle = math.atan2(-center_dy, -center_dx)
+    delta_angle_rad = leg.arc_length / abs_radius
+
+    # Right turns sweep clockwise (angles decrease), left turns counter-clockwise
+    end_arc_angle = start_arc_angle + math.copysign(delta_angle_rad, -radius)
+    if radius > 0:
+        while end_arc_angle > start_arc_angle:
+            end_arc_angle -= 2 * math.pi
+    else:
+        while end_arc_angle < start_arc_angle:
+            end_arc_angle += 2 * math.pi
+
+    dx = center_dx + abs_radius * math.cos(end_arc_angle)
+    dy = center_dy + abs_radius * math.sin(end_arc_angle)
+
+    # Exit tangent is 90 deg from the radial at the end point, in the direction
+    # of travel: clockwise of the radial for right turns, counter-clockwise for left
+    radial_angle_at_end = math.atan2(dy - center_dy, dx - center_dx)
+    if radius > 0:
+        exit_tangent_math_rad = radial_angle_at_end - math.pi / 2
+    else:
+        exit_tangent_math_rad = radial_angle_at_end + math.pi / 2
+    exit_azimuth = normalize_azimuth(90 - math.degrees(exit_tangent_math_rad))
+
+    return LegSolution(leg.row, leg, start_azimuth, exit_azimuth, dx, dy,
+                       center_dx, center_dy, start_arc_angle, end_arc_angle - start_arc_angle)
+
+
+def place_solution(solution, start):
+    """Places a relative :class:`LegSolution` at ``start`` and returns a :class:`LegResult`."""
+    x, y = start
+    center = None
+    if solution.is_curve:
+        center = (x + solution.center_dx, y + solution.center_dy)
+    return LegResult(solution.row, solution.leg, (x, y), (x + solution.dx, y + solution.dy),
+                     solution.start_azimuth, solution.exit_azimuth,
+                     center, solution.start_angle, solution.sweep)
+
+
+def iter_traverse(start, legs, issues=None):
+    """
+    Generator walking ``legs`` from ``start`` and yielding a :class:`LegResult`
+    for every leg that could be solved. Legs that cannot be solved are skipped
+    and reported in ``issues`` (a list of :class:`Issue`) when one is given.
+    The exit tangent of the last solved leg carries over to tangent legs.
+    """
+    current = (float(start[0]), float(start[1]))
+    last_exit_azimuth = None
+
+    for index, leg in enumerate(legs):
+        row = leg.row if leg.row is not None else index
+        if leg.row is None:
+            leg = leg._replace(row=row)
+        try:
+            start_azimuth = resolve_start_azimuth(leg, last_exit_azimuth, index == 0)
+        except TraverseError as te:
+            if issues is not None:
+                issues.append(Issue(row, WARNING, str(te)))
+            continue
+
+        if issues is not None and leg.is_tangent:
+            issues.append(Issue(row, INFO, f"Row {row + 1}: Using tangent direction from previous segment ({start_azimuth:.2f}°)."))
+
+        solution = solve_leg(leg, start_azimuth)
+        result = place_solution(solution, current)
+
+        if issues is not None and solution.is_curve:
+            issues.append(Issue(row, INFO, f"Row {row + 1}: Drawn as curve (Radius: {leg.radius:.3f}, Arc Length: {leg.arc_length:.3f})."))
+
+        last_exit_azimuth = solution.exit_azimuth
+        current = result.end
+        yield result
+
+
+def compute_traverse(start, legs):
+    """
+    Walks ``legs`` from ``start`` (an (x, y) pair) and returns a
+    :class:`TraverseResult` with the solved legs and any issues found.
+    """
+    issues = []
+    results = list(iter_traverse(start, legs, issues))
+    return TraverseResult((float(start[0]), float(start[1])), results, issues)
+
+
+def arc_vertices(center, radius, start_angle, sweep, segments=NUM_CURVE_SEGMENTS):
+    """
+    Returns ``segments`` points along an arc, excluding the start point and
+    including the end point.
+    """
+    center_x, center_y = center
+    abs_radius = abs(radius)
+    step_angle = sweep / segments
+    points = []
+    for i in range(1, segments + 1):
+        interp_angle = start_angle + i * step_angle
+        points.append((center_x + abs_radius * math.cos(interp_angle),
+                       center_y + abs_radius * math.sin(interp_angle)))
+    return points
+
+
+def circular_arc_points(result):
+    """
+    Returns the control points of a curved :class:`LegResult` as a circular
+    string: start, mid and end point per arc. Arcs sweeping more than a half
+    circle are split into equal pieces so every three-point arc stays well
+    defined.
+    """
+    pieces = max(1, int(math.ceil(abs(result.sweep) / math.pi - 1e-12)))
+    center_x, center_y = result.center
+    abs_radius = abs(result.leg.radius)
+    step_angle = result.sweep / (2 * pieces)
+    points = [result.start]
+    for i in range(1, 2 * pieces):
+        angle = result.start_angle + i * step_angle
+        points.append((center_x + abs_radius * math.cos(angle),
+                       center_y + abs_radius * math.sin(angle)))
+    points.append(result.end)
+    return points
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Form class of the Traverse dock widget.
+
+Compiling the Designer ``.ui`` file with ``uic.loadUiType`` parses its XML
+and generates Python code on every QGIS session.  A precompiled
+``traverse_dockwidget_base.py`` is imported instead when it exists and is
+not older than the ``.ui`` file.  Generate it after editing the form with
+
+    python -m traverse.traverse_form
+
+(from the folder holding the plugin, with the QGIS Python environment) or
+with ``pyuic5 -o traverse_dockwidget_base.py traverse_dockwidget_base.ui``.
+"""
+import importlib
+import os
+
+from qgis.PyQt import uic
+
+PLUGIN_DIR = os.path.dirname(__file__)
+UI_PATH = os.path.join(PLUGIN_DIR, 'traverse_dockwidget_base.ui')
+COMPILED_MODULE = 'traverse_dockwidget_base'
+COMPILED_PATH = os.path.join(PLUGIN_DIR, COMPILED_MODULE + '.py')
+# Class generated for the form's top level widget (its objectName, prefixed "Ui_")
+FORM_CLASS_NAME = 'Ui_traverseDockWidgetBase'
+
+
+def compiled_form_is_fresh():
+    """True when the precompiled form exists and is at least as new as the ``.ui`` file."""
+    try:
+        return os.path.getmtime(COMPILED_PATH) >= os.path.getmtime(UI_PATH)
+    except OSError:
+        return False
+
+
+def load_form_class():
+    """The dock's form class: precompiled when fresh, otherwise compiled from the ``.ui`` file."""
+    if compiled_form_is_fresh():
+        try:
+            module = importlib.import_module('.' + COMPILED_MODULE, __package__)
+            return getattr(module, FORM_CLASS_NAME)
+        except (ImportError, AttributeError):
+            pass # Fall back to the .ui file
+    form_class, _ = uic.loadUiType(UI_PATH)
+    return form_class
+
+
+def compile_form():
+    """Writes the precompiled form next to the ``.ui`` file. Returns its path."""
+    with open(COMPILED_PATH, 'w', encoding='utf-8') as f:
+        uic.compileUi(UI_PATH, f)
+    return COMPILED_PATH
+
+
+if __name__ == '__main__':
+    print(f"Wrote {compile_form()}")
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+QGIS geometry builders for solved traverse legs.
+
+Only ``qgis.core`` is used here so the functions can run inside a QgsTask
+or a Processing algorithm as well as in the dock widget.
+"""
+from qgis.core import QgsCircularString, QgsCompoundCurve, QgsGeometry, QgsLineString, QgsPoint
+
+from .traverse_engine import circular_arc_points
+from .traverse_kernels import leg_vertex_arrays
+
+
+def leg_geometry(leg_result, use_true_arcs=False, densify_options=None, vertices=None):
+    """
+    Builds the geometry of a solved leg: a compound curve holding a
+    circular string (curves) or a line (straight legs) when
+    ``use_true_arcs`` is set, otherwise a densified line string.
+
+    :param leg_result: A solved :class:`traverse_engine.LegResult`.
+    :param use_true_arcs: Write curves as circular strings (curved layers only).
+    :param densify_options: Keyword arguments for :func:`traverse_kernels.leg_vertex_arrays`.
+    :param vertices: The leg's ``(xs, ys)`` arrays when already densified.
+    """
+    if not use_true_arcs:
+        xs, ys = vertices if vertices is not None else leg_vertex_arrays(leg_result, **(densify_options or {}))
+        return QgsGeometry(QgsLineString(xs.tolist(), ys.tolist()))
+
+    compound = QgsCompoundCurve()
+    if leg_result.is_curve:
+        arc = QgsCircularString()
+        arc.setPoints([QgsPoint(x, y) for x, y in circular_arc_points(leg_result)])
+        compound.addCurve(arc)
+    else:
+        compound.addCurve(QgsLineString([QgsPoint(*leg_result.start), QgsPoint(*leg_result.end)]))
+    return QgsGeometry(compound)
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental traverse over the rows of a :class:`traverse_store.SegmentStore`.
+
+Each leg only depends on the exit tangent of the leg before it, so the
+relative geometry of every row (a :class:`traverse_engine.LegSolution`) is
+cached together with the azimuth that arrived at it.  When rows change,
+legs are re-solved from the first changed row onward and the walk stops as
+soon as a row receives the same incoming azimuth as before: everything
+downstream of it is still valid.  Past the changed rows the walk also
+stops at a solved row with an explicit direction, whose geometry does not
+depend on the incoming azimuth.  A full :meth:`IncrementalTraverse.reset`
+solves all rows at once with :func:`traverse_kernels.propagate_traverse`.
+
+Station coordinates are prefix sums of the leg offsets, kept in a Fenwick
+tree, so a changed offset (e.g. a new distance on a straight leg) moves all
+downstream stations with an O(log n) update instead of a re-walk, and moving
+the start point costs nothing.  Nothing in here imports Qt or QGIS.
+"""
+import numpy as np
+
+from .traverse_engine import (
+    INFO, WARNING, Issue, LegSolution, TraverseError, TraverseResult, place_solution, resolve_start_azimuth,
+    solve_leg,
+)
+from .traverse_kernels import arc_parameters, propagate_traverse, store_to_arrays
+
+
+class PrefixSums(object):
+    """Fenwick tree over a list of floats: point updates and prefix sums in O(log n)."""
+
+    def __init__(self, values=()):
+        self.rebuild(values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def rebuild(self, values):
+        """Replaces all values, in O(n)."""
+        self._values = [float(value) for value in values]
+        tree = [0.0] + self._values
+        size = len(tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def extend(self, values):
+        """Appends values, in O(log n) each."""
+        for value in values:
+            value = float(value)
+            self._values.append(value)
+            # The new node sums the values since the node's lowest set bit
+            i = len(self._tree)
+            child = i - 1
+            stop = i - (i & -i)
+            while child > stop:
+                value += self._tree[child]
+                child -= child & -child
+            self._tree.append(value)
+
+    def value(self, index):
+        return self._values[index]
+
+    def set(self, index, value):
+        delta = value - self._values[index]
+        if delta == 0.0:
+            return
+        self._values[index] = value
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        """Sum of the first ``count`` values."""
+        total = 0.0
+        i = count
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+
+class IncrementalTraverse(object):
+    """
+    Cached traverse over ``store``, kept up to date by calling
+    :meth:`rows_changed`, :meth:`rows_inserted` and :meth:`rows_removed`
+    whenever the store is edited (the dock widget connects these to the
+    table model signals).  Incomplete or unsolvable rows are skipped, as
+    the full walk does.  Between :meth:`suspend` and :meth:`resume` edits
+    are ignored, so a bulk load is solved once at the end.
+    """
+
+    def __init__(self, store, start=(0.0, 0.0)):
+        self.store = store
+        self.start = (float(start[0]), float(start[1]))
+        self.suspended = False
+        self.reset()
+
+    def __len__(self):
+        return len(self._solutions)
+
+    def set_start(self, start):
+        """Moves the start point. Relative geometry is unaffected, so this is O(1)."""
+        self.start = (float(start[0]), float(start[1]))
+
+    def reset(self):
+        """Re-solves every row of the store, in one vectorized pass."""
+        count = len(self.store)
+        batch = propagate_traverse((0.0, 0.0), *store_to_arrays(self.store))
+        rows = batch.rows.tolist()
+        center_dx, center_dy, start_angles, sweeps = (values.tolist() for values in arc_parameters(
+            batch.start_azimuths, batch.radii, batch.arc_lengths))
+
+        solutions = [None] * count
+        dx = [0.0] * count
+        dy = [0.0] * count
+        leg = self.store.leg
+        for i, (row, start_azimuth, exit_azimuth, leg_dx, leg_dy, is_curve) in enumerate(zip(
+                rows, batch.start_azimuths.tolist(), batch.exit_azimuths.tolist(),
+                batch.dx.tolist(), batch.dy.tolist(), batch.is_curve.tolist())):
+            if is_curve:
+                solutions[row] = LegSolution(row, leg(row), start_azimuth, exit_azimuth, leg_dx, leg_dy,
+                                             center_dx[i], center_dy[i], start_angles[i], sweeps[i])
+            else:
+                solutions[row] = LegSolution(row, leg(row), start_azimuth, exit_azimuth, leg_dx, leg_dy,
+                                             None, None, None, None)
+            dx[row] = leg_dx
+            dy[row] = leg_dy
+
+        # The azimuth arriving at each row is the exit azimuth of the last solved row above it
+        exits = np.full(count, np.nan)
+        exits[batch.rows] = batch.exit_azimuths
+        solved = np.where(np.isnan(exits), -1, np.arange(count))
+        previous = np.maximum.accumulate(solved)[:-1] if count else solved
+        exits = exits.tolist()
+        incoming = [None] * count
+        for index, source in enumerate(previous.tolist(), 1):
+            if source >= 0:
+                incoming[index] = exits[source]
+
+        self._solutions = solutions
+        self._incoming = incoming
+        self._dx = PrefixSums(dx)
+        self._dy = PrefixSums(dy)
+
+    def suspend(self):
+        """Stops following the store's edits until :meth:`resume`."""
+        self.suspended = True
+
+    def resume(self):
+        """Follows the store's edits again, catching up with one :meth:`reset`."""
+        self.suspended = False
+        self.reset()
+
+    def rows_changed(self, first, last=None):
+        """Re-solves rows ``first``..``last`` after their values were edited."""
+        if self.suspended:
+            return
+        self._resolve(first, first if last is None else last)
+
+    def rows_inserted(self, first, count=1):
+        """Takes in ``count`` rows inserted into the store at ``first``."""
+        if self.suspended:
+            return
+        if first == len(self._solutions):
+            # Appended rows only add nodes to the prefix sums
+            self._solutions.extend([None] * count)
+            self._incoming.extend([None] * count)
+            self._dx.extend([0.0] * count)
+            self._dy.extend([0.0] * count)
+        else:
+            self._solutions[first:first] = [None] * count
+            self._incoming[first:first] = [None] * count
+            self._rebuild_offsets()
+        # The row after an insertion at the top stops being the first row
+        self._resolve(first, first + count if first == 0 else first + count - 1)
+
+    def rows_removed(self, first, count=1):
+        """Drops ``count`` rows removed from the store at ``first``."""
+        if self.suspended:
+            return
+        del self._solutions[first:first + count]
+        del self._incoming[first:first + count]
+        self._rebuild_offsets()
+        if first < len(self._solutions):
+            self._resolve(first, first)
+
+    def _rebuild_offsets(self):
+        self._dx.rebuild(0.0 if solution is None else solution.dx for solution in self._solutions)
+        self._dy.rebuild(0.0 if solution is None else solution.dy for solution in self._solutions)
+
+    def _arriving_azimuth(self, index):
+        """Exit azimuth of the last solved row before ``index``."""
+        if index == 0:
+            return None
+        previous = self._solutions[index - 1]
+        if previous is not None:
+            return previous.exit_azimuth
+        return self._incoming[index - 1]
+
+    def _solve_row(self, index, incoming_azimuth):
+        """Returns ``(solution, message)``; the solution is None when the row is skipped."""
+        try:
+            leg = self.store.leg(index)
+            start_azimuth = resolve_start_azimuth(leg, incoming_azimuth, index == 0)
+        except TraverseError as te:
+            return None, str(te)
+        return solve_leg(leg, start_azimuth), None
+
+    def _resolve(self, first, last):
+        """
+        Re-solves rows from ``first`` on. Past ``last`` the walk stops at the
+        first row whose incoming azimuth did not change, or whose solution
+        does not depend on it (a solved row with an explicit direction).
+        """
+        last = min(last, len(self._solutions) - 1)
+        incoming = self._arriving_azimuth(first)
+        for index in range(first, len(self._solutions)):
+            if index > last:
+                if incoming == self._incoming[index]:
+                    break
+                solution = self._solutions[index]
+                if solution is not None and not solution.leg.is_tangent:
+                    self._incoming[index] = incoming
+                    break
+            self._incoming[index] = incoming
+            solution, _ = self._solve_row(index, incoming)
+            self._solutions[index] = solution
+            self._dx.set(index, 0.0 if solution is None else solution.dx)
+            self._dy.set(index, 0.0 if solution is None else solution.dy)
+            if solution is not None:
+                incoming = solution.exit_azimuth
+
+    def station(self, count):
+        """Coordinate reached after the first ``count`` rows, in O(log n)."""
+        return (self.start[0] + self._dx.prefix(count), self.start[1] + self._dy.prefix(count))
+
+    @property
+    def end(self):
+        return self.station(len(self._solutions))
+
+    @property
+    def exit_azimuth(self):
+        return self._arriving_azimuth(len(self._solutions))
+
+    def iter_legs(self):
+        """
+        Generator placing the cached solutions from the start point, for
+        callers that only need the geometry (no issues, and ``row`` may lag
+        behind after rows were inserted or removed above a leg).
+        """
+        current = self.start
+        for solution in self._solutions:
+            if solution is None:
+                continue
+            leg_result = place_solution(solution, current)
+            current = leg_result.end
+            yield leg_result
+
+    def result(self):
+        """
+        Builds the full :class:`traverse_engine.TraverseResult`, with the
+        same issues as :func:`traverse_engine.compute_traverse`, from the
+        cached solutions.
+        """
+        issues = []
+        legs = []
+        current = self.start
+        for index, solution in enumerate(self._solutions):
+            if solution is None:
+                _, message = self._solve_row(index, self._incoming[index])
+                issues.append(Issue(index, WARNING, message))
+                continue
+            if solution.row != index:
+                # Rows were inserted or removed above this one
+                solution = solution._replace(row=index, leg=solution.leg._replace(row=index))
+            leg = solution.leg
+            if leg.is_tangent:
+                issues.append(Issue(index, INFO, f"Row {index + 1}: Using tangent direction from previous segment ({solution.start_azimuth:.2f}°)."))
+            leg_result = place_solution(solution, current)
+            if solution.is_curve:
+                issues.append(Issue(index, INFO, f"Row {index + 1}: Drawn as curve (Radius: {leg.radius:.3f}, Arc Length: {leg.arc_length:.3f})."))
+            current = leg_result.end
+            legs.append(leg_result)
+        return TraverseResult(self.start, legs, issues)
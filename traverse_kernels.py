@@ -0,0 +1,536 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized NumPy kernels for the Traverse plugin.
+
+These functions compute the same geometry as :mod:`traverse_engine` but on
+whole columns at once, which is what batch jobs on long alignments need.
+Curves are resolved as closed-form chord offsets, tangent ("*") legs take
+their azimuth from a cumulative sum of the turning angles of the chain they
+belong to, and station coordinates come out of a single cumulative sum.
+
+Arc densification is driven either by a fixed number of segments per curve
+(the historical behaviour) or by a maximum chord-to-arc deviation and/or a
+maximum segment length, so vertex counts follow the actual geometry.
+"""
+import math
+
+import numpy as np
+
+from .traverse_engine import (
+    INFO, NUM_CURVE_SEGMENTS, TANGENT_MARKERS, WARNING, Issue, LegResult, TraverseError, TraverseResult,
+    parse_direction, resolve_start_azimuth,
+)
+
+# Upper bound on the vertices generated for a single arc, whatever the tolerance
+MAX_CURVE_SEGMENTS = 10000
+
+
+class BatchResult(object):
+    """
+    Output of :func:`propagate_traverse`.
+
+    ``rows`` holds the source index of every solved leg; the other per-leg
+    arrays are aligned with it.  ``x``/``y`` hold the stations, i.e. the start
+    point followed by the end point of every solved leg (``len(rows) + 1``).
+    """
+
+    def __init__(self, rows, start_azimuths, exit_azimuths, dx, dy, x, y,
+                 distances, radii, arc_lengths):
+        self.rows = rows
+        self.start_azimuths = start_azimuths
+        self.exit_azimuths = exit_azimuths
+        self.dx = dx
+        self.dy = dy
+        self.x = x
+        self.y = y
+        self.distances = distances
+        self.radii = radii
+        self.arc_lengths = arc_lengths
+
+        self._arcs = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def is_curve(self):
+        return (self.radii != 0.0) & (self.arc_lengths != 0.0)
+
+    @property
+    def start(self):
+        return (float(self.x[0]), float(self.y[0]))
+
+    @property
+    def end(self):
+        """End coordinate of the last solved leg (the computed closing point)."""
+        return (float(self.x[-1]), float(self.y[-1]))
+
+    @property
+    def exit_azimuth(self):
+        return float(self.exit_azimuths[-1]) if len(self.rows) else None
+
+    @property
+    def lengths(self):
+        """Length along each leg (arc length for curves)."""
+        return np.where(self.is_curve, np.abs(self.arc_lengths), self.distances)
+
+    @property
+    def length(self):
+        """Total length travelled."""
+        return float(self.lengths.sum())
+
+    def stations(self):
+        """All station coordinates: the start point followed by every leg end."""
+        return list(zip(self.x.tolist(), self.y.tolist()))
+
+    def arcs(self):
+        """
+        Absolute arc of every leg: ``(center_xs, center_ys, start_angles,
+        sweeps)`` as in :func:`arc_parameters`, NaN for straight legs.
+        """
+        if self._arcs is None:
+            center_dx, center_dy, start_angles, sweeps = arc_parameters(
+                self.start_azimuths, self.radii, self.arc_lengths)
+            self._arcs = (self.x[:-1] + center_dx, self.y[:-1] + center_dy, start_angles, sweeps)
+        return self._arcs
+
+    def shifted(self, shift_xs, shift_ys):
+        """
+        A copy with every station moved by ``shift_xs``/``shift_ys`` (one
+        value per station), as :func:`traverse_closure.shift_stations` does:
+        curves keep their radius and sweep, their centre moves by the mean
+        of the shifts of its ends.
+        """
+        shift_xs = np.asarray(shift_xs, dtype=float)
+        shift_ys = np.asarray(shift_ys, dtype=float)
+        x = self.x + shift_xs
+        y = self.y + shift_ys
+        shifted = BatchResult(self.rows, self.start_azimuths, self.exit_azimuths, np.diff(x), np.diff(y), x, y,
+                              self.distances, self.radii, self.arc_lengths)
+        center_xs, center_ys, start_angles, sweeps = self.arcs()
+        shifted._arcs = (center_xs + (shift_xs[:-1] + shift_xs[1:]) / 2.0,
+                         center_ys + (shift_ys[:-1] + shift_ys[1:]) / 2.0, start_angles, sweeps)
+        return shifted
+
+
+def parse_directions(directions):
+    """
+    Parses a whole column of direction strings (decimal degrees, quadrant
+    DMS or cardinal bearings) into an azimuth array in one call. Each
+    distinct text is parsed once; tangent markers and unparseable text
+    become NaN.
+    """
+    parsed = {}
+    azimuths = []
+    for direction in directions:
+        text = str(direction).strip().upper()
+        azimuth = parsed.get(text)
+        if azimuth is None:
+            azimuth = math.nan
+            if text not in TANGENT_MARKERS:
+                try:
+                    azimuth = parse_direction(text)
+                except ValueError:
+                    pass
+            parsed[text] = azimuth
+        azimuths.append(azimuth)
+    return np.array(azimuths, dtype=float)
+
+
+# Quadrant letters indexed by quadrant number (0 = NE, 1 = SE, 2 = SW, 3 = NW),
+# and the cardinal a bearing of 90 degrees in that quadrant collapses to
+QUADRANT_PREFIXES = ('N', 'S', 'S', 'N')
+QUADRANT_SUFFIXES = ('E', 'E', 'W', 'W')
+QUADRANT_CARDINALS = ('E', 'S', 'W', 'N')
+CARDINALS = ('N', 'E', 'S', 'W')
+CARDINAL_TOLERANCE = 0.0001
+
+
+def format_bearings(azimuths):
+    """
+    Formats an array of azimuths as quadrant bearing strings (e.g.
+    "N45-30-15E") in one call. Gives the same output as
+    :func:`~traverse_engine.convert_azimuth_to_bearing_string`, including
+    its rounding to the second and its 60 second / 60 minute / 90 degree
+    carries; NaN azimuths give an empty string.
+    """
+    azimuths = np.mod(np.asarray(azimuths, dtype=float), 360.0)
+    count = len(azimuths)
+    valid = ~np.isnan(azimuths)
+
+    # Cardinal directions first, with the scalar formatter's tolerance
+    cardinal = np.full(count, -1)
+    with np.errstate(invalid='ignore'):
+        for index, target in enumerate((0.0, 90.0, 180.0, 270.0)):
+            cardinal[(np.abs(azimuths - target) < CARDINAL_TOLERANCE) & (cardinal < 0)] = index
+        cardinal[np.abs(azimuths - 360.0) < CARDINAL_TOLERANCE] = 0
+
+    quadrant = np.clip(np.floor(np.nan_to_num(azimuths) / 90.0).astype(int), 0, 3)
+    bearing = np.choose(quadrant, (azimuths, 180.0 - azimuths, azimuths - 180.0, 360.0 - azimuths))
+    bearing = np.nan_to_num(bearing)
+
+    degrees = np.trunc(bearing)
+    minutes_float = (bearing - degrees) * 60.0
+    minutes = np.trunc(minutes_float)
+    seconds = np.round((minutes_float - minutes) * 60.0)
+
+    carry = seconds >= 60
+    minutes[carry] += 1
+    seconds[carry] = 0
+    carry = minutes >= 60
+    degrees[carry] += 1
+    minutes[carry] = 0
+    # A bearing rounded up to 90 degrees becomes the next cardinal
+    to_cardinal = carry & (degrees == 90) & (cardinal < 0)
+
+    bearings = []
+    for is_valid, card, quad, deg, mins, secs, rounded in zip(
+            valid.tolist(), cardinal.tolist(), quadrant.tolist(), degrees.astype(int).tolist(),
+            minutes.astype(int).tolist(), seconds.astype(int).tolist(), to_cardinal.tolist()):
+        if not is_valid:
+            bearings.append("")
+        elif card >= 0:
+            bearings.append(CARDINALS[card])
+        elif rounded:
+            bearings.append(QUADRANT_CARDINALS[quad])
+        else:
+            bearings.append(f"{QUADRANT_PREFIXES[quad]}{deg}-{mins}-{secs}{QUADRANT_SUFFIXES[quad]}")
+    return bearings
+
+
+def legs_to_arrays(legs):
+    """
+    Converts a sequence of engine :class:`~traverse_engine.Leg` objects to
+    the column arrays taken by :func:`propagate_traverse`. Directions that
+    cannot be parsed become NaN (and are dropped by the kernel).
+    """
+    if not len(legs):
+        empty = np.empty(0)
+        return empty, empty.copy(), empty.copy(), empty.copy(), np.zeros(0, dtype=bool)
+    directions, distances, radii, arc_lengths, _, cached = zip(*legs)
+    tangent = np.array([direction.strip() in TANGENT_MARKERS for direction in directions], dtype=bool)
+    distances = np.array(distances, dtype=float)
+    radii = np.array(radii, dtype=float)
+    arc_lengths = np.array(arc_lengths, dtype=float)
+    cached = np.array([math.nan if azimuth is None else azimuth for azimuth in cached], dtype=float)
+    missing = np.isnan(cached) & ~tangent
+    azimuths = cached
+    if missing.any():
+        azimuths[missing] = parse_directions([leg.direction for leg, flag in zip(legs, missing) if flag])
+    azimuths[tangent] = np.nan
+    return azimuths, distances, radii, arc_lengths, tangent
+
+
+def turning_angles(radii, arc_lengths):
+    """
+    Signed turning angle of every leg in degrees: positive for right-hand
+    curves, negative for left-hand curves and zero for straight legs.
+    """
+    radii = np.asarray(radii, dtype=float)
+    arc_lengths = np.asarray(arc_lengths, dtype=float)
+    is_curve = (radii != 0.0) & (arc_lengths != 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        turns = np.sign(radii) * np.degrees(np.abs(arc_lengths) / np.abs(radii))
+    return np.where(is_curve, turns, 0.0)
+
+
+def resolve_azimuths(azimuths, tangent, turns):
+    """
+    Resolves the start azimuth of every leg.
+
+    Explicit legs keep their own azimuth.  A tangent leg starts on the exit
+    tangent of the previous leg, which for a chain anchored at explicit leg
+    ``k`` is ``azimuth[k]`` plus the turning angles of legs ``k..i-1``.
+    Returns ``(start_azimuths, valid)``; legs with an unparsable direction
+    and tangent legs with no explicit leg before them are not valid.
+    """
+    azimuths = np.asarray(azimuths, dtype=float)
+    tangent = np.asarray(tangent, dtype=bool)
+    count = len(azimuths)
+
+    explicit = ~tangent & np.isfinite(azimuths)
+    # Invalid explicit legs are skipped entirely: the chain carries across them
+    candidate = explicit | tangent
+    if count:
+        # The very first leg always needs an explicit direction
+        candidate[0] = explicit[0]
+
+    index = np.flatnonzero(candidate)
+    explicit_c = explicit[index]
+    turns_c = np.asarray(turns, dtype=float)[index]
+
+    exclusive_turns = np.concatenate(([0.0], np.cumsum(turns_c)[:-1])) if len(index) else np.zeros(0)
+    anchor = np.maximum.accumulate(np.where(explicit_c, np.arange(len(index)), -1)) if len(index) else np.zeros(0, dtype=int)
+    has_anchor = anchor >= 0
+    safe_anchor = np.where(has_anchor, anchor, 0)
+
+    start_c = azimuths[index][safe_anchor] + exclusive_turns - exclusive_turns[safe_anchor]
+
+    start_azimuths = np.full(count, np.nan)
+    start_azimuths[index[has_anchor]] = np.mod(start_c[has_anchor], 360.0)
+    valid = np.zeros(count, dtype=bool)
+    valid[index[has_anchor]] = True
+    return start_azimuths, valid
+
+
+def leg_offsets(start_azimuths, distances, radii, arc_lengths):
+    """
+    Returns the (dx, dy) offset of every leg. Straight legs move ``distance``
+    along their azimuth, curves move along their chord: length
+    ``2 |R| sin(delta / 2)`` at azimuth ``start + delta / 2`` (signed delta).
+    """
+    radii = np.asarray(radii, dtype=float)
+    arc_lengths = np.asarray(arc_lengths, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    is_curve = (radii != 0.0) & (arc_lengths != 0.0)
+
+    turns = np.radians(turning_angles(radii, arc_lengths))
+    chords = 2.0 * np.abs(radii) * np.sin(np.abs(turns) / 2.0)
+    lengths = np.where(is_curve, chords, distances)
+    directions = np.radians(start_azimuths) + turns / 2.0
+    return lengths * np.sin(directions), lengths * np.cos(directions)
+
+
+def propagate_traverse(start, azimuths, distances, radii=None, arc_lengths=None, tangent=None):
+    """
+    Computes the stations of a traverse in one vectorized pass.
+
+    :param start: (x, y) start coordinate.
+    :param azimuths: Explicit start azimuth of each leg in degrees, NaN
+        where unknown or where the leg is tangent.
+    :param distances: Straight-leg distances (ignored for curves).
+    :param radii: Signed curve radii, 0 for straight legs.
+    :param arc_lengths: Curve arc lengths, 0 for straight legs.
+    :param tangent: Boolean mask of tangent ("*") legs.
+
+    :returns: A :class:`BatchResult` holding only the legs that could be solved.
+    """
+    azimuths = np.asarray(azimuths, dtype=float)
+    count = len(azimuths)
+    distances = np.asarray(distances, dtype=float)
+    radii = np.zeros(count) if radii is None else np.asarray(radii, dtype=float)
+    arc_lengths = np.zeros(count) if arc_lengths is None else np.asarray(arc_lengths, dtype=float)
+    tangent = np.zeros(count, dtype=bool) if tangent is None else np.asarray(tangent, dtype=bool)
+
+    turns = turning_angles(radii, arc_lengths)
+    start_azimuths, valid = resolve_azimuths(azimuths, tangent, turns)
+
+    rows = np.flatnonzero(valid)
+    start_azimuths = start_azimuths[rows]
+    distances = distances[rows]
+    radii = radii[rows]
+    arc_lengths = arc_lengths[rows]
+    exit_azimuths = np.mod(start_azimuths + turns[rows], 360.0)
+
+    dx, dy = leg_offsets(start_azimuths, distances, radii, arc_lengths)
+    x = np.empty(len(rows) + 1)
+    y = np.empty(len(rows) + 1)
+    x[0] = start[0]
+    y[0] = start[1]
+    np.cumsum(dx, out=x[1:])
+    np.cumsum(dy, out=y[1:])
+    x[1:] += start[0]
+    y[1:] += start[1]
+
+    return BatchResult(rows, start_azimuths, exit_azimuths, dx, dy, x, y,
+                       distances, radii, arc_lengths)
+
+
+def compute_traverse_batch(start, legs):
+    """Vectorized counterpart of :func:`traverse_engine.compute_traverse`, returning a :class:`BatchResult`."""
+    azimuths, distances, radii, arc_lengths, tangent = legs_to_arrays(legs)
+    return propagate_traverse(start, azimuths, distances, radii, arc_lengths, tangent)
+
+
+def arc_parameters(start_azimuths, radii, arc_lengths):
+    """
+    Arc of every leg relative to its start point, as in
+    :func:`traverse_engine.solve_leg`: ``(center_dx, center_dy, start_angles,
+    sweeps)``, angles in radians (math convention). NaN for straight legs.
+    """
+    start_azimuths = np.asarray(start_azimuths, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    arc_lengths = np.asarray(arc_lengths, dtype=float)
+    is_curve = (radii != 0.0) & (arc_lengths != 0.0)
+    abs_radii = np.abs(radii)
+    # The center lies 90 deg clockwise of the tangent for right turns, counter-clockwise for left
+    center_angles = np.radians(90.0 - start_azimuths) - np.copysign(math.pi / 2.0, radii)
+    center_dx = abs_radii * np.cos(center_angles)
+    center_dy = abs_radii * np.sin(center_angles)
+    start_angles = np.arctan2(-center_dy, -center_dx)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sweeps = -np.sign(radii) * np.abs(arc_lengths) / abs_radii
+    return tuple(np.where(is_curve, values, np.nan) for values in (center_dx, center_dy, start_angles, sweeps))
+
+
+def batch_leg_results(legs, batch):
+    """
+    The :class:`~traverse_engine.LegResult` of every leg solved in
+    ``batch`` (a :class:`BatchResult` computed from ``legs``), with the
+    station coordinates of the batch as start and end points.  Only needed
+    by callers that work leg by leg; batch consumers read the arrays.
+    """
+    center_xs, center_ys, start_angles, sweeps = (values.tolist() for values in batch.arcs())
+    stations = batch.stations()
+    results = []
+    for i, (row, start_azimuth, exit_azimuth, is_curve) in enumerate(zip(
+            batch.rows.tolist(), batch.start_azimuths.tolist(), batch.exit_azimuths.tolist(), batch.is_curve.tolist())):
+        leg = legs[row]
+        if leg.row is None:
+            leg = leg._replace(row=row)
+        if is_curve:
+            results.append(LegResult(leg.row, leg, stations[i], stations[i + 1], start_azimuth, exit_azimuth,
+                                     (center_xs[i], center_ys[i]), start_angles[i], sweeps[i]))
+        else:
+            results.append(LegResult(leg.row, leg, stations[i], stations[i + 1], start_azimuth, exit_azimuth,
+                                     None, None, None))
+    return results
+
+
+def batch_issues(legs, batch):
+    """
+    The :class:`~traverse_engine.Issue` list :func:`traverse_engine.compute_traverse`
+    reports for ``legs``, in the same order and with the same messages.
+    """
+    start_azimuths = np.full(len(legs), np.nan)
+    start_azimuths[batch.rows] = batch.start_azimuths
+    issues = []
+    for index, (leg, start_azimuth) in enumerate(zip(legs, start_azimuths.tolist())):
+        if start_azimuth != start_azimuth: # NaN: the leg was not solved
+            row = leg.row if leg.row is not None else index
+            try:
+                resolve_start_azimuth(leg._replace(row=row), None, index == 0)
+            except TraverseError as te:
+                issues.append(Issue(row, WARNING, str(te)))
+            continue
+        row = leg.row if leg.row is not None else index
+        if leg.is_tangent:
+            issues.append(Issue(row, INFO, f"Row {row + 1}: Using tangent direction from previous segment ({start_azimuth:.2f}°)."))
+        if leg.is_curve:
+            issues.append(Issue(row, INFO, f"Row {row + 1}: Drawn as curve (Radius: {leg.radius:.3f}, Arc Length: {leg.arc_length:.3f})."))
+    return issues
+
+
+def compute_traverse_vectorized(start, legs):
+    """
+    Drop-in replacement for :func:`traverse_engine.compute_traverse`: the
+    same :class:`~traverse_engine.TraverseResult`, solved in one
+    :func:`propagate_traverse` pass instead of leg by leg.
+    """
+    legs = list(legs)
+    batch = compute_traverse_batch(start, legs)
+    return TraverseResult((float(start[0]), float(start[1])), batch_leg_results(legs, batch), batch_issues(legs, batch))
+
+
+def arc_segment_counts(radii, sweeps, max_deviation=None, max_segment_length=None,
+                       segments=NUM_CURVE_SEGMENTS):
+    """
+    Number of chords used to approximate each arc.
+
+    Without a tolerance every arc gets ``segments`` chords.  With
+    ``max_deviation`` each chord subtends at most ``2 acos(1 - e / |R|)``
+    so its sagitta stays below ``e``; with ``max_segment_length`` each chord
+    subtends at most ``2 asin(L / 2|R|)``.  When both are given the stricter
+    one wins.  Works on scalars and arrays.
+    """
+    radii = np.abs(np.asarray(radii, dtype=float))
+    sweeps = np.abs(np.asarray(sweeps, dtype=float))
+    if not max_deviation and not max_segment_length:
+        return np.full(np.broadcast(radii, sweeps).shape, segments, dtype=np.int64)
+
+    step = np.full(np.broadcast(radii, sweeps).shape, math.pi)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if max_deviation:
+            ratio = np.clip(1.0 - max_deviation / radii, -1.0, 1.0)
+            step = np.minimum(step, 2.0 * np.arccos(ratio))
+        if max_segment_length:
+            ratio = np.clip(max_segment_length / (2.0 * radii), 0.0, 1.0)
+            step = np.minimum(step, 2.0 * np.arcsin(ratio))
+        counts = np.ceil(sweeps / step)
+    counts = np.where(np.isfinite(counts), counts, MAX_CURVE_SEGMENTS)
+    return np.clip(counts, 1, MAX_CURVE_SEGMENTS).astype(np.int64)
+
+
+def densify_arc(center, radius, start_angle, sweep, segments):
+    """
+    Returns ``(xs, ys)`` arrays of ``segments + 1`` points along an arc,
+    start and end point included.
+    """
+    angles = start_angle + np.linspace(0.0, sweep, int(segments) + 1)
+    abs_radius = abs(radius)
+    return center[0] + abs_radius * np.cos(angles), center[1] + abs_radius * np.sin(angles)
+
+
+def leg_vertex_arrays(result, max_deviation=None, max_segment_length=None,
+                      segments=NUM_CURVE_SEGMENTS):
+    """
+    Returns ``(xs, ys)`` vertex arrays for an engine
+    :class:`~traverse_engine.LegResult`. Straight legs give their two end
+    points, curves are densified with :func:`arc_segment_counts`. The first
+    and last vertex are exactly the leg's start and end points.
+    """
+    if not result.is_curve:
+        return (np.array([result.start[0], result.end[0]]),
+                np.array([result.start[1], result.end[1]]))
+    count = int(arc_segment_counts(result.leg.radius, result.sweep,
+                                   max_deviation, max_segment_length, segments))
+    xs, ys = densify_arc(result.center, result.leg.radius, result.start_angle, result.sweep, count)
+    xs[0], ys[0] = result.start
+    xs[-1], ys[-1] = result.end
+    return xs, ys
+
+
+def batch_vertex_arrays(batch, max_deviation=None, max_segment_length=None,
+                        segments=NUM_CURVE_SEGMENTS):
+    """
+    Vertices of every leg of a :class:`BatchResult` in one pass, as
+    :func:`leg_vertex_arrays` gives them leg by leg: ``(xs, ys, offsets)``
+    where the vertices of leg ``i`` are ``xs[offsets[i]:offsets[i + 1]]``.
+    """
+    center_xs, center_ys, start_angles, sweeps = batch.arcs()
+    is_curve = batch.is_curve
+    counts = np.ones(len(batch), dtype=np.int64)
+    counts[is_curve] = arc_segment_counts(batch.radii[is_curve], sweeps[is_curve],
+                                          max_deviation, max_segment_length, segments)
+    offsets = np.zeros(len(batch) + 1, dtype=np.intp)
+    np.cumsum(counts + 1, out=offsets[1:])
+
+    owner = np.repeat(np.arange(len(batch)), counts + 1)
+    fractions = (np.arange(offsets[-1]) - offsets[owner]) / counts[owner]
+    angles = start_angles[owner] + fractions * sweeps[owner]
+    abs_radii = np.abs(batch.radii)[owner]
+    on_curve = is_curve[owner]
+    xs = np.where(on_curve, center_xs[owner] + abs_radii * np.cos(angles), batch.x[owner] + fractions * batch.dx[owner])
+    ys = np.where(on_curve, center_ys[owner] + abs_radii * np.sin(angles), batch.y[owner] + fractions * batch.dy[owner])
+    # Every leg starts and ends exactly on its stations
+    xs[offsets[:-1]] = batch.x[:-1]
+    ys[offsets[:-1]] = batch.y[:-1]
+    xs[offsets[1:] - 1] = batch.x[1:]
+    ys[offsets[1:] - 1] = batch.y[1:]
+    return xs, ys, offsets
+
+
+def batch_leg_vertices(batch, **densify_options):
+    """:func:`batch_vertex_arrays` split into one ``(xs, ys)`` pair of array views per leg."""
+    xs, ys, offsets = batch_vertex_arrays(batch, **densify_options)
+    return [(xs[first:end], ys[first:end]) for first, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def store_to_arrays(store):
+    """
+    Column arrays of a :class:`traverse_store.SegmentStore` for
+    :func:`propagate_traverse`, using the store's cached azimuths. Rows
+    without a distance are marked unsolvable, as the scalar engine skips them.
+    """
+    azimuths = np.frombuffer(store.azimuths, dtype=float).copy()
+    distances = np.frombuffer(store.distances, dtype=float).copy()
+    radii = np.nan_to_num(np.frombuffer(store.radii, dtype=float))
+    arc_lengths = np.nan_to_num(np.frombuffer(store.arc_lengths, dtype=float))
+    tangent = np.fromiter((direction in TANGENT_MARKERS for direction in store.directions),
+                          dtype=bool, count=len(store))
+
+    incomplete = np.isnan(distances)
+    azimuths[incomplete] = np.nan
+    tangent[incomplete] = False
+    distances[incomplete] = 0.0
+    return azimuths, distances, radii, arc_lengths, tangent
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Qt table model exposing a :class:`traverse_store.SegmentStore` to a
+QTableView. The view only asks for the rows it shows, and bulk loads emit a
+single insert (or reset) notification instead of one per row.
+"""
+import itertools
+import math
+
+from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from .traverse_store import COLUMN_DIRECTION, COLUMN_NAMES, SegmentStore
+
+
+class TraverseTableModel(QAbstractTableModel):
+    """Editable model over the columnar traverse segment store."""
+
+    # Emitted with (row, column, text) when an edit is rejected
+    invalidEdit = pyqtSignal(int, int, str)
+
+    def __init__(self, store=None, parent=None):
+        super(TraverseTableModel, self).__init__(parent)
+        self.store = store if store is not None else SegmentStore()
+
+    # --- QAbstractTableModel interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_NAMES)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMN_NAMES[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        value = self.store.value(index.row(), index.column())
+        if index.column() == COLUMN_DIRECTION:
+            return value
+        if math.isnan(value):
+            return ""
+        return f"{value:.3f}" if role == Qt.DisplayRole else repr(value)
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        try:
+            self.store.set_value(index.row(), index.column(), value)
+        except ValueError:
+            self.invalidEdit.emit(index.row(), index.column(), str(value))
+            return False
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        self.beginInsertRows(parent, row, row + count - 1)
+        self.store.insert_empty(row, count)
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        self.beginRemoveRows(parent, row, row + count - 1)
+        self.store.remove(row, count)
+        self.endRemoveRows()
+        return True
+
+    # --- Bulk helpers ---
+
+    def append_segments(self, rows):
+        """
+        Appends ``(direction, distance, radius, arc_length)`` rows with a
+        single insert notification. Raises ValueError for non-numeric values,
+        in which case nothing is added. Returns the number of rows added.
+        """
+        return self.append_prepared(self.store.prepare_rows(rows))
+
+    def append_prepared(self, prepared):
+        """
+        Appends columns from :meth:`traverse_store.SegmentStore.prepare_rows`
+        (which may run on another thread) with a single insert notification.
+        Returns the number of rows added.
+        """
+        count = len(prepared[0])
+        if not count:
+            return 0
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + count - 1)
+        self.store.extend_prepared(prepared)
+        self.endInsertRows()
+        return count
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+    def remove_row_set(self, rows):
+        """Removes the given row numbers, one removeRows call per contiguous range."""
+        # Rows of a contiguous range share the same row - position
+        ranges = [[row for _, row in group]
+                  for _, group in itertools.groupby(enumerate(sorted(set(rows))), lambda pair: pair[1] - pair[0])]
+        # Bottom range first, so the row numbers of the ranges above stay valid
+        for group in reversed(ranges):
+            self.removeRows(group[0], len(group))
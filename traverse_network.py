@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+Least-squares adjustment of networks of traverses sharing stations.
+
+Every solved leg is an observation of the coordinate difference between
+two stations, weighted by the inverse of its travelled length (the model
+behind the Compass rule, so a single traverse between two held points
+adjusts exactly as :func:`traverse_closure.adjust_traverse` would).
+Stations of different traverses falling within ``tolerance`` of each
+other (e.g. an EP record on another traverse's SP) become one station,
+which ties the traverses into a network; at least one station of every
+connected part must be held.
+
+The design matrix is the sparse junction incidence matrix, identical for
+eastings and northings, so both are solved from one factorization of the
+normal equations.  SciPy's sparse LU is used when available; without
+SciPy the normal equations are solved densely, which is only practical
+for a few thousand junctions.  Nothing in here imports Qt or QGIS.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.linalg import splu
+except ImportError:
+    coo_matrix = splu = None
+
+from .traverse_closure import shift_stations
+
+NETWORK = 'network'
+DEFAULT_JUNCTION_TOLERANCE = 0.01
+# Columns of the inverse normal matrix recovered per LU solve for standard errors
+INVERSE_BLOCK_SIZE = 256
+
+# Adjusted station coordinates ``xs``/``ys`` and their standard errors,
+# per-observation residuals (adjusted minus observed coordinate
+# differences), the a posteriori standard deviation of unit weight
+# ``sigma0`` (None without redundancy, in which case the a priori unit
+# weight of 1 per unit length is used for the standard errors) and the
+# redundancy (degrees of freedom).
+NetworkAdjustment = namedtuple('NetworkAdjustment',
+                               'xs ys sigma_xs sigma_ys residual_xs residual_ys sigma0 redundancy')
+
+
+class NetworkError(ValueError):
+    """Raised when a network cannot be adjusted (no observations, unheld parts...)."""
+
+
+class TraverseNetwork(object):
+    """
+    Collects traverses into one network of stations and leg observations.
+
+    Add the solved traverses with :meth:`add_traverse` (or :meth:`add_batch`),
+    hold the control stations with :meth:`hold`, then :meth:`adjust` and
+    turn the outcome back into traverse results with :meth:`adjusted_results`.
+    """
+
+    def __init__(self, tolerance=DEFAULT_JUNCTION_TOLERANCE):
+        self.tolerance = tolerance
+        self._cells = {} # Grid cell of side ``tolerance`` -> indices of the stations in it
+        self._xs = []
+        self._ys = []
+        self._held = set()
+        self._from = []
+        self._to = []
+        self._dxs = []
+        self._dys = []
+        self._lengths = []
+        self._traverses = [] # (result, station indices, computed xs, computed ys, shift function)
+
+    @property
+    def station_count(self):
+        return len(self._xs)
+
+    @property
+    def observation_count(self):
+        return len(self._from)
+
+    def station(self, point):
+        """
+        Index of the nearest station within the tolerance of ``point``,
+        created when there is none.
+        """
+        x, y = float(point[0]), float(point[1])
+        column, row = self._cell(x, y)
+        # A station within the tolerance lies in the same or a neighbouring cell
+        index = None
+        nearest = self.tolerance
+        for key in ((column + i, row + j) for i in (-1, 0, 1) for j in (-1, 0, 1)):
+            for candidate in self._cells.get(key, ()):
+                distance = math.hypot(self._xs[candidate] - x, self._ys[candidate] - y)
+                if distance <= nearest:
+                    index, nearest = candidate, distance
+        if index is None:
+            index = len(self._xs)
+            self._xs.append(x)
+            self._ys.append(y)
+            self._cells.setdefault((column, row), []).append(index)
+        return index
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.tolerance), math.floor(y / self.tolerance))
+
+    def hold(self, point):
+        """Holds the station at ``point`` fixed at those coordinates. Returns its index."""
+        index = self.station(point)
+        old_cell = self._cell(self._xs[index], self._ys[index])
+        self._xs[index] = float(point[0])
+        self._ys[index] = float(point[1])
+        new_cell = self._cell(self._xs[index], self._ys[index])
+        if new_cell != old_cell:
+            self._cells[old_cell].remove(index)
+            self._cells.setdefault(new_cell, []).append(index)
+        self._held.add(index)
+        return index
+
+    def add_traverse(self, result, closing_point=None):
+        """
+        Adds the legs of a solved :class:`traverse_engine.TraverseResult`.
+        The traverse ends on the station at ``closing_point`` (its EP record)
+        when given, otherwise on the station at its computed end. Returns the
+        index of the traverse, as used by :meth:`adjusted_results`.
+        """
+        legs = result.legs
+        return self._add(result, result.stations(),
+                         [leg_result.end[0] - leg_result.start[0] for leg_result in legs],
+                         [leg_result.end[1] - leg_result.start[1] for leg_result in legs],
+                         [leg_result.length for leg_result in legs], closing_point, shift_stations)
+
+    def add_batch(self, batch, closing_point=None):
+        """:meth:`add_traverse` for a :class:`traverse_kernels.BatchResult`, read from its arrays."""
+        return self._add(batch, batch.stations(), batch.dx.tolist(), batch.dy.tolist(), batch.lengths.tolist(),
+                         closing_point, lambda batch, shift_xs, shift_ys: batch.shifted(shift_xs, shift_ys))
+
+    def _add(self, result, stations, dxs, dys, lengths, closing_point, shift):
+        indices = [self.station(point) for point in stations[:-1]]
+        indices.append(self.station(closing_point if closing_point is not None else stations[-1]))
+        self._from.extend(indices[:-1])
+        self._to.extend(indices[1:])
+        self._dxs.extend(dxs)
+        self._dys.extend(dys)
+        self._lengths.extend(lengths)
+        self._traverses.append((result, indices,
+                                [point[0] for point in stations], [point[1] for point in stations], shift))
+        return len(self._traverses) - 1
+
+    def adjust(self, standard_errors=True):
+        """
+        Solves the network by least squares and returns a
+        :class:`NetworkAdjustment`. Raises :class:`NetworkError` when there
+        is nothing to adjust or a connected part has no held station.
+
+        Runs of legs through unheld stations used by exactly two legs are
+        condensed into one observation between the junctions at their ends
+        (the sum of the legs, weighted by the inverse of their total
+        length).  Only the junctions go through the sparse solver; the
+        stations in between follow in closed form, which is exact and keeps
+        the standard errors cheap.
+        """
+        if not self._from:
+            raise NetworkError("The network has no observations.")
+        self._check_held_parts()
+
+        first = np.array(self._from, dtype=np.intp)
+        second = np.array(self._to, dtype=np.intp)
+        observed = np.column_stack((self._dxs, self._dys))
+        lengths = np.maximum(np.array(self._lengths, dtype=float), np.finfo(float).eps ** 0.5)
+        coordinates = np.column_stack((self._xs, self._ys))
+        held = np.zeros(len(coordinates), dtype=bool)
+        held[list(self._held)] = True
+
+        chain = _condense_chains(first, second, held)
+        oriented = chain.signs[:, None] * observed[chain.observations]
+        cumulative = _segmented_cumsum(oriented, chain.offsets)
+        cumulative_lengths = _segmented_cumsum(lengths[chain.observations], chain.offsets)
+        last = np.append(chain.offsets[1:], len(chain.observations)) - 1
+        sums = cumulative[last]
+        totals = cumulative_lengths[last]
+
+        # Junction system: one observation per chain, weighted like the Compass rule
+        junction_unknown = chain.junctions[~held[chain.junctions]]
+        column = np.full(len(coordinates), -1, dtype=np.intp)
+        column[junction_unknown] = np.arange(len(junction_unknown))
+        weights = 1.0 / totals
+        # Move the held stations to the observation side: A_free X = l - A_held X_held
+        reduced = sums + np.where(held[chain.starts, None], coordinates[chain.starts], 0.0) \
+            - np.where(held[chain.ends, None], coordinates[chain.ends], 0.0)
+        start_columns = column[chain.starts]
+        end_columns = column[chain.ends]
+        pairs = None
+        if standard_errors:
+            # Cofactors needed: every junction's variance, and per chain those of its ends and their covariance
+            junction_columns = np.arange(len(junction_unknown))
+            pairs = (np.concatenate((junction_columns, start_columns, end_columns, start_columns)),
+                     np.concatenate((junction_columns, start_columns, end_columns, end_columns)))
+        solution, cofactors = _solve_normal_equations(
+            start_columns, end_columns, weights, reduced, len(junction_unknown), pairs)
+        coordinates[junction_unknown] = solution
+
+        # Stations inside the chains: the observed run plus their share of the chain misclosure
+        inside = chain.interior >= 0
+        owner = chain.owners[inside]
+        shares = (cumulative_lengths[inside] / totals[owner])[:, None]
+        starts = coordinates[chain.starts[owner]]
+        closing = coordinates[chain.ends[owner]] - starts - sums[owner]
+        coordinates[chain.interior[inside]] = starts + cumulative[inside] + shares * closing
+
+        residuals = coordinates[second] - coordinates[first] - observed
+        redundancy = 2 * (len(first) - int(np.count_nonzero(~held[np.union1d(first, second)])))
+        sigma0 = None
+        if redundancy > 0:
+            sigma0 = float(np.sqrt(np.sum(residuals ** 2 / lengths[:, None]) / redundancy))
+
+        sigmas = np.zeros(len(coordinates))
+        if cofactors is None:
+            sigmas[~held] = np.nan
+        else:
+            count = len(junction_unknown)
+            junction_cofactors, start_cofactors, end_cofactors, cross_cofactors = np.split(
+                cofactors, [count, count + len(totals), count + 2 * len(totals)])
+            sigmas[junction_unknown] = junction_cofactors
+            # Variance of a chain station: its ends' share plus that of the legs between them
+            shares = shares[:, 0]
+            sigmas[chain.interior[inside]] = (
+                (1.0 - shares) ** 2 * start_cofactors[owner] + shares ** 2 * end_cofactors[owner]
+                + 2.0 * shares * (1.0 - shares) * cross_cofactors[owner]
+                + shares * (1.0 - shares) * totals[owner])
+            sigmas = np.sqrt(np.maximum(sigmas, 0.0)) * (sigma0 if sigma0 is not None else 1.0)
+        return NetworkAdjustment(coordinates[:, 0], coordinates[:, 1], sigmas, sigmas.copy(),
+                                 residuals[:, 0], residuals[:, 1], sigma0, redundancy)
+
+    def adjusted_results(self, adjustment):
+        """The added traverses with their stations moved to the adjusted coordinates, in order."""
+        results = []
+        for result, indices, xs, ys, shift in self._traverses:
+            indices = np.array(indices, dtype=np.intp)
+            results.append(shift(result, adjustment.xs[indices] - xs, adjustment.ys[indices] - ys))
+        return results
+
+    def _check_held_parts(self):
+        """Raises NetworkError unless every connected part of the network has a held station."""
+        parents = list(range(len(self._xs)))
+
+        def root(index):
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        for first, second in zip(self._from, self._to):
+            parents[root(first)] = root(second)
+        held_roots = set(root(index) for index in self._held)
+        unheld = set(root(index) for index in set(self._from) | set(self._to)) - held_roots
+        if unheld:
+            example = min(unheld)
+            raise NetworkError(f"{len(unheld)} part(s) of the network have no held station "
+                               f"(e.g. the one through {self._xs[example]:.3f} {self._ys[example]:.3f}).")
+
+
+# Legs of the network grouped into chains running from junction to junction.
+# ``observations``/``signs`` list the legs of all chains back to back (sign
+# -1 where a leg is walked backwards), ``offsets`` where each chain starts,
+# ``owners`` the chain of every entry and ``interior`` the station reached
+# after it (-1 for the last leg of a chain, which reaches a junction).
+# ``starts``/``ends`` are the junctions at both ends of every chain.
+Chains = namedtuple('Chains', 'observations signs owners interior offsets starts ends junctions')
+
+
+def _condense_chains(first, second, held):
+    """
+    Splits the legs into :data:`Chains`. Junctions are the held stations and
+    every station not used by exactly two legs.
+    """
+    station_count = len(held)
+    degree = np.bincount(np.concatenate((first, second)), minlength=station_count)
+    junction = held | (degree != 2)
+    junction[first[first == second]] = True
+    junction &= degree > 0
+
+    incident = [[] for _ in range(station_count)]
+    for observation, (start, end) in enumerate(zip(first.tolist(), second.tolist())):
+        incident[start].append(observation)
+        incident[end].append(observation)
+
+    used = np.zeros(len(first), dtype=bool)
+    observations, signs, owners, interior, offsets, starts, ends = [], [], [], [], [], [], []
+    for station in np.flatnonzero(junction).tolist():
+        for observation in incident[station]:
+            if used[observation]:
+                continue
+            offsets.append(len(observations))
+            starts.append(station)
+            node = station
+            while True:
+                used[observation] = True
+                observations.append(observation)
+                owners.append(len(starts) - 1)
+                if first[observation] == node:
+                    signs.append(1.0)
+                    node = second[observation]
+                else:
+                    signs.append(-1.0)
+                    node = first[observation]
+                if junction[node]:
+                    interior.append(-1)
+                    break
+                interior.append(node)
+                before, after = incident[node]
+                observation = after if before == observation else before
+            ends.append(node)
+
+    return Chains(np.array(observations, dtype=np.intp), np.array(signs), np.array(owners, dtype=np.intp),
+                  np.array(interior, dtype=np.intp), np.array(offsets, dtype=np.intp),
+                  np.array(starts, dtype=np.intp), np.array(ends, dtype=np.intp),
+                  np.flatnonzero(junction))
+
+
+def _segmented_cumsum(values, offsets):
+    """Cumulative sums of ``values`` restarting at every offset."""
+    cumulative = np.cumsum(values, axis=0)
+    counts = np.diff(np.append(offsets, len(values)))
+    before = cumulative[offsets] - values[offsets]
+    return cumulative - np.repeat(before, counts, axis=0)
+
+
+def _solve_normal_equations(first, second, weights, observed, size, pairs=None):
+    """
+    Solves N X = A^T W l for the unknown stations, where every observation
+    runs from column ``first`` to column ``second`` (-1 for held stations).
+    Returns the solution (size x 2) and, when ``pairs`` of (row, column)
+    index arrays are given, those entries of N^-1 (0 where either is -1).
+    """
+    # Incidence matrix entries: -1 at the from-station, +1 at the to-station
+    rows = np.concatenate((np.arange(len(first)), np.arange(len(second))))
+    columns = np.concatenate((first, second))
+    values = np.concatenate((-np.ones(len(first)), np.ones(len(second))))
+    keep = columns >= 0
+    rows, columns, values = rows[keep], columns[keep], values[keep]
+
+    right_hand_side = np.zeros((size, 2))
+    np.add.at(right_hand_side, columns, (values * weights[rows])[:, None] * observed[rows])
+    cofactors = None
+    if pairs is not None:
+        cofactors = np.zeros(len(pairs[0]))
+        wanted = (pairs[0] >= 0) & (pairs[1] >= 0)
+    if size == 0:
+        return right_hand_side, cofactors
+
+    if splu is None:
+        normal = np.zeros((size, size))
+        np.add.at(normal, (columns, columns), weights[rows])
+        both = (first >= 0) & (second >= 0)
+        np.add.at(normal, (first[both], second[both]), -weights[both])
+        np.add.at(normal, (second[both], first[both]), -weights[both])
+        inverse = np.linalg.inv(normal)
+        if cofactors is not None:
+            cofactors[wanted] = inverse[pairs[0][wanted], pairs[1][wanted]]
+        return inverse @ right_hand_side, cofactors
+
+    design = coo_matrix((values, (rows, columns)), shape=(len(first), size)).tocsr()
+    normal = (design.T.multiply(weights) @ design).tocsc()
+    lu = splu(normal)
+    solution = lu.solve(right_hand_side)
+    if cofactors is not None:
+        # Recover the wanted columns of N^-1 a block at a time
+        for start in range(0, size, INVERSE_BLOCK_SIZE):
+            stop = min(start + INVERSE_BLOCK_SIZE, size)
+            in_block = wanted & (pairs[1] >= start) & (pairs[1] < stop)
+            if not in_block.any():
+                continue
+            block = np.zeros((size, stop - start))
+            block[np.arange(start, stop), np.arange(stop - start)] = 1.0
+            inverse = lu.solve(block)
+            cofactors[in_block] = inverse[pairs[0][in_block], pairs[1][in_block] - start]
+    return solution, cofactors
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming parser for traverse files.
+
+A traverse file is a list of whitespace separated records, one per line:
+
+    DT QB                       direction type (header)
+    DU DMS                      direction units (header)
+    SP <x> <y>                  start point
+    EP <x> <y> [<direction>]    end (closing) point, optionally with the
+                                known direction of the closing line
+    DD <direction> <distance>   straight leg
+    CV <direction> <radius> <arc length>   curve leg (negative radius = left)
+
+:func:`iter_records` is a generator: it yields one typed record per line
+(errors included) and never holds more than the current line, so files of
+any size can be validated or piped into the compute engine.  Nothing in
+here imports Qt or QGIS.
+"""
+from collections import namedtuple
+
+from .traverse_engine import Leg, chord_length
+from .traverse_kernels import format_bearings, legs_to_arrays
+
+HeaderRecord = namedtuple('HeaderRecord', 'line_num key value')
+StartPointRecord = namedtuple('StartPointRecord', 'line_num x y')
+EndPointRecord = namedtuple('EndPointRecord', 'line_num x y direction')
+StraightLegRecord = namedtuple('StraightLegRecord', 'line_num direction distance')
+CurveLegRecord = namedtuple('CurveLegRecord', 'line_num direction radius arc_length')
+ErrorRecord = namedtuple('ErrorRecord', 'line_num text message')
+
+HEADER_TYPES = ('DT', 'DU')
+LEG_RECORDS = (StraightLegRecord, CurveLegRecord)
+
+
+def parse_line(line, line_num):
+    """
+    Parses one line of a traverse file. Returns a record, an
+    :class:`ErrorRecord` for malformed or unknown lines, or ``None`` for
+    blank lines.
+    """
+    parts = line.split()
+    if not parts:
+        return None
+
+    line_type = parts[0].upper()
+    text = line.strip()
+    try:
+        if line_type == 'DD' and len(parts) >= 3:
+            return StraightLegRecord(line_num, parts[1], float(parts[2]))
+        if line_type == 'CV' and len(parts) >= 4:
+            return CurveLegRecord(line_num, parts[1], float(parts[2]), float(parts[3]))
+        if line_type == 'SP' and len(parts) >= 3:
+            return StartPointRecord(line_num, float(parts[1]), float(parts[2]))
+        if line_type == 'EP' and len(parts) >= 3:
+            return EndPointRecord(line_num, float(parts[1]), float(parts[2]), parts[3] if len(parts) > 3 else None)
+        if line_type in HEADER_TYPES and len(parts) >= 2:
+            return HeaderRecord(line_num, line_type, " ".join(parts[1:]))
+    except ValueError:
+        return ErrorRecord(line_num, text, f"Skipping line {line_num}: Malformed numeric data for {line_type}. Line: '{text}'")
+    return ErrorRecord(line_num, text, f"Skipping line {line_num}: Unrecognized format or incomplete data. Line: '{text}'")
+
+
+def iter_records(lines, first_line_num=1):
+    """
+    Generator yielding one record per non-blank line of ``lines`` (any
+    iterable of strings, e.g. an open file).
+    """
+    for line_num, line in enumerate(lines, first_line_num):
+        record = parse_line(line, line_num)
+        if record is not None:
+            yield record
+
+
+def iter_file_records(file_path, encoding='utf-8'):
+    """Generator yielding the records of a traverse file, reading it lazily."""
+    with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+        for record in iter_records(f):
+            yield record
+
+
+def iter_file_records_progress(file_path, encoding='utf-8'):
+    """
+    Like :func:`iter_file_records`, but yields ``(record, bytes_read)``
+    pairs so a caller can report progress against the file size.
+    """
+    with open(file_path, 'rb') as f:
+        bytes_read = 0
+        for line_num, raw in enumerate(f, 1):
+            bytes_read += len(raw)
+            record = parse_line(raw.decode(encoding, errors='replace'), line_num)
+            if record is not None:
+                yield record, bytes_read
+
+
+def record_to_leg(record, row=None):
+    """
+    Converts a straight or curve leg record to an engine
+    :class:`~traverse_engine.Leg`. Curves carry their chord as distance.
+    """
+    if isinstance(record, CurveLegRecord):
+        return Leg(record.direction, chord_length(record.radius, record.arc_length),
+                   record.radius, record.arc_length, row)
+    return Leg(record.direction, record.distance, 0.0, 0.0, row)
+
+
+def format_leg_lines(legs):
+    """
+    Formats engine legs as the DD/CV lines of a traverse file, directions
+    rewritten as quadrant bearings (tangent legs keep "*" so the file
+    round-trips). Yields ``(leg, line)`` pairs; ``line`` is None for a leg
+    whose direction cannot be parsed.
+    """
+    bearings = format_bearings(legs_to_arrays(legs)[0])
+    for leg, bearing in zip(legs, bearings):
+        if leg.is_tangent:
+            direction = "*"
+        elif not bearing:
+            yield leg, None
+            continue
+        else:
+            direction = bearing
+        if leg.is_curve:
+            yield leg, f"CV {direction} {leg.radius:.6f} {leg.arc_length:.6f}"
+        else:
+            yield leg, f"DD {direction} {leg.distance:.6f}"
+
+
+class TraverseFile(object):
+    """
+    Everything read from a traverse file: headers, start/end points, legs
+    and errors. Built by :func:`read_traverse_file` for callers that do want
+    the whole traverse in memory.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.headers = {}
+        self.start_point = None
+        self.end_point = None
+        self.closing_direction = None
+        self.legs = []
+        self.errors = []
+
+    def add(self, record):
+        if isinstance(record, LEG_RECORDS):
+            self.legs.append(record_to_leg(record, len(self.legs)))
+        elif isinstance(record, StartPointRecord):
+            self.start_point = (record.x, record.y)
+        elif isinstance(record, EndPointRecord):
+            self.end_point = (record.x, record.y)
+            self.closing_direction = record.direction
+        elif isinstance(record, HeaderRecord):
+            self.headers[record.key] = record.value
+        elif isinstance(record, ErrorRecord):
+            self.errors.append(record)
+
+
+def read_traverse_file(file_path):
+    """Reads a whole traverse file into a :class:`TraverseFile`."""
+    traverse_file = TraverseFile(file_path)
+    for record in iter_file_records(file_path):
+        traverse_file.add(record)
+    return traverse_file
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Live preview of the traverse on the map canvas.
+
+The preview is a rubber band fed from the dock's
+:class:`traverse_cache.TraverseCache`, so it draws the same computed
+stations that export and draw reuse, and a redraw after a pan or zoom
+recomputes nothing.  Redraws are
+debounced: table edits, start point changes and canvas pans all restart a
+short single-shot timer and the band is rebuilt once things settle.  Only
+legs whose bounding box touches the visible extent are added, and vertices
+closer than a pixel to the previous one are dropped, so the band holds at
+most a few points per screen pixel whatever the size of the traverse.
+"""
+import math
+
+from qgis.PyQt.QtCore import QObject, Qt, QTimer
+from qgis.PyQt.QtGui import QColor
+from qgis.core import QgsGeometry, QgsPointXY, QgsWkbTypes
+from qgis.gui import QgsRubberBand
+
+from .traverse_engine import NUM_CURVE_SEGMENTS, arc_vertices
+
+# Quiet time after the last change before the preview is rebuilt
+PREVIEW_DELAY_MS = 250
+
+# Largest chord-to-arc deviation of previewed curves, in pixels
+PREVIEW_TOLERANCE_PIXELS = 0.5
+
+
+def preview_segments(radius, sweep, tolerance):
+    """Number of chords keeping an arc within ``tolerance`` of the true curve."""
+    abs_radius = abs(radius)
+    if tolerance >= abs_radius:
+        return 1
+    step = 2.0 * math.acos(1.0 - tolerance / abs_radius)
+    return max(1, min(NUM_CURVE_SEGMENTS * 10, int(math.ceil(abs(sweep) / step))))
+
+
+def leg_visible(leg_result, xmin, ymin, xmax, ymax):
+    """True when the bounding box of a placed leg (the full circle for curves) touches the extent."""
+    (x1, y1), (x2, y2) = leg_result.start, leg_result.end
+    if leg_result.is_curve:
+        center_x, center_y = leg_result.center
+        radius = abs(leg_result.radius)
+        x1, y1, x2, y2 = center_x - radius, center_y - radius, center_x + radius, center_y + radius
+    return not (max(x1, x2) < xmin or min(x1, x2) > xmax or max(y1, y2) < ymin or min(y1, y2) > ymax)
+
+
+def preview_parts(leg_results, extent, pixel_size):
+    """
+    Polylines (lists of QgsPointXY) for the legs visible in ``extent``.
+    A new part starts wherever invisible legs were left out.
+    """
+    bounds = (extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum())
+    tolerance = pixel_size * PREVIEW_TOLERANCE_PIXELS
+    min_step_sq = pixel_size * pixel_size
+    parts = []
+    part = None
+    for leg_result in leg_results:
+        if not leg_visible(leg_result, *bounds):
+            part = None
+            continue
+        if part is None:
+            part = [QgsPointXY(*leg_result.start)]
+            parts.append(part)
+
+        if leg_result.is_curve:
+            segments = preview_segments(leg_result.radius, leg_result.sweep, tolerance)
+            vertices = arc_vertices(leg_result.center, leg_result.radius,
+                                    leg_result.start_angle, leg_result.sweep, segments)
+            vertices[-1] = leg_result.end
+        else:
+            vertices = [leg_result.end]
+
+        last = part[-1]
+        for x, y in vertices[:-1]:
+            if (x - last.x()) ** 2 + (y - last.y()) ** 2 >= min_step_sq:
+                last = QgsPointXY(x, y)
+                part.append(last)
+        # Always keep the end of the leg so the next leg joins up
+        end_x, end_y = vertices[-1]
+        if (end_x - last.x()) ** 2 + (end_y - last.y()) ** 2 >= min_step_sq or len(part) == 1:
+            part.append(QgsPointXY(end_x, end_y))
+        else:
+            part[-1] = QgsPointXY(end_x, end_y)
+    return [part for part in parts if len(part) > 1]
+
+
+class TraversePreview(QObject):
+    """Rubber band showing the traverse in the table, kept up to date as it is edited."""
+
+    def __init__(self, canvas, cache, parent=None):
+        super(TraversePreview, self).__init__(parent)
+        self.canvas = canvas
+        self.cache = cache
+        self.start = None
+
+        self.band = QgsRubberBand(canvas, QgsWkbTypes.LineGeometry)
+        self.band.setColor(QColor(255, 0, 0, 160))
+        self.band.setWidth(2)
+        self.band.setLineStyle(Qt.DashLine)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(PREVIEW_DELAY_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.canvas.extentsChanged.connect(self.schedule)
+
+    def set_start(self, point):
+        """Sets the start point (a QgsPointXY, or None to hide the preview)."""
+        self.start = point
+        self.schedule()
+
+    def schedule(self):
+        """Requests a redraw once changes have stopped for :data:`PREVIEW_DELAY_MS`."""
+        self.timer.start()
+
+    def clear(self):
+        self.timer.stop()
+        self.band.reset(QgsWkbTypes.LineGeometry)
+
+    def refresh(self):
+        """Rebuilds the rubber band from the cached traverse."""
+        if self.start is None or not len(self.cache.store):
+            self.band.reset(QgsWkbTypes.LineGeometry)
+            return
+        snapshot = self.cache.snapshot((self.start.x(), self.start.y()))
+        parts = preview_parts(snapshot.result.legs, self.canvas.extent(),
+                              self.canvas.mapUnitsPerPixel())
+        if not parts:
+            self.band.reset(QgsWkbTypes.LineGeometry)
+            return
+        self.band.setToGeometry(QgsGeometry.fromMultiPolylineXY(parts), None)
+
+    def remove(self):
+        """Removes the rubber band from the canvas for good."""
+        self.clear()
+        self.canvas.extentsChanged.disconnect(self.schedule)
+        self.canvas.scene().removeItem(self.band)
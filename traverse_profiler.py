@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in stage timings for the plugin's long running operations.
+
+Code under measurement wraps each stage in :meth:`Profiler.stage`::
+
+    with profiler.stage('compute') as span:
+        ...
+        span.rows = len(leg_results)
+
+A disabled profiler records nothing and costs one attribute check per
+stage.  The recorded spans can be summarized per stage and exported in the
+Chrome trace event format, which chrome://tracing, Perfetto and
+speedscope open directly.  Spans may be recorded from task worker threads;
+each span keeps the thread it ran on.  Nothing in here imports Qt or QGIS.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Keep at most this many spans; the oldest are dropped first
+MAX_SPANS = 100000
+
+# Per-stage aggregate of the recorded spans
+StageSummary = namedtuple('StageSummary', 'name calls total_seconds max_seconds rows')
+
+
+class Span(object):
+    """One timed stage. ``rows`` (and ``args``) may be filled in while it runs."""
+
+    __slots__ = ('name', 'start', 'duration', 'rows', 'args', 'thread_id')
+
+    def __init__(self, name, rows=None, args=None):
+        self.name = name
+        self.start = 0.0
+        self.duration = 0.0
+        self.rows = rows
+        self.args = args or {}
+        self.thread_id = threading.get_ident()
+
+
+class _StageContext(object):
+    """Context manager timing one span and handing it to the profiler."""
+
+    __slots__ = ('profiler', 'span')
+
+    def __init__(self, profiler, span):
+        self.profiler = profiler
+        self.span = span
+
+    def __enter__(self):
+        self.span.start = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.span.duration = time.perf_counter() - self.span.start
+        if exc_type is not None:
+            self.span.args['error'] = str(exc_value)
+        self.profiler.add(self.span)
+        return False
+
+
+class _NullContext(object):
+    """What a disabled profiler returns: hands out a throwaway span."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return Span(None)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class Profiler(object):
+    """Thread-safe recorder of timed stages."""
+
+    def __init__(self, enabled=False, max_spans=MAX_SPANS):
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.origin = time.perf_counter()
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def stage(self, name, rows=None, **args):
+        """Context manager timing the stage ``name``; yields its :class:`Span`."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return _StageContext(self, Span(name, rows, args))
+
+    def add(self, span):
+        with self._lock:
+            self._spans.append(span)
+            if len(self._spans) > self.max_spans:
+                del self._spans[:len(self._spans) - self.max_spans]
+
+    def spans(self):
+        """A snapshot of the recorded spans, oldest first."""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans = []
+        self.origin = time.perf_counter()
+
+    def summary(self):
+        """One :class:`StageSummary` per stage name, in order of first appearance."""
+        stages = OrderedDict()
+        for span in self.spans():
+            calls, total, longest, rows = stages.get(span.name, (0, 0.0, 0.0, None))
+            if span.rows is not None:
+                rows = (rows or 0) + span.rows
+            stages[span.name] = (calls + 1, total + span.duration, max(longest, span.duration), rows)
+        return [StageSummary(name, *values) for name, values in stages.items()]
+
+    def chrome_trace(self):
+        """The spans as a Chrome trace event document (complete "X" events, in microseconds)."""
+        process_id = os.getpid()
+        events = []
+        for span in self.spans():
+            args = dict(span.args)
+            if span.rows is not None:
+                args['rows'] = span.rows
+            events.append({
+                'name': span.name,
+                'cat': 'traverse',
+                'ph': 'X',
+                'ts': (span.start - self.origin) * 1e6,
+                'dur': span.duration * 1e6,
+                'pid': process_id,
+                'tid': span.thread_id,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        """Writes :meth:`chrome_trace` to ``path`` as JSON. Returns the number of events."""
+        document = self.chrome_trace()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+        return len(document['traceEvents'])
+
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Processing provider of the Traverse plugin, registered by
+:meth:`traverse.traverse.initProcessing`.
+"""
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import QgsProcessingProvider
+
+from .traverse_algorithms import ComputeClosingPoint, TraverseFileToLines, TraverseTableToLines
+
+
+class TraverseProvider(QgsProcessingProvider):
+    """Exposes the traverse algorithms to the Processing toolbox, models and qgis_process."""
+
+    def loadAlgorithms(self):
+        for algorithm_class in (TraverseFileToLines, TraverseTableToLines, ComputeClosingPoint):
+            self.addAlgorithm(algorithm_class())
+
+    def id(self):
+        return 'traverse'
+
+    def name(self):
+        return self.tr('Traverse')
+
+    def icon(self):
+        return QIcon(':/plugins/traverse/icons/surveying-icon.svg')
+
+    def longName(self):
+        return self.name()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Vertex snapping for the trace-lines tool.
+
+Snapping uses a :class:`QgsPointLocator` per layer: an R-tree over every
+vertex (line end points included) of the layer, in the canvas CRS.  It is
+built once, in the background, the first time the layer is snapped to and
+then kept: the locator follows the layer's feature additions, deletions
+and geometry edits by itself, and :meth:`SnapIndexes.invalidate` drops it
+after features were written straight through the data provider, which the
+layer does not announce.  A lookup only visits the index nodes around the
+cursor, so snapping stays fast on layers with millions of vertices.  While
+an index is still being built, clicks are taken as they are.
+"""
+from qgis.PyQt.QtGui import QColor
+from qgis.core import QgsPointLocator, QgsProject
+from qgis.gui import QgsMapToolEmitPoint, QgsVertexMarker
+
+# Search radius around the cursor, in screen pixels
+SNAP_TOLERANCE_PIXELS = 12
+
+
+class SnapIndexes(object):
+    """The vertex locators of the layers snapped to so far, keyed by layer id."""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._locators = {}
+        QgsProject.instance().layersWillBeRemoved.connect(self._forget_layers)
+
+    def locator(self, layer):
+        """The locator of ``layer`` in the canvas CRS, built in the background when new."""
+        settings = self.canvas.mapSettings()
+        locator = self._locators.get(layer.id())
+        if locator is None or locator.destinationCrs() != settings.destinationCrs():
+            locator = QgsPointLocator(layer, settings.destinationCrs(), settings.transformContext())
+            try:
+                locator.init(-1, True) # Index on a worker thread
+            except TypeError:
+                locator.init() # QGIS before 3.10 can only index in the foreground
+            self._locators[layer.id()] = locator
+        return locator
+
+    def nearest_vertex(self, layer, point):
+        """
+        The vertex of ``layer`` nearest to ``point`` (a QgsPointXY in canvas
+        coordinates) within :data:`SNAP_TOLERANCE_PIXELS`, or None.
+        """
+        tolerance = SNAP_TOLERANCE_PIXELS * self.canvas.mapUnitsPerPixel()
+        locator = self.locator(layer)
+        try:
+            match = locator.nearestVertex(point, tolerance, None, True)
+        except TypeError:
+            match = locator.nearestVertex(point, tolerance)
+        return match.point() if match.isValid() else None
+
+    def invalidate(self, layer):
+        """Forgets the locator of ``layer``; the next lookup rebuilds it."""
+        self._locators.pop(layer.id(), None)
+
+    def _forget_layers(self, layer_ids):
+        for layer_id in layer_ids:
+            self._locators.pop(layer_id, None)
+
+    def clear(self):
+        """Drops every locator and stops following the project."""
+        self._locators = {}
+        QgsProject.instance().layersWillBeRemoved.disconnect(self._forget_layers)
+
+
+class SnappingPointTool(QgsMapToolEmitPoint):
+    """
+    Point tool emitting ``canvasClicked`` with the clicked point snapped to
+    the nearest vertex of the layer returned by ``layer_getter`` (when there
+    is one within reach), and marking that vertex while the mouse hovers.
+    """
+
+    def __init__(self, canvas, indexes, layer_getter):
+        super(SnappingPointTool, self).__init__(canvas)
+        self.indexes = indexes
+        self.layer_getter = layer_getter
+        self.marker = None
+
+    def snap(self, point):
+        """``(point, snapped)``: the nearest vertex in reach, or ``point`` itself."""
+        layer = self.layer_getter()
+        if layer is None:
+            return point, False
+        vertex = self.indexes.nearest_vertex(layer, point)
+        if vertex is None:
+            return point, False
+        return vertex, True
+
+    def canvasMoveEvent(self, event):
+        point, snapped = self.snap(self.toMapCoordinates(event.pos()))
+        if not snapped:
+            if self.marker is not None:
+                self.marker.hide()
+            return
+        if self.marker is None:
+            self.marker = QgsVertexMarker(self.canvas())
+            self.marker.setIconType(QgsVertexMarker.ICON_BOX)
+            self.marker.setColor(QColor(255, 0, 255))
+            self.marker.setIconSize(12)
+            self.marker.setPenWidth(2)
+        self.marker.setCenter(point)
+        self.marker.show()
+
+    def canvasReleaseEvent(self, event):
+        point, _ = self.snap(self.toMapCoordinates(event.pos()))
+        self.canvasClicked.emit(point, event.button())
+
+    def deactivate(self):
+        if self.marker is not None:
+            self.canvas().scene().removeItem(self.marker)
+            self.marker = None
+        super(SnappingPointTool, self).deactivate()
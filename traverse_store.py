@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar in-memory store for the rows of the traverse table.
+
+Each column is kept in its own compact container (a list of direction
+strings, ``array('d')`` for the numbers) instead of one item object per
+cell.  Directions are parsed once when they are set and the azimuth is
+cached next to the text, so drawing and exporting read numbers directly.
+Missing numbers are stored as NaN.  Nothing in here imports Qt or QGIS.
+"""
+import math
+from array import array
+
+from .traverse_engine import TANGENT_MARKERS, Leg, TraverseError, parse_direction
+
+COLUMN_DIRECTION = 0
+COLUMN_DISTANCE = 1
+COLUMN_RADIUS = 2
+COLUMN_ARC_LENGTH = 3
+COLUMN_NAMES = ("Direction", "Distance", "Radius", "Arc Length")
+
+NAN = float('nan')
+
+
+def _parse_cached_azimuth(direction):
+    """Azimuth of an explicit direction, NaN for tangent markers or bad text."""
+    if direction.strip() in TANGENT_MARKERS:
+        return NAN
+    try:
+        return parse_direction(direction)
+    except ValueError:
+        return NAN
+
+
+def _to_float(value):
+    """Converts a cell value to float; None and blank text become NaN."""
+    if value is None:
+        return NAN
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return NAN
+    return float(value)
+
+
+class SegmentStore(object):
+    """
+    Rows of (direction, distance, radius, arc length) stored column by column.
+
+    ``revision`` is bumped by every change, so results computed from the
+    rows can be cached until it moves on (see :mod:`traverse_cache`).
+    """
+
+    def __init__(self):
+        self.revision = 0
+        self._reset_columns()
+
+    def _reset_columns(self):
+        self.directions = []
+        self.azimuths = array('d')
+        self.distances = array('d')
+        self.radii = array('d')
+        self.arc_lengths = array('d')
+
+    def __len__(self):
+        return len(self.directions)
+
+    def _numeric_columns(self):
+        return (self.distances, self.radii, self.arc_lengths)
+
+    def append(self, direction, distance, radius=0.0, arc_length=0.0):
+        """Appends one row. Raises ValueError for non-numeric values."""
+        self.extend([(direction, distance, radius, arc_length)])
+
+    def extend(self, rows):
+        """
+        Appends ``(direction, distance, radius, arc_length)`` rows. All values
+        are validated before anything is stored, so a bad row leaves the
+        store untouched. Returns the number of rows added.
+        """
+        return self.extend_prepared(self.prepare_rows(rows))
+
+    @staticmethod
+    def prepare_rows(rows):
+        """
+        Validates and converts rows into column containers for
+        :meth:`extend_prepared`. Raises ValueError for non-numeric values.
+        """
+        directions = []
+        distances, radii, arc_lengths = array('d'), array('d'), array('d')
+        for direction, distance, radius, arc_length in rows:
+            directions.append(str(direction or "").strip())
+            distances.append(_to_float(distance))
+            radii.append(_to_float(radius))
+            arc_lengths.append(_to_float(arc_length))
+        azimuths = array('d', (_parse_cached_azimuth(direction) for direction in directions))
+        return directions, azimuths, distances, radii, arc_lengths
+
+    def extend_prepared(self, prepared):
+        """Appends columns returned by :meth:`prepare_rows`. Returns the number of rows added."""
+        directions, azimuths, distances, radii, arc_lengths = prepared
+        self.directions.extend(directions)
+        self.azimuths.extend(azimuths)
+        self.distances.extend(distances)
+        self.radii.extend(radii)
+        self.arc_lengths.extend(arc_lengths)
+        self.revision += 1
+        return len(directions)
+
+    def insert_empty(self, row, count=1):
+        """Inserts ``count`` rows with an empty direction and zero values at ``row``."""
+        for _ in range(count):
+            self.directions.insert(row, "")
+            self.azimuths.insert(row, NAN)
+            for column in self._numeric_columns():
+                column.insert(row, 0.0)
+        self.revision += 1
+
+    def remove(self, row, count=1):
+        """Removes ``count`` rows starting at ``row``."""
+        del self.directions[row:row + count]
+        del self.azimuths[row:row + count]
+        for column in self._numeric_columns():
+            del column[row:row + count]
+        self.revision += 1
+
+    def clear(self):
+        self._reset_columns()
+        self.revision += 1
+
+    def value(self, row, column):
+        """Raw value of a cell: the direction text or a float (NaN when empty)."""
+        if column == COLUMN_DIRECTION:
+            return self.directions[row]
+        return self._numeric_columns()[column - 1][row]
+
+    def set_value(self, row, column, value):
+        """Sets a cell. Raises ValueError when a numeric cell gets non-numeric text."""
+        if column == COLUMN_DIRECTION:
+            direction = str(value or "").strip()
+            self.directions[row] = direction
+            self.azimuths[row] = _parse_cached_azimuth(direction)
+        else:
+            self._numeric_columns()[column - 1][row] = _to_float(value)
+        self.revision += 1
+
+    def row(self, row):
+        """Returns the ``(direction, distance, radius, arc_length)`` tuple of a row."""
+        return (self.directions[row], self.distances[row], self.radii[row], self.arc_lengths[row])
+
+    def leg(self, row):
+        """
+        Builds the engine :class:`~traverse_engine.Leg` of a row, with the
+        cached azimuth. Raises TraverseError when the distance is missing.
+        """
+        distance = self.distances[row]
+        if math.isnan(distance):
+            raise TraverseError(f"Skipping incomplete row {row + 1}. (Missing Distance or invalid Direction)")
+        radius = self.radii[row]
+        arc_length = self.arc_lengths[row]
+        azimuth = self.azimuths[row]
+        return Leg(self.directions[row], distance,
+                   0.0 if math.isnan(radius) else radius,
+                   0.0 if math.isnan(arc_length) else arc_length,
+                   row, None if math.isnan(azimuth) else azimuth)
+
+    def legs(self, issues=None):
+        """
+        Returns the legs of all complete rows. Incomplete rows are left out
+        and their error message appended to ``issues`` when given.
+        """
+        legs = []
+        for row in range(len(self.directions)):
+            try:
+                legs.append(self.leg(row))
+            except TraverseError as te:
+                if issues is not None:
+                    issues.append(str(te))
+        return legs
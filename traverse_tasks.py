@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Background tasks for the Traverse plugin.
+
+Tasks do the heavy lifting (traverse computation, feature construction)
+on a QgsTaskManager worker thread and hand their results back to a
+callback that runs on the main thread, where layers and widgets may be
+touched safely.
+"""
+import os
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsRectangle, QgsTask
+
+from .traverse_batch import file_leg_results, is_solved, iter_batch
+from .traverse_chunked import PARALLEL_MIN_BYTES, iter_chunks
+from .traverse_closure import adjust_batches
+from .traverse_geometry import leg_geometry
+from .traverse_kernels import batch_leg_vertices
+from .traverse_parser import (
+    LEG_RECORDS, EndPointRecord, HeaderRecord, StartPointRecord, format_leg_lines, iter_file_records_progress,
+    record_to_leg,
+)
+from .traverse_profiler import Profiler
+from .traverse_store import SegmentStore
+from .traverse_writer import TraverseFeatureFactory
+
+# Report progress every this many legs
+PROGRESS_INTERVAL = 500
+
+# Legs handed to the table per batch while importing
+IMPORT_BATCH_SIZE = 20000
+
+# Legs formatted and written per chunk while exporting
+EXPORT_CHUNK_SIZE = 20000
+
+
+class DrawTraverseTask(QgsTask):
+    """
+    Builds one feature per solved leg of a computed traverse.
+
+    The traverse comes as a :class:`traverse_cache.TraverseSnapshot`, whose
+    stations, misclosure and densified vertices are shared with the preview
+    and export and only computed here when nobody asked for them before.
+    The task never touches the target layer: it only reads the ``fields``
+    snapshot it was given.  ``on_finished(task, success)`` is called on the
+    main thread once the task completes, fails or is cancelled; the built
+    features are in ``task.features``, their bounding box in ``task.extent``
+    and the engine output in ``task.result``.
+
+    With a ``closing_point`` the misclosure is stored in ``task.closure``,
+    and with an ``adjustment`` method (see :mod:`traverse_closure`) the
+    stations are adjusted onto the closing point before the features are
+    built. Stage timings go to ``profiler`` when it is enabled.
+    """
+
+    def __init__(self, description, snapshot, fields, on_finished,
+                 use_true_arcs=False, densify_options=None,
+                 closing_point=None, closing_azimuth=None, adjustment=None, profiler=None):
+        super(DrawTraverseTask, self).__init__(description, QgsTask.CanCancel)
+        self.snapshot = snapshot
+        self.fields = fields
+        self.on_finished = on_finished
+        self.use_true_arcs = use_true_arcs
+        self.densify_options = densify_options or {}
+        self.closing_point = closing_point
+        self.closing_azimuth = closing_azimuth
+        self.adjustment = adjustment
+        self.profiler = profiler or Profiler()
+
+        self.features = []
+        self.extent = QgsRectangle()
+        self.result = None
+        self.closure = None
+        self.exception = None
+
+    def run(self):
+        """Builds features from the snapshot. Runs on a worker thread."""
+        try:
+            factory = TraverseFeatureFactory(self.fields)
+            self.extent.setMinimal()
+            snapshot = self.snapshot
+            self.result = snapshot.result
+            leg_count = len(self.result.legs)
+
+            if self.closing_point is not None and leg_count:
+                with self.profiler.stage('closure', leg_count, method=self.adjustment):
+                    self.closure = snapshot.closure(self.closing_point, self.closing_azimuth)
+                    self.result = snapshot.adjusted(self.closing_point, self.adjustment)
+
+            vertices = [None] * leg_count
+            if not self.use_true_arcs:
+                with self.profiler.stage('densify', leg_count):
+                    vertices = snapshot.vertex_arrays(self.densify_options, self.closing_point, self.adjustment)
+
+            with self.profiler.stage('feature_build', leg_count):
+                # Store the *effective* direction used for drawing each segment,
+                # formatted for all features at once
+                bearings = snapshot.bearings()
+                total = max(leg_count, 1)
+                for count, (leg_result, bearing, leg_vertices) in enumerate(zip(self.result.legs, bearings, vertices), 1):
+                    if self.isCanceled():
+                        return False
+
+                    geometry = leg_geometry(leg_result, self.use_true_arcs, self.densify_options, leg_vertices)
+                    self.features.append(factory.feature(leg_result, geometry, bearing))
+                    self.extent.combineExtentWith(geometry.boundingBox())
+                    if count % PROGRESS_INTERVAL == 0:
+                        self.setProgress(100.0 * count / total)
+            return True
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Hands the outcome back to the caller. Runs on the main thread."""
+        self.on_finished(self, result)
+
+
+class BatchImportTask(QgsTask):
+    """
+    Computes a set of traverse files on a thread pool and builds one
+    feature per solved leg, tagged with the name of its source file.
+
+    Per-file outcomes are collected in ``task.file_results`` as
+    ``(path, leg_count, errors, failure)`` tuples; features and their
+    bounding box end up in ``task.features`` and ``task.extent``.  With an
+    ``adjustment`` method (see :mod:`traverse_closure`) every file that has
+    a closing point (EP record) is adjusted onto it, all files in one pass,
+    before the features are built.
+    """
+
+    def __init__(self, description, paths, fields, on_finished,
+                 use_true_arcs=False, densify_options=None, workers=None, adjustment=None, profiler=None):
+        super(BatchImportTask, self).__init__(description, QgsTask.CanCancel)
+        self.paths = list(paths)
+        self.fields = fields
+        self.on_finished = on_finished
+        self.use_true_arcs = use_true_arcs
+        self.densify_options = densify_options or {}
+        self.workers = workers
+        self.adjustment = adjustment
+        self.profiler = profiler or Profiler()
+
+        self.features = []
+        self.extent = QgsRectangle()
+        self.file_results = []
+        self.exception = None
+
+    def run(self):
+        """Solves the files in parallel and builds features. Runs on a worker thread."""
+        try:
+            factory = TraverseFeatureFactory(self.fields)
+            self.extent.setMinimal()
+            total = max(len(self.paths), 1)
+
+            with self.profiler.stage('batch_import', len(self.paths)) as batch_span:
+                # Worker processes cannot be started safely from inside QGIS
+                file_results = iter_batch(self.paths, self.workers, use_processes=False, is_canceled=self.isCanceled)
+                if self.adjustment:
+                    file_results = self._adjusted(file_results)
+                for count, file_result in enumerate(file_results, 1):
+                    if self.isCanceled():
+                        return False
+                    leg_results = file_leg_results(file_result)
+                    source_file = os.path.basename(file_result.path)
+                    with self.profiler.stage('feature_build', len(leg_results), file=source_file):
+                        if self.use_true_arcs or not leg_results:
+                            vertices = [None] * len(leg_results)
+                        else:
+                            vertices = batch_leg_vertices(file_result.result, **self.densify_options)
+                        for leg_result, bearing, leg_vertices in zip(leg_results, file_result.bearings, vertices):
+                            geometry = leg_geometry(leg_result, self.use_true_arcs, self.densify_options, leg_vertices)
+                            self.features.append(factory.feature(leg_result, geometry, bearing, source_file))
+                            self.extent.combineExtentWith(geometry.boundingBox())
+                    self.file_results.append((file_result.path, len(leg_results), file_result.errors, file_result.failure))
+                    self.setProgress(100.0 * count / total)
+                batch_span.args['features'] = len(self.features)
+            return not self.isCanceled()
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def _adjusted(self, file_results):
+        """Waits for all ``file_results`` and adjusts them onto their closing points in one pass."""
+        file_results = list(file_results)
+        with self.profiler.stage('closure', len(file_results), method=self.adjustment):
+            adjusted = adjust_batches([file_result.result if is_solved(file_result) else None for file_result in file_results],
+                                      [file_result.closing_point for file_result in file_results], self.adjustment)
+        return [file_result._replace(result=result) for file_result, result in zip(file_results, adjusted)]
+
+    def finished(self, result):
+        """Hands the outcome back to the caller. Runs on the main thread."""
+        self.on_finished(self, result)
+
+
+class ImportTraverseTask(QgsTask):
+    """
+    Streams a traverse file on a worker thread.
+
+    Legs are converted into table columns (see
+    :meth:`traverse_store.SegmentStore.prepare_rows`) and emitted through
+    ``batchReady`` every :data:`IMPORT_BATCH_SIZE` legs, so the table fills
+    while the file is still being read; the last batch is left in
+    ``task.remaining`` for the ``on_finished(task, success)`` callback.
+    Progress follows the bytes read. Start and closing points end up in
+    ``task.start_point``, ``task.closing_point`` and
+    ``task.closing_direction``; notes and malformed lines go to ``diagnostics``,
+    which the caller must leave alone until the task has finished.
+
+    Files of :data:`traverse_chunked.PARALLEL_MIN_BYTES` or more (or any
+    file, with ``parallel=True``) are memory-mapped and parsed in chunks on
+    worker threads instead; each chunk then becomes one batch.
+    """
+
+    batchReady = pyqtSignal(object)
+
+    def __init__(self, description, file_path, diagnostics, on_finished, parallel=None, profiler=None):
+        super(ImportTraverseTask, self).__init__(description, QgsTask.CanCancel)
+        self.file_path = file_path
+        self.diagnostics = diagnostics
+        self.on_finished = on_finished
+        self.parallel = parallel
+        self.profiler = profiler or Profiler()
+
+        self.start_point = None
+        self.closing_point = None
+        self.closing_direction = None
+        self.leg_count = 0
+        self.remaining = None
+        self.exception = None
+
+    def run(self):
+        """Parses the file and emits leg batches. Runs on a worker thread."""
+        try:
+            file_size = max(os.path.getsize(self.file_path), 1)
+            parallel = self.parallel
+            if parallel is None:
+                parallel = file_size >= PARALLEL_MIN_BYTES
+            with self.profiler.stage('import', file=os.path.basename(self.file_path), parallel=parallel) as import_span:
+                if parallel:
+                    self._read_chunked(file_size)
+                else:
+                    self._read_lines(file_size)
+                import_span.rows = self.leg_count
+            return not self.isCanceled()
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def _read_lines(self, file_size):
+        """Streams the file line by line, emitting a batch every :data:`IMPORT_BATCH_SIZE` legs."""
+        segments = []
+        for record, bytes_read in iter_file_records_progress(self.file_path):
+            if isinstance(record, LEG_RECORDS):
+                leg = record_to_leg(record)
+                segments.append((leg.direction, leg.distance, leg.radius, leg.arc_length))
+                if len(segments) == IMPORT_BATCH_SIZE:
+                    if self.isCanceled():
+                        return
+                    self.leg_count += len(segments)
+                    self.batchReady.emit(SegmentStore.prepare_rows(segments))
+                    segments = []
+                    self.setProgress(100.0 * bytes_read / file_size)
+            else:
+                self._take_record(record)
+        self.leg_count += len(segments)
+        self.remaining = SegmentStore.prepare_rows(segments)
+
+    def _read_chunked(self, file_size):
+        """Parses memory-mapped chunks on worker threads, emitting one batch per chunk."""
+        last = None
+        # Worker processes cannot be started safely from inside QGIS
+        for chunk in iter_chunks(self.file_path, use_processes=False, is_canceled=self.isCanceled):
+            if last is not None:
+                self.batchReady.emit(last)
+            for record in chunk.records:
+                self._take_record(record)
+            last = chunk.columns
+            self.leg_count += len(last[0])
+            self.setProgress(100.0 * chunk.end / file_size)
+        self.remaining = last if last is not None else SegmentStore.prepare_rows([])
+
+    def _take_record(self, record):
+        """Picks up a start or closing point, or notes a header or malformed line."""
+        diagnostics = self.diagnostics
+        if isinstance(record, StartPointRecord):
+            self.start_point = (record.x, record.y)
+            diagnostics.info(f"Start point set from file: {record.x:.6f}, {record.y:.6f}", line=record.line_num)
+        elif isinstance(record, EndPointRecord):
+            self.closing_point = (record.x, record.y)
+            self.closing_direction = record.direction
+            diagnostics.info(f"Closing point set from file: {record.x:.6f}, {record.y:.6f}", line=record.line_num)
+        elif isinstance(record, HeaderRecord):
+            diagnostics.info(f"Skipping line {record.line_num}: Unit/Type definition not handled in this version. Line: '{record.key} {record.value}'", line=record.line_num)
+        else:
+            diagnostics.warning(record.message, line=record.line_num)
+
+    def finished(self, result):
+        """Hands the outcome back to the caller. Runs on the main thread."""
+        self.on_finished(self, result)
+
+
+class ExportTraverseTask(QgsTask):
+    """
+    Writes a traverse file on a worker thread.
+
+    ``header_lines`` (types, start and closing point) are written first,
+    then the DD/CV lines of ``legs``, formatted :data:`EXPORT_CHUNK_SIZE`
+    legs at a time with progress reported per chunk.  The file is written
+    next to its destination and only moved into place once complete, so a
+    cancelled or failed export leaves any existing file untouched.  Legs
+    whose direction could not be parsed are collected in ``task.skipped``.
+    """
+
+    def __init__(self, description, file_path, header_lines, legs, on_finished, profiler=None):
+        super(ExportTraverseTask, self).__init__(description, QgsTask.CanCancel)
+        self.file_path = file_path
+        self.header_lines = list(header_lines)
+        self.legs = legs
+        self.on_finished = on_finished
+        self.profiler = profiler or Profiler()
+
+        self.skipped = []
+        self.written = 0
+        self.exception = None
+
+    def run(self):
+        """Formats and writes the file. Runs on a worker thread."""
+        partial_path = self.file_path + '.part'
+        try:
+            total = max(len(self.legs), 1)
+            with self.profiler.stage('export', len(self.legs), file=os.path.basename(self.file_path)):
+                with open(partial_path, 'w', encoding='utf-8') as f:
+                    for line in self.header_lines:
+                        f.write(line + "\n")
+                    for first in range(0, len(self.legs), EXPORT_CHUNK_SIZE):
+                        if self.isCanceled():
+                            break
+                        lines = []
+                        for leg, line in format_leg_lines(self.legs[first:first + EXPORT_CHUNK_SIZE]):
+                            if line is None:
+                                self.skipped.append(leg)
+                            else:
+                                lines.append(line)
+                        if lines:
+                            f.write("\n".join(lines) + "\n")
+                        self.written += len(lines)
+                        self.setProgress(100.0 * min(first + EXPORT_CHUNK_SIZE, total) / total)
+            if self.isCanceled():
+                os.remove(partial_path)
+                return False
+            os.replace(partial_path, self.file_path)
+            return True
+        except Exception as e:
+            self.exception = e
+            if os.path.exists(partial_path):
+                try:
+                    os.remove(partial_path)
+                except OSError:
+                    pass
+            return False
+
+    def finished(self, result):
+        """Hands the outcome back to the caller. Runs on the main thread."""
+        self.on_finished(self, result)
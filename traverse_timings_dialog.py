@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Panel listing the stage timings recorded by a :class:`traverse_profiler.Profiler`,
+with buttons to clear them and to export them as a Chrome trace.
+"""
+import os
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import Qt
+
+COLUMNS = ("Stage", "Calls", "Total (ms)", "Max (ms)", "Rows")
+
+
+class StageTimingsDialog(QtWidgets.QDialog):
+    """Non-modal table of per-stage call counts, durations and row counts."""
+
+    def __init__(self, profiler, parent=None):
+        super(StageTimingsDialog, self).__init__(parent)
+        self.profiler = profiler
+        self.setWindowTitle("Traverse Stage Timings")
+        self.resize(560, 320)
+
+        self.table = QtWidgets.QTableWidget(0, len(COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.statusLabel = QtWidgets.QLabel(self)
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Close, self)
+        refresh_button = buttons.addButton("Refresh", QtWidgets.QDialogButtonBox.ActionRole)
+        clear_button = buttons.addButton("Clear", QtWidgets.QDialogButtonBox.ResetRole)
+        export_button = buttons.addButton("Export Trace...", QtWidgets.QDialogButtonBox.ActionRole)
+        refresh_button.clicked.connect(self.refresh)
+        clear_button.clicked.connect(self.clear)
+        export_button.clicked.connect(self.export_trace)
+        buttons.rejected.connect(self.close)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addWidget(self.statusLabel)
+        layout.addWidget(buttons)
+        self.refresh()
+
+    def refresh(self):
+        """Reloads the table from the profiler."""
+        summaries = self.profiler.summary()
+        self.table.setRowCount(len(summaries))
+        for row, summary in enumerate(summaries):
+            values = (summary.name, str(summary.calls),
+                      f"{summary.total_seconds * 1000.0:.1f}", f"{summary.max_seconds * 1000.0:.1f}",
+                      "" if summary.rows is None else str(summary.rows))
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.table.resizeColumnsToContents()
+        if self.profiler.enabled:
+            self.statusLabel.setText(f"Recording. {len(self.profiler.spans())} span(s) recorded.")
+        else:
+            self.statusLabel.setText("Recording is off: enable \"Record Stage Timings\" in the menu.")
+
+    def clear(self):
+        self.profiler.clear()
+        self.refresh()
+
+    def export_trace(self):
+        """Saves the recorded spans as a Chrome trace JSON file."""
+        file_path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Stage Timings",
+            os.path.join(os.path.expanduser("~"), "traverse_trace.json"),
+            "Chrome Trace (*.json); All Files (*.*)")
+        if not file_path:
+            return
+        try:
+            count = self.profiler.write_chrome_trace(file_path)
+        except OSError as e:
+            QtWidgets.QMessageBox.critical(self, "Export Stage Timings", f"Could not write {file_path}: {e}")
+            return
+        self.statusLabel.setText(f"Exported {count} span(s) to {os.path.basename(file_path)}. "
+                                 "Open it in chrome://tracing or ui.perfetto.dev.")
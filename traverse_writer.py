@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk feature writing for drawn traverses.
+
+:class:`TraverseFeatureFactory` resolves the attribute indexes of the
+traverse fields once and fills a prefilled attribute vector per feature.
+:class:`FeatureWriter` adds features in chunks: into the edit buffer when
+the layer is being edited, or straight through the data provider when it
+is not, which skips the edit buffer entirely on large PostGIS/GeoPackage
+writes.  The layer extent is grown from the bounding box of the written
+features instead of being recomputed by the provider.
+
+Only ``qgis.core`` is used here so the classes can run in a QgsTask or a
+Processing algorithm as well as in the dock widget.
+"""
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import QgsFeature, QgsField, QgsFields, QgsRectangle, QgsVectorDataProvider
+
+# Attribute fields written with every traverse segment
+TRAVERSE_FIELDS = (
+    ("segment_id", QVariant.Int),
+    ("direction", QVariant.String),
+    ("distance", QVariant.Double),
+    ("radius", QVariant.Double),
+    ("arc_length", QVariant.Double),
+)
+
+# Fields of batch imports, which also record the file each segment came from
+BATCH_FIELDS = TRAVERSE_FIELDS + (("source_file", QVariant.String),)
+
+# Features handed to the layer or provider per call
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def traverse_fields(field_specs=TRAVERSE_FIELDS):
+    """A QgsFields holding ``field_specs``, for new outputs."""
+    fields = QgsFields()
+    for field_name, field_type in field_specs:
+        fields.append(QgsField(field_name, field_type))
+    return fields
+
+
+def missing_traverse_fields(fields, field_specs=TRAVERSE_FIELDS):
+    """The ``field_specs`` not present in ``fields``, as a QgsFields."""
+    missing = QgsFields()
+    for field_name, field_type in field_specs:
+        if fields.indexOf(field_name) == -1:
+            missing.append(QgsField(field_name, field_type))
+    return missing
+
+
+class TraverseFeatureFactory(object):
+    """
+    Builds traverse features for a fixed ``fields`` snapshot. Field indexes
+    are looked up once; fields the layer lacks are left out.
+    """
+
+    def __init__(self, fields):
+        self.fields = QgsFields(fields)
+        self.index = {name: self.fields.indexOf(name) for name, _ in BATCH_FIELDS}
+        self._template = [None] * self.fields.count()
+
+    def feature(self, leg_result, geometry, direction=None, source_file=None):
+        """A feature for a solved leg, with ``direction`` as its bearing text."""
+        leg = leg_result.leg
+        values = list(self._template)
+        for name, value in (("segment_id", leg_result.row), ("direction", direction),
+                            ("distance", leg.distance), ("radius", leg.radius),
+                            ("arc_length", leg.arc_length), ("source_file", source_file)):
+            index = self.index[name]
+            if index != -1:
+                values[index] = value
+        feat = QgsFeature(self.fields)
+        feat.setGeometry(geometry)
+        feat.setAttributes(values)
+        return feat
+
+
+def features_extent(features):
+    """Combined bounding box of the geometries of ``features``."""
+    extent = QgsRectangle()
+    extent.setMinimal()
+    for feat in features:
+        extent.combineExtentWith(feat.geometry().boundingBox())
+    return extent
+
+
+class FeatureWriter(object):
+    """
+    Writes features to ``layer`` in chunks of ``chunk_size``.
+
+    When the layer is in an edit session the features go to its edit
+    buffer (and are committed by the caller as before); otherwise they are
+    written directly with the data provider, one call per chunk.  Which of
+    the two applies (``direct``) is decided once, when the writer is
+    created, so committing the edit session does not change it.
+    ``extent`` accumulates the bounding box of the written features.
+    """
+
+    def __init__(self, layer, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.layer = layer
+        self.chunk_size = max(1, int(chunk_size))
+        self.direct = not layer.isEditable() # True when writes bypass the edit buffer
+        self.written = 0
+        self.finished = False
+        self.extent = QgsRectangle()
+        self.extent.setMinimal()
+
+    def can_write(self):
+        """True when the layer (or its provider, for direct writes) accepts new features."""
+        if not self.direct:
+            return True
+        return bool(self.layer.dataProvider().capabilities() & QgsVectorDataProvider.AddFeatures)
+
+    def write(self, features, extent=None):
+        """
+        Adds ``features`` chunk by chunk. ``extent`` is their bounding box
+        when already known. Raises RuntimeError when a chunk is rejected.
+        """
+        features = list(features)
+        provider = self.layer.dataProvider()
+        for first in range(0, len(features), self.chunk_size):
+            chunk = features[first:first + self.chunk_size]
+            if self.direct:
+                ok, _ = provider.addFeatures(chunk)
+                if not ok:
+                    raise RuntimeError(f"The data provider rejected the features: {provider.lastError() or 'unknown error'}")
+            elif not self.layer.addFeatures(chunk):
+                raise RuntimeError("The layer rejected the features.")
+            self.written += len(chunk)
+        self.extent.combineExtentWith(extent if extent is not None else features_extent(features))
+
+    def finish(self):
+        """
+        Updates the layer extent after features were written and repaints the
+        layer. Only the first call has an effect.
+        """
+        if self.finished or not self.written:
+            return
+        self.finished = True
+        self.layer.updateExtents()
+        if self.direct:
+            self.layer.triggerRepaint()